@@ -1,9 +1,39 @@
+import sys
+import importlib
+from . import buffer
+from . import clock
+from . import metrics
 from . import file
-from . import output_file
-from . import input_device
-from . import output_device
 from . import mixer
 from . import multiplex
-from . import mp3
 from . import playlist
-from . import icecast
+from . import meter
+
+
+# The modules that load an optional backend (PortAudio, LAME) so are only imported when they are first used
+LAZY_MODULES = ('input_device', 'output_device', 'mp3', 'output_file', 'icecast')
+
+
+def __getattr__(name: str):
+    """
+    Import the modules with optional backends on first use
+    :param name:  The name of the module
+    :return:  The module
+    :raises AttributeError:  There is no such module
+    """
+    if name in LAZY_MODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def is_instance(value, module: str, name: str) -> bool:
+    """
+    Check whether a value is an instance of a class in one of the lazily imported modules without importing it,
+    nothing can be an instance of a class in a module that hasn't been imported
+    :param value:  The value to check
+    :param module:  The name of the module in this package
+    :param name:  The name of the class
+    :return:  True if the value is an instance of the class
+    """
+    imported = sys.modules.get(__name__ + '.' + module)
+    return imported is not None and isinstance(value, getattr(imported, name))
@@ -0,0 +1,118 @@
+import sys
+import typing
+import threading
+import numpy
+
+
+class BufferPool(object):
+    """
+    A pool of blocks of a fixed size that are reused once nothing else references them.
+
+    Blocks are handed to every callback of a source and may be held on to, such as in the
+    queue of an output device, so rather than being released explicitly a block becomes free
+    when the pool holds the only reference to it.  Any view of a block references the block
+    itself so a block is never reused while a slice of it is still held.
+    """
+
+    # The most blocks that are kept for reuse by each pool
+    SIZE = 32
+
+    def __init__(self, length: int, dtype=numpy.int16):
+        """
+        Create an empty pool
+        :param length:  The number of samples in each block
+        :param dtype:  The type of the samples
+        """
+        self._length = length
+        self._dtype = dtype
+        self._blocks = []
+        self._lock = threading.Lock()
+        # The number of references to a block that is only held by the pool, measured rather
+        # than assumed as it differs between Python versions
+        self._free_references = self._references([numpy.zeros(0, dtype)], 0)
+
+    @staticmethod
+    def _references(blocks: typing.List[numpy.array], index: int) -> int:
+        """
+        Count the references to a block in the pool
+        :param blocks:  The blocks in the pool
+        :param index:  The index of the block to count the references of
+        :return:  The reference count
+        """
+        return sys.getrefcount(blocks[index])
+
+    def acquire(self) -> numpy.array:
+        """
+        Get a writable block that isn't in use, its contents are undefined
+        :return:  The block
+        """
+        with self._lock:
+            for index in range(len(self._blocks)):
+                if self._references(self._blocks, index) == self._free_references:
+                    block = self._blocks[index]
+                    block.flags.writeable = True
+                    return block
+            block = numpy.empty(self._length, self._dtype)
+            if len(self._blocks) < self.SIZE:
+                self._blocks.append(block)
+            return block
+
+    def zeros(self) -> numpy.array:
+        """
+        Get a writable block that isn't in use filled with silence
+        :return:  The block
+        """
+        block = self.acquire()
+        block.fill(0)
+        return block
+
+    def copy(self, block: numpy.array) -> numpy.array:
+        """
+        Copy a block into a block from the pool
+        :param block:  The block to copy, it must be the length of the blocks in this pool
+        :return:  The writable copy
+        """
+        copied = self.acquire()
+        numpy.copyto(copied, block, casting='unsafe')
+        return copied
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool(length: int, dtype=numpy.int16) -> BufferPool:
+    """
+    Get the shared pool for blocks of a size
+    :param length:  The number of samples in each block
+    :param dtype:  The type of the samples
+    :return:  The pool for the block size
+    """
+    key = (length, numpy.dtype(dtype))
+    with _pools_lock:
+        found = _pools.get(key)
+        if found is None:
+            found = BufferPool(length, dtype)
+            _pools[key] = found
+        return found
+
+
+def read_only(block: numpy.array) -> numpy.array:
+    """
+    Mark a block as read-only so it can be shared between callbacks without being copied
+    :param block:  The block to share
+    :return:  The same block
+    """
+    block.flags.writeable = False
+    return block
+
+
+def writable(block: numpy.array) -> numpy.array:
+    """
+    Get a block that can be modified, copying a shared block into a pooled block if it is read-only
+    :param block:  The block that was received
+    :return:  The block itself if it may be modified, otherwise a copy of it
+    """
+    if block.flags.writeable:
+        return block
+    return pool(len(block), block.dtype).copy(block)
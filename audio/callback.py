@@ -1,4 +1,6 @@
 import typing
+import numpy
+from . import metrics
 
 
 class Callback(object):
@@ -28,10 +30,18 @@ class Callback(object):
 
     def notify_callbacks(self, *args, **kwargs) -> None:
         """
-        Notify the callbacks that are registered of a new input block
-        """
-        for callback in self._callbacks:
-            callback(self, *args, **kwargs)
+        Notify the callbacks that are registered of a new input block, the same block is passed
+        to every callback so it is made read-only, use audio.buffer.writable to get one to modify
+        """
+        for arg in args:
+            if isinstance(arg, numpy.ndarray):
+                arg.flags.writeable = False
+        if metrics.enabled:
+            for callback in self._callbacks:
+                metrics.timed(callback, self, *args, **kwargs)
+        else:
+            for callback in self._callbacks:
+                callback(self, *args, **kwargs)
 
     def has_callbacks(self) -> bool:
         """
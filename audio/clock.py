@@ -0,0 +1,135 @@
+import heapq
+import typing
+import threading
+import contextlib
+import time
+
+
+class Clock(object):
+    """
+    The time source that paces audio sources, sources register with the clock while they are playing
+    and wait on it before sending each block
+    """
+
+    def now(self) -> float:
+        """
+        Get the current time
+        :return:  The time in seconds since the epoch
+        """
+        raise NotImplementedError()
+
+    def register(self) -> int:
+        """
+        Add a source that will wait on the clock, called before its thread starts
+        :return:  The ID for the source to wait with
+        """
+        return 0
+
+    def unregister(self) -> None:
+        """
+        Remove a source that has stopped waiting on the clock, called as its thread exits
+        """
+        pass
+
+    def wait_until(self, deadline: float, source: int = 0) -> None:
+        """
+        Block until the clock reaches a time
+        :param deadline:  The time to wait for in seconds since the epoch
+        :param source:  The ID that the waiting source was registered with
+        """
+        raise NotImplementedError()
+
+
+class WallClock(Clock):
+    """
+    A clock that follows real time, used when the audio is played live
+    """
+
+    def now(self) -> float:
+        return time.time()
+
+    def wait_until(self, deadline: float, source: int = 0) -> None:
+        sleep_time = deadline - time.time()
+        if sleep_time > 0:
+            time.sleep(sleep_time)
+
+
+class VirtualClock(Clock):
+    """
+    A clock that jumps straight to the next time that a source is waiting for, so that a graph
+    runs as fast as the CPU allows.  Only one registered source runs at a time, the one waiting
+    for the earliest time, in the order that they were registered for the same time, so the same
+    graph always produces the same blocks in the same order.
+    """
+
+    def __init__(self, start: float = 0.0):
+        """
+        Create a virtual clock
+        :param start:  The time to start at in seconds since the epoch
+        """
+        self._now = start
+        self._condition = threading.Condition()
+        self._sources = 0
+        self._waiting = []
+        self._registered = 0
+        self._running = None
+
+    def now(self) -> float:
+        return self._now
+
+    def register(self) -> int:
+        with self._condition:
+            self._sources += 1
+            self._registered += 1
+            return self._registered
+
+    def unregister(self) -> None:
+        with self._condition:
+            self._sources -= 1
+            self._advance()
+
+    def wait_until(self, deadline: float, source: int = 0) -> None:
+        token = object()
+        with self._condition:
+            heapq.heappush(self._waiting, (deadline, source, id(token), token))
+            self._advance()
+            while self._running is not token:
+                self._condition.wait()
+            self._running = None
+
+    def run_until(self, deadline: float) -> None:
+        """
+        Let the registered sources run until the clock reaches a time
+        :param deadline:  The time to run until in seconds since the epoch
+        """
+        source = self.register()
+        try:
+            self.wait_until(deadline, source)
+        finally:
+            self.unregister()
+
+    @contextlib.contextmanager
+    def held(self) -> typing.Iterator[None]:
+        """
+        Stop the time moving on while sources are started so that they all start at the same time
+        """
+        self.register()
+        try:
+            yield
+        finally:
+            self.unregister()
+
+    def _advance(self) -> None:
+        """
+        Once every source is waiting, move the time on to the earliest one and let it run,
+        the condition must be held
+        """
+        if self._running is None and self._waiting and len(self._waiting) >= self._sources:
+            deadline, _, _, token = heapq.heappop(self._waiting)
+            self._now = max(self._now, deadline)
+            self._running = token
+            self._condition.notify_all()
+
+
+# The clock used for live audio
+wall = WallClock()
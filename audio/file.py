@@ -2,9 +2,9 @@ import typing
 import audioread
 import threading
 import numpy
-import time
 import math
 from . import callback
+from . import clock
 
 
 class File(callback.Callback):
@@ -12,21 +12,28 @@ class File(callback.Callback):
     A wrapper around an audio file that allows it to be played as an input
     """
 
-    def __init__(self, path: str, blocks: int):
+    def __init__(self, path: str, blocks: int, clock_source: typing.Optional[clock.Clock] = None):
         """
         Open an audio file ready to play it
         :param path:  The path to the file to play
         :param blocks:  The number of blocks to read at a time per channel
+        :param clock_source:  The clock to pace playback by, real time by default
         :raises audioread.NoBackendError:  Unable to open the path for playback
         """
         super().__init__()
         self._path = path
+        self._clock = clock.wall if clock_source is None else clock_source
         self._open()
         self._blocks = blocks * self._file.channels
         self._playing = False
         self._time = 0.0
         self._end_callback = None
         self._play_thread = None
+        self._clock_id = 0
+        self._cue_in = 0.0
+        self._cue_out = None
+        # The linear gain for a mixer to apply along with the volume of its input
+        self.gain = 1.0
 
     def _open(self) -> None:
         """
@@ -34,8 +41,58 @@ class File(callback.Callback):
         """
         self._file = audioread.audio_open(self._path)
         self._file_iter = iter(self._file)
+        self._preloaded = []
         self._blocks_sent = 0
 
+    def _read(self) -> typing.Iterable[bytes]:
+        """
+        Read the raw data from the file, starting with any that was preloaded
+        :return:  An iterator of the raw PCM buffers
+        """
+        while self._preloaded:
+            yield self._preloaded.pop(0)
+        for buffer in self._file_iter:
+            yield buffer
+
+    def preload(self, seconds: float = 1.0) -> None:
+        """
+        Decode the start of the file so that it can start playing without waiting for the decoder
+        :param seconds:  The amount of audio to decode
+        """
+        self._seek_cue_in()
+        target = int(self._file.samplerate * self._file.channels * seconds) * 2
+        decoded = sum(len(buffer) for buffer in self._preloaded)
+        while decoded < target:
+            buffer = next(self._file_iter, None)
+            if buffer is None:
+                break
+            self._preloaded.append(buffer)
+            decoded += len(buffer)
+
+    def set_cues(self, cue_in: float = 0.0, cue_out: typing.Optional[float] = None) -> None:
+        """
+        Set where the file starts and stops playing so that silence around the sound is skipped
+        :param cue_in:  The time in seconds to start playing from
+        :param cue_out:  The time in seconds to stop playing at, the end of the file if None
+        """
+        self._cue_in = cue_in
+        self._cue_out = cue_out
+
+    def _seek_cue_in(self) -> None:
+        """
+        Skip to the cue in if the file hasn't started yet
+        """
+        if self._blocks_sent == 0 and self._cue_in:
+            self.set_location(self._cue_in)
+
+    @property
+    def path(self) -> str:
+        """
+        Get the path of the file being played
+        :return:  The path to the file
+        """
+        return self._path
+
     @property
     def channels(self) -> int:
         """
@@ -50,7 +107,10 @@ class File(callback.Callback):
         """
         if self._playing:
             return
+        self._seek_cue_in()
         self._playing = True
+        # Register before the thread starts so that a virtual clock can't move on without it
+        self._clock_id = self._clock.register()
         self._play_thread = threading.Thread(target=self._block_generator, daemon=True)
         self._play_thread.start()
 
@@ -62,19 +122,23 @@ class File(callback.Callback):
         # Pause the track if it is playing
         is_playing = self._playing
         if is_playing:
-            self.stop()
+            self.pause()
             self._play_thread.join()
-        # Determine how many blocks we need to skip to get to the time
-        blocks_per_second = self._file.samplerate * self._file.channels
-        target_blocks = int(math.floor(blocks_per_second * location))
+        # Determine how many samples we need to skip to get to the time, keeping the channels aligned
+        channels = self._file.channels
+        target_blocks = int(math.floor(self._file.samplerate * location)) * channels
         # Re-start if we've gone past
         if self._blocks_sent > target_blocks:
             self._open()
-        # Iterate over the file until we get to the right time
-        for block in self._file_iter:
-            self._blocks_sent += len(block)
-            if self._blocks_sent >= target_blocks:
+        # Skip whole buffers without converting them and keep the rest of the one the time is in
+        for block in self._read():
+            samples = len(block) // 2
+            if self._blocks_sent + samples > target_blocks:
+                self._preloaded.insert(0, block[(target_blocks - self._blocks_sent) * 2:])
+                self._blocks_sent = target_blocks
                 break
+            self._blocks_sent += samples
+        self._time = self._blocks_sent / (self._file.samplerate * channels)
         # Re-start playing if we were already
         if is_playing:
             self.play()
@@ -109,6 +173,15 @@ class File(callback.Callback):
         if self._blocks_sent > 0:
             self._open()
 
+    def close(self) -> None:
+        """
+        Stop the file from playing and release the decoder
+        """
+        if self._playing:
+            self._playing = False
+            self._play_thread.join()
+        self._file.close()
+
     def set_end_callback(self, end_callback: typing.Callable[[], None]) -> None:
         """
         Set a callback for when the file finishes playing
@@ -121,15 +194,26 @@ class File(callback.Callback):
         The loop that plays the sound from start to end, queueing raw PCM blocks
         ready to be sent to callbacks when the clock source ticks
         """
+        try:
+            self._play_blocks()
+        finally:
+            self._clock.unregister()
+
+    def _play_blocks(self) -> None:
+        """
+        Send the blocks of the file to the callbacks, paced by the clock
+        """
         raw_block = numpy.zeros(0, numpy.int16)
-        # In order to know when to sleep until we need to know when we started
-        start_time = time.time()
+        # In order to know when to wait until we need to know when we started
+        start_time = self._clock.now()
         # This is how many blocks we should have passed per second
         channels = self._file.channels
         blocks_per_second = self._file.samplerate * channels
         # Calculate the starting time
         start_time -= self._blocks_sent / blocks_per_second
-        for block in self._file_iter:
+        # The number of blocks to stop after
+        end_blocks = None if self._cue_out is None else int(math.ceil(self._cue_out * blocks_per_second))
+        for block in self._read():
             # Add the newly read blocks to the existing ones,
             # sorting out the interlacing of the channels
             raw_block = numpy.append(
@@ -137,19 +221,23 @@ class File(callback.Callback):
                 numpy.fromstring(block, dtype=numpy.int16).reshape(-1, channels)
             )
             while len(raw_block) >= self._blocks and self._playing:
+                if end_blocks is not None and self._blocks_sent >= end_blocks:
+                    break
                 # Add the number of blocks we're about to pass to find out when we should
                 self._blocks_sent += self._blocks
                 # Re-calculate the time we should be at
                 self._time = self._blocks_sent / blocks_per_second
-                # Find the difference between the time we should be at and the current time
-                sleep_time = self._time - (time.time() - start_time)
-                # If there is a difference and it's in the future, wait for then
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
+                # Wait for the time we should be at
+                self._clock.wait_until(start_time + self._time, self._clock_id)
                 self.notify_callbacks(raw_block[:self._blocks])
                 raw_block = raw_block[self._blocks:]
-            if not self._playing:
+            if not self._playing or (end_blocks is not None and self._blocks_sent >= end_blocks):
                 break
+        if not self._playing:
+            # Paused, keep what was decoded but not sent for when it plays again
+            if len(raw_block):
+                self._preloaded.insert(0, raw_block.tobytes())
+            return
         self._playing = False
         if self._end_callback is not None:
             self._end_callback()
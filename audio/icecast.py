@@ -11,18 +11,24 @@ class Icecast(object):
     A class that can sink to an Icecast server
     """
 
-    def __init__(self, quality: int = 7, bitrate: int = 64):
+    # The number of seconds to wait for the server at each step of connecting
+    TIMEOUT = 10.0
+
+    def __init__(self, quality: int = 7, bitrate: int = 64,
+                 endpoint: typing.Optional[str] = None, password: typing.Optional[str] = None):
         """
         Create a new Icecast stream
         :param quality:  The MP3 encoding quality - 2 is best, 7 is fastest
         :param bitrate:  The constant bitrate to encode using
+        :param endpoint:  The Icecast endpoint that will be connected to, set by connect if not given
+        :param password:  The password that will be used, set by connect if not given
         """
         self._output = mp3.Mp3(quality, bitrate)
         self._output.add_callback(self._enqueue)
         self._socket = None
         self._source = None
-        self._endpoint = None
-        self._password = None
+        self._endpoint = endpoint
+        self._password = password
         # Icecast doesn't actually support chunked encoding
         self._chunk = False
 
@@ -32,6 +38,14 @@ class Icecast(object):
             return 0
         return self._source.channels
 
+    @property
+    def encoder(self) -> mp3.Mp3:
+        """
+        Get the encoder that the audio passes through
+        :return:  The MP3 encoder
+        """
+        return self._output
+
     @property
     def endpoint(self) -> str:
         return self._endpoint
@@ -41,29 +55,29 @@ class Icecast(object):
         return self._password
 
     @staticmethod
-    def _socket_connect(endpoint: urllib.parse.ParseResult) -> typing.Union[ssl.SSLSocket, socket.socket]:
+    def _socket_connect(endpoint: urllib.parse.ParseResult,
+                        timeout: float) -> typing.Union[ssl.SSLSocket, socket.socket]:
         """
         Connect to the remote endpoint
         :param endpoint:  The Icecast endpoint to connect to
+        :param timeout:  The number of seconds to wait for the connection and the TLS handshake
         :return:  The created socket
+        :raises OSError:  Unable to connect in time
         """
         address = endpoint.netloc.split(':')
+        if len(address) == 1:
+            address.append(443 if endpoint.scheme == 'https' else 80)
+        connection = socket.create_connection((address[0], int(address[1])), timeout)
         if endpoint.scheme == 'https':
-            if len(address) == 1:
-                address.append(443)
             context = ssl.SSLContext(ssl.PROTOCOL_TLS)
             context.verify_mode = ssl.CERT_REQUIRED
             context.check_hostname = True
             context.load_default_certs()
-            sock = socket.socket()
-            connection = context.wrap_socket(sock, server_hostname=address[0])
-        else:
-            if len(address) == 1:
-                address.append(80)
-            connection = socket.socket()
-        if isinstance(address[1], str):
-            address[1] = int(address[1])
-        connection.connect((address[0], address[1]))
+            try:
+                connection = context.wrap_socket(connection, server_hostname=address[0])
+            except OSError:
+                connection.close()
+                raise
         return connection
 
     @staticmethod
@@ -106,7 +120,11 @@ class Icecast(object):
         try:
             headers = b''
             while b'\r\n\r\n' not in headers:
-                headers += connection.recv(1024)
+                data = connection.recv(1024)
+                if not data:
+                    # The server closed the connection
+                    return False
+                headers += data
             return b' 100 ' in headers.split(b'\r\n')[0]
         except IOError:
             return False
@@ -122,15 +140,23 @@ class Icecast(object):
         self._password = password
         endpoint = urllib.parse.urlparse(endpoint)
         try:
-            connection = self._socket_connect(endpoint)
-        except ConnectionRefusedError:
+            connection = self._socket_connect(endpoint, self.TIMEOUT)
+        except (OSError, ValueError):
+            return False
+        try:
+            self._authenticate(connection, endpoint, 'source', password)
+        except OSError:
+            connection.close()
             return False
-        self._authenticate(connection, endpoint, 'source', password)
         result = self._expect_100(connection)
         if result:
+            # Only connecting is limited, the stream itself blocks as before
+            connection.settimeout(None)
             self._socket = connection
             if self._source is not None:
                 self._output.input = self._source
+        else:
+            connection.close()
         return result
 
     def _enqueue(self, _, blocks: bytes) -> None:
@@ -2,6 +2,7 @@ import typing
 import sounddevice
 import sys
 import numpy
+from . import buffer
 from . import callback
 
 
@@ -33,6 +34,7 @@ class InputDevice(callback.Callback):
         self._last_frames = None
         self._last_time = None
         self._started = False
+        self._xruns = 0
 
     def add_callback(self, cb: typing.Callable[[numpy.array], None]) -> None:
         """
@@ -70,6 +72,22 @@ class InputDevice(callback.Callback):
         """
         return self._name
 
+    @property
+    def xruns(self) -> int:
+        """
+        Get the number of times the stream has reported an overflow or underflow
+        :return:  The number of xruns since the device was opened
+        """
+        return self._xruns
+
+    @property
+    def latency(self) -> float:
+        """
+        Get the time between the sound arriving at the device and it being passed to callbacks
+        :return:  The latency in seconds
+        """
+        return self._stream.latency
+
     @property
     def channels(self) -> int:
         """
@@ -87,10 +105,13 @@ class InputDevice(callback.Callback):
         :param status:  The current status string or None if no error
         """
         if status:
+            self._xruns += 1
             print(status, file=sys.stderr)
         self._last_frames = frames
         self._last_time = time
-        self.notify_callbacks(numpy.ravel(in_data))
+        # The stream reuses its buffer so the block is copied once for all of the callbacks
+        samples = numpy.ravel(in_data)
+        self.notify_callbacks(buffer.pool(len(samples)).copy(samples))
 
     @staticmethod
     def devices() -> typing.List[str]:
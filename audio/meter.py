@@ -1,18 +1,66 @@
 import numpy
 
 
+def _oversampling_filter(factor: int, taps_per_phase: int) -> numpy.array:
+    """
+    Design the polyphase low-pass filter used to interpolate between samples for true-peak
+    :param factor:  The oversampling factor
+    :param taps_per_phase:  The length of each of the phases of the filter
+    :return:  The filter coefficients as an array of (phase, tap)
+    """
+    taps = factor * taps_per_phase
+    n = numpy.arange(taps) - (taps - 1) / 2.0
+    # Windowed sinc with the cut-off at the original Nyquist frequency
+    coefficients = numpy.sinc(n / factor) * numpy.kaiser(taps, 5.0)
+    coefficients *= factor / coefficients.sum()
+    return coefficients.reshape(taps_per_phase, factor).T.astype(numpy.float32)
+
+
 class Meter(object):
     """
-    A sound meter that uses listens to an input and determines the peaks
+    A sound meter that listens to an input and determines the sample peak, RMS and true-peak
+    of each channel
     """
 
-    def __init__(self):
+    # The factor to oversample by to find inter-sample (true) peaks
+    OVERSAMPLE = 4
+    # The length of each phase of the oversampling filter
+    TAPS_PER_PHASE = 12
+    # The level reported for silence in dBFS
+    FLOOR = -100.0
+
+    _filter = _oversampling_filter(OVERSAMPLE, TAPS_PER_PHASE)
+
+    def __init__(self, history: int = 100):
         """
-        Create a peak meter for a given source
+        Create a meter with no source
+        :param history:  The number of blocks to keep the levels for
         """
-        self._peaks = [0] * 100
-        self._current_peak = 0
+        self._history = history
+        self._channels = 0
         self._source = None
+        self._reset(1)
+
+    def _reset(self, channels: int) -> None:
+        """
+        Clear the history for a number of channels
+        :param channels:  The number of channels to meter
+        """
+        self._channels = channels
+        self._peaks = numpy.zeros((self._history, channels), numpy.float32)
+        self._rms = numpy.zeros((self._history, channels), numpy.float32)
+        self._true_peaks = numpy.zeros((self._history, channels), numpy.float32)
+        # The samples from the end of the last block needed by the oversampling filter
+        self._tail = numpy.zeros((self.TAPS_PER_PHASE - 1, channels), numpy.float32)
+        self._current = 0
+
+    @property
+    def channels(self) -> int:
+        """
+        Get the number of channels being metered
+        :return:  The number of channels
+        """
+        return self._channels
 
     @property
     def input(self):
@@ -30,28 +78,76 @@ class Meter(object):
             self._source.remove_callback(self._callback)
         self._source = source
         if self._source is not None:
+            self._reset(source.channels)
             self._source.add_callback(self._callback)
 
-    def current_level(self) -> int:
+    @classmethod
+    def _decibels(cls, levels: numpy.array) -> numpy.array:
         """
-        Get the peak of the last block that was processed
-        :return:  The current level
+        Convert linear levels to dBFS
+        :param levels:  The levels where 1.0 is full scale
+        :return:  The levels in dBFS, limited to the floor
         """
-        return self._peaks[self._current_peak]
+        with numpy.errstate(divide='ignore'):
+            return numpy.maximum(20.0 * numpy.log10(levels), cls.FLOOR)
 
-    def current_peak(self) -> int:
+    def current_level(self) -> numpy.array:
         """
-        Get the maximum peak that is in the current list
-        :return:  The maximum peak
+        Get the sample peak of the last block that was processed for each channel
+        :return:  The current level of each channel in dBFS
         """
-        return max(self._peaks)
+        return self._decibels(self._peaks[self._current])
+
+    def current_peak(self) -> numpy.array:
+        """
+        Get the maximum sample peak in the history for each channel
+        :return:  The maximum peak of each channel in dBFS
+        """
+        return self._decibels(self._peaks.max(axis=0))
+
+    def current_rms(self) -> numpy.array:
+        """
+        Get the RMS level of the last block that was processed for each channel
+        :return:  The RMS level of each channel in dBFS
+        """
+        return self._decibels(self._rms[self._current])
+
+    def current_true_peak(self) -> numpy.array:
+        """
+        Get the maximum true-peak in the history for each channel
+        :return:  The maximum true-peak of each channel in dBTP
+        """
+        return self._decibels(self._true_peaks.max(axis=0))
+
+    def _true_peak(self, samples: numpy.array) -> numpy.array:
+        """
+        Find the peak of the signal between the samples by oversampling it
+        :param samples:  The samples as an array of (frame, channel)
+        :return:  The true-peak of each channel
+        """
+        extended = numpy.concatenate((self._tail, samples))
+        self._tail = extended[len(extended) - (self.TAPS_PER_PHASE - 1):]
+        frames = len(samples)
+        last = self.TAPS_PER_PHASE - 1
+        # Each phase of the filter produces one of the interpolated samples between the originals
+        oversampled = numpy.zeros((self.OVERSAMPLE, frames, self._channels), numpy.float32)
+        for tap in range(self.TAPS_PER_PHASE):
+            oversampled += self._filter[:, tap, None, None] * extended[last - tap:last - tap + frames]
+        return numpy.abs(oversampled).max(axis=(0, 1))
 
     def _callback(self, _, blocks: numpy.array) -> None:
         """
         Process a block from the source
-        :param blocks:  The block to get the peak for
+        :param blocks:  The interleaved block of samples to meter
         """
-        peak = numpy.average(numpy.abs(blocks)) * 2
-        next_peak = (self._current_peak + 1) % len(self._peaks)
-        self._peaks[next_peak] = peak
-        self._current_peak = next_peak
+        samples = blocks.reshape(-1, self._channels).astype(numpy.float32) / 32768.0
+        if len(samples) == 0:
+            return
+        peaks = numpy.abs(samples).max(axis=0)
+        rms = numpy.sqrt(numpy.mean(numpy.square(samples), axis=0))
+        true_peaks = numpy.maximum(self._true_peak(samples), peaks)
+        next_block = (self._current + 1) % self._history
+        self._peaks[next_block] = peaks
+        self._rms[next_block] = rms
+        self._true_peaks[next_block] = true_peaks
+        self._current = next_block
@@ -0,0 +1,88 @@
+import time
+import typing
+import weakref
+
+
+# Whether callbacks are timed, the cost is two clock reads and a dictionary lookup per callback per block
+enabled = True
+
+
+class Timing(object):
+    """
+    The time spent in the callbacks of one consumer of audio blocks
+    """
+
+    __slots__ = ('consumer', 'name', 'calls', 'seconds', 'maximum')
+
+    def __init__(self, consumer: typing.Optional[weakref.ref], name: str):
+        """
+        Start timing a consumer
+        :param consumer:  A weak reference to the object that owns the callback, None if it can't be referenced
+        :param name:  The name of the type of the consumer
+        """
+        self.consumer = consumer
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.maximum = 0.0
+
+
+_timings = {}
+
+
+def _owner(callback: typing.Callable) -> typing.Any:
+    """
+    Get the object that a callback belongs to
+    :param callback:  The callback
+    :return:  The instance for a bound method, otherwise the callback itself
+    """
+    return getattr(callback, '__self__', callback)
+
+
+def record(callback: typing.Callable, seconds: float) -> None:
+    """
+    Record the time that a callback took to handle a block
+    :param callback:  The callback that was called
+    :param seconds:  The time it took
+    """
+    owner = _owner(callback)
+    timing = _timings.get(id(owner))
+    if timing is None or (timing.consumer is not None and timing.consumer() is not owner):
+        # A new consumer, or a new object that has been given the ID of one that has gone
+        try:
+            reference = weakref.ref(owner)
+        except TypeError:
+            reference = None
+        timing = Timing(reference, getattr(owner, '__qualname__', type(owner).__name__))
+        _timings[id(owner)] = timing
+    timing.calls += 1
+    timing.seconds += seconds
+    if seconds > timing.maximum:
+        timing.maximum = seconds
+
+
+def timed(callback: typing.Callable, *args, **kwargs) -> None:
+    """
+    Call a callback recording the time that it takes
+    :param callback:  The callback to call
+    """
+    start = time.perf_counter()
+    try:
+        callback(*args, **kwargs)
+    finally:
+        record(callback, time.perf_counter() - start)
+
+
+def timings() -> typing.List[typing.Tuple[typing.Any, Timing]]:
+    """
+    Get the timings of the consumers that still exist
+    :return:  Each consumer, or None if it can't be referenced, with its timing
+    """
+    found = []
+    for key, timing in list(_timings.items()):
+        consumer = timing.consumer() if timing.consumer is not None else None
+        if timing.consumer is not None and consumer is None:
+            _timings.pop(key, None)
+            continue
+        found.append((consumer, timing))
+    return found
@@ -1,5 +1,6 @@
 import numpy
 import threading
+from . import buffer
 from . import callback
 
 
@@ -26,6 +27,7 @@ class Mixer(callback.Callback):
         """
         super().__init__()
         self._block_size = block_size * output_channels
+        self._pool = buffer.pool(self._block_size)
         self._channels = output_channels
         self._current_sample = None
         self._inputs = {}
@@ -106,7 +108,7 @@ class Mixer(callback.Callback):
         :return:  The completed input block
         """
         completed_sample = self._current_sample
-        self._current_sample = numpy.zeros(self._block_size, numpy.int16)
+        self._current_sample = self._pool.zeros()
         return completed_sample
 
     def _get_input(self, source) -> Input:
@@ -154,8 +156,8 @@ class Mixer(callback.Callback):
             # Need to re-sample the channels
             blocks = self._map_channels(blocks, this_input.channels)
 
-        # Set the volume
-        blocks = (blocks * this_input.volume).astype(numpy.int16)
+        # Set the volume, sources such as playlists may have their own gain which is applied in the same multiply
+        blocks = (blocks * (this_input.volume * getattr(source, 'gain', 1.0))).astype(numpy.int16)
 
         self._input_lock.acquire()
         try:
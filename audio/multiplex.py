@@ -1,6 +1,6 @@
 import numpy
 import threading
-import collections
+from . import buffer
 from . import callback
 
 
@@ -9,7 +9,14 @@ class Multiplex(callback.Callback):
     A multiplexer that takes in multiple inputs and maps them to a multi-channel output
     """
 
-    Input = collections.namedtuple('Input', ('start_channel', 'channels', 'has_input'))
+    class Input(object):
+
+        __slots__ = ('start_channel', 'channels', 'has_input')
+
+        def __init__(self, start_channel, channels, has_input):
+            self.start_channel = start_channel
+            self.channels = channels
+            self.has_input = has_input
 
     def __init__(self, channels: int, block_size: int):
         """
@@ -20,6 +27,7 @@ class Multiplex(callback.Callback):
         super().__init__()
         self._block_size = block_size
         self._channels = channels
+        self._pool = buffer.pool(block_size * channels)
         self._current_sample = None
         self._input_lock = threading.Lock()
         self._inputs = {}
@@ -41,7 +49,7 @@ class Multiplex(callback.Callback):
         :param start_channel:  The channel to play the input to on the output
         """
         channels = source.channels
-        if start_channel < 0 or start_channel + channels >= self._channels:
+        if start_channel < 0 or start_channel + channels > self._channels:
             raise Exception("Start channel out of the range for the output device")
         for input_device in self._inputs.values():
             in_start = input_device.start_channel
@@ -73,7 +81,7 @@ class Multiplex(callback.Callback):
         :return:  The completed input block
         """
         completed_sample = self._current_sample
-        self._current_sample = numpy.zeros(self._block_size * self._channels, numpy.int16)
+        self._current_sample = self._pool.zeros()
         return completed_sample
 
     def _get_input(self, source) -> Input:
@@ -36,6 +36,7 @@ class OutputDevice(callback.Callback):
         self._output_queue = queue.Queue(maxsize=16)
         self._name = name
         self._started = False
+        self._xruns = 0
 
     @property
     def name(self) -> str:
@@ -45,6 +46,39 @@ class OutputDevice(callback.Callback):
         """
         return self._name
 
+    @property
+    def xruns(self) -> int:
+        """
+        Get the number of times the stream has reported an overflow or underflow
+        :return:  The number of xruns since the device was opened
+        """
+        return self._xruns
+
+    @property
+    def samplerate(self) -> float:
+        """
+        Get the sample rate that the device is playing at
+        :return:  The sample rate in Hz
+        """
+        return self._stream.samplerate
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Get the number of blocks waiting to be played
+        :return:  The number of queued blocks
+        """
+        return self._output_queue.qsize()
+
+    @property
+    def latency(self) -> float:
+        """
+        Get the time between a block being passed to this output and it being heard
+        :return:  The latency in seconds including the queued blocks
+        """
+        queued = self._output_queue.qsize() * self._block_size // self._channels
+        return self._stream.latency + queued / self._stream.samplerate
+
     @property
     def input(self):
         """
@@ -101,6 +135,7 @@ class OutputDevice(callback.Callback):
         :param status:  The current status string or None if no error
         """
         if status:
+            self._xruns += 1
             print(status, file=sys.stderr)
         frames *= self._channels
         data = numpy.zeros(0, numpy.int16)
@@ -1,5 +1,7 @@
 import os.path
+import typing
 import datetime
+from . import clock
 from . import mp3
 
 
@@ -10,18 +12,29 @@ class RollingFile(object):
 
     ROLL_TIME_SECONDS = 60 * 60
 
-    def __init__(self, base_path: str, quality: int = 7, bitrate: int = 64):
+    def __init__(self, base_path: str, quality: int = 7, bitrate: int = 64,
+                 clock_source: typing.Optional[clock.Clock] = None):
         """
         Create a new rolling file output
         :param base_path:  The path to add the time to which is recorded to
+        :param clock_source:  The clock that names and rolls the files, real time by default
         """
         self._base = base_path
+        self._clock = clock.wall if clock_source is None else clock_source
         self._current_file = None
         self._start_time = None
         self._source = None
         self._output = mp3.Mp3(quality, bitrate)
         self._output.add_callback(self._write_file)
 
+    @property
+    def encoder(self) -> mp3.Mp3:
+        """
+        Get the encoder that the audio passes through
+        :return:  The MP3 encoder
+        """
+        return self._output
+
     @property
     def base_path(self) -> str:
         """
@@ -79,7 +92,7 @@ class RollingFile(object):
         """
         Create a filename for the file and open it ready to write to
         """
-        now = datetime.datetime.now()
+        now = datetime.datetime.fromtimestamp(self._clock.now())
         timestamp = now.strftime('_%Y%m%d-%H%M%S')
         filename, ext = os.path.splitext(os.path.basename(self.base_path))
         if ext.lower() != '.mp3':
@@ -96,7 +109,7 @@ class RollingFile(object):
         """
         if self._current_file is None:
             self._open_file()
-        elif datetime.datetime.now() - self._start_time > datetime.timedelta(seconds=self.ROLL_TIME_SECONDS):
+        elif datetime.datetime.fromtimestamp(self._clock.now()) - self._start_time > datetime.timedelta(seconds=self.ROLL_TIME_SECONDS):
             self._output.input = None
             self._output.close()
             self._current_file.close()
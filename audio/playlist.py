@@ -1,6 +1,8 @@
 import numpy
 import typing
+import threading
 from . import callback
+from . import clock
 from . import file
 
 
@@ -9,14 +11,21 @@ class Playlist(callback.Callback):
     A class that requests the next file when the last has finished, when provided, wraps in a audio.file.File.
     """
 
-    def __init__(self, blocks: int):
+    def __init__(self, blocks: int, clock_source: typing.Optional[clock.Clock] = None):
         """
         Create a new empty playlist
         :param blocks:  The block size to use
+        :param clock_source:  The clock to pace the files by, real time by default
         """
         super().__init__()
+        self._clock = clock_source
         self._callback = None
         self._file = None
+        self._next = None
+        # Guards handing the prepared file over, prepare runs on a background thread
+        self._next_lock = threading.Lock()
+        # Counts the times set_file has taken or replaced the prepared file
+        self._next_taken = 0
         self._paused = False
         self._blocks = blocks
 
@@ -35,19 +44,68 @@ class Playlist(callback.Callback):
         """
         self._callback = callback
 
-    def set_file(self, filename: str) -> None:
+    @property
+    def gain(self) -> float:
+        """
+        Get the gain of the file that is currently playing
+        :return:  The linear gain for a mixer to apply
+        """
+        current = self._file
+        return 1.0 if current is None else current.gain
+
+    def set_file(self, filename: typing.Optional[str], gain: float = 1.0,
+                 cue_in: float = 0.0, cue_out: typing.Optional[float] = None) -> None:
         """
         Set the current playback file, replacing the current one and start it playing
-        :param filename:  The file to set as playing
+        :param filename:  The file to set as playing or None to stop playing
+        :param gain:  The linear gain to play the file with, such as to normalise its loudness
+        :param cue_in:  The time in seconds to start the file from, such as to skip silence at the start
+        :param cue_out:  The time in seconds to end the file at, the end of the file if None
         """
         if self._file is not None:
             self.stop()
-        self._file = file.File(filename, self._blocks)
+        if filename is None:
+            self._file = None
+            return
+        with self._next_lock:
+            prepared, self._next = self._next, None
+            self._next_taken += 1
+        if prepared is not None and prepared.path == filename:
+            self._file = prepared
+        else:
+            if prepared is not None:
+                prepared.close()
+            self._file = file.File(filename, self._blocks, self._clock)
+        self._file.gain = gain
+        self._file.set_cues(cue_in, cue_out)
         self._file.add_callback(self._forward)
         self._file.set_end_callback(self._next_file)
         if not self._paused:
             self._file.play()
 
+    def prepare(self, filename: str, cue_in: float = 0.0) -> None:
+        """
+        Open and start decoding the file that is expected to be set next so that it can start
+        without a gap, this blocks while the decoder starts so shouldn't be called on the audio thread
+        :param filename:  The file that will be played next
+        :param cue_in:  The time in seconds the file will start from
+        """
+        with self._next_lock:
+            if self._next is not None and self._next.path == filename:
+                return
+            taken = self._next_taken
+        prepared = file.File(filename, self._blocks, self._clock)
+        prepared.set_cues(cue_in)
+        prepared.preload()
+        with self._next_lock:
+            if taken != self._next_taken:
+                # The file was set while this was decoding, so this one is out of date
+                previous = prepared
+            else:
+                previous, self._next = self._next, prepared
+        if previous is not None:
+            previous.close()
+
     def current_time(self) -> float:
         """
         Get the number of seconds into the current file
@@ -0,0 +1,338 @@
+import sys
+import json
+import math
+import wave
+import typing
+import os.path
+import tempfile
+import threading
+import concurrent.futures
+import audioread
+from . import clock
+from . import file
+from . import mixer
+from . import mp3
+
+
+# The formats that can be rendered to
+FORMATS = ('mp3', 'wav')
+
+
+class Decoded(object):
+    """
+    A track that has been decoded ready to mix and where it is placed in the render
+    """
+
+    __slots__ = (
+        'path', 'gain', 'channels', 'samplerate', 'frames', 'cue_in', 'lead', 'start', 'fade_in', 'fade_out'
+    )
+
+    def __init__(self, path: str, gain: float, channels: int, samplerate: int, frames: int):
+        self.path = path
+        self.gain = gain
+        self.channels = channels
+        self.samplerate = samplerate
+        # The frames played, from the cue in to the cue out
+        self.frames = frames
+        self.cue_in = 0
+        # The frames played before the next track can start
+        self.lead = frames
+        self.start = 0
+        self.fade_in = 0
+        self.fade_out = 0
+
+    def set_cues(self, cue_in: typing.Optional[float], cue_out: typing.Optional[float],
+                 segue: typing.Optional[float]) -> None:
+        """
+        Only play the part of the track between its cue points
+        :param cue_in:  The time in seconds the sound starts, the start of the file if None
+        :param cue_out:  The time in seconds the sound ends, the end of the file if None
+        :param segue:  The time in seconds the next track can start, the cue out if None
+        """
+        end = self.frames if cue_out is None else min(self.frames, int(round(cue_out * self.samplerate)))
+        self.cue_in = 0 if cue_in is None else min(end, int(round(cue_in * self.samplerate)))
+        segue = end if segue is None else min(end, max(self.cue_in, int(round(segue * self.samplerate))))
+        self.frames = end - self.cue_in
+        self.lead = segue - self.cue_in
+
+    def volume(self, offset: int) -> float:
+        """
+        Get the volume of the track with its crossfades applied
+        :param offset:  The number of frames into the track
+        :return:  The volume between 0 and 1
+        """
+        volume = 1.0
+        if self.fade_in and offset < self.fade_in:
+            volume *= math.sin(0.5 * math.pi * max(offset, 0) / self.fade_in)
+        if self.fade_out and offset > self.frames - self.fade_out:
+            volume *= math.sin(0.5 * math.pi * max(self.frames - offset, 0) / self.fade_out)
+        return volume
+
+
+def decode(path: str, destination: str) -> typing.Tuple[int, int, int]:
+    """
+    Decode an audio file to a WAV file, this is run in a worker process
+    :param path:  The audio file to decode
+    :param destination:  The WAV file to write
+    :return:  The number of channels, the sample rate and the number of frames
+    """
+    frames = 0
+    with audioread.audio_open(path) as source:
+        with wave.open(destination, 'wb') as output:
+            output.setnchannels(source.channels)
+            output.setsampwidth(2)
+            output.setframerate(source.samplerate)
+            for buffer in source:
+                output.writeframes(buffer)
+                frames += len(buffer) // (2 * source.channels)
+        return source.channels, source.samplerate, frames
+
+
+def schedule(tracks: typing.List[Decoded], crossfade: int) -> int:
+    """
+    Place each track at the segue point of the one before, overlapping each pair by the crossfade,
+    the track before fades out over whatever it has left to play
+    :param tracks:  The tracks in the order they are played
+    :param crossfade:  The number of frames to overlap each pair of tracks by
+    :return:  The number of frames in the whole render
+    """
+    length = 0
+    previous = None
+    for track in tracks:
+        if previous is not None:
+            # Never fade over more than half of either track
+            overlap = max(0, min(crossfade, previous.frames // 2, track.frames // 2))
+            track.start = previous.start + max(0, previous.lead - overlap)
+            previous.fade_out = previous.start + previous.frames - track.start
+            track.fade_in = overlap
+        length = max(length, track.start + track.frames)
+        previous = track
+    return length
+
+
+class WavWriter(object):
+    """
+    A sink that writes blocks to a WAV file
+    """
+
+    def __init__(self, path: str, channels: int, samplerate: int):
+        """
+        Create the WAV file
+        :param path:  The file to write
+        :param channels:  The number of channels in the blocks
+        :param samplerate:  The sample rate of the blocks
+        """
+        self._file = wave.open(path, 'wb')
+        self._file.setnchannels(channels)
+        self._file.setsampwidth(2)
+        self._file.setframerate(samplerate)
+
+    def __call__(self, _, blocks) -> None:
+        self._file.writeframes(blocks.tobytes())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class Mp3Writer(object):
+    """
+    A sink that encodes blocks to an MP3 file
+    """
+
+    def __init__(self, path: str, source, quality: int = 2, bit_rate: int = 192):
+        """
+        Create the MP3 file and start encoding the source
+        :param path:  The file to write
+        :param source:  The audio to encode
+        :param quality:  The quality to encode at, 2 - best, 7 - fastest
+        :param bit_rate:  The bit rate to encode at
+        """
+        self._file = open(path, 'wb')
+        self._encoder = mp3.Mp3(quality, bit_rate)
+        self._encoder.add_callback(self._write)
+        self._encoder.input = source
+
+    def _write(self, _, data: bytes) -> None:
+        self._file.write(data)
+
+    def close(self) -> None:
+        self._encoder.input = None
+        self._encoder.close()
+        self._file.close()
+
+
+class Renderer(object):
+    """
+    Renders a list of tracks to a file faster than real time, the tracks are decoded in parallel
+    and then played through a mixer and encoder paced by a virtual clock
+    """
+
+    def __init__(self,
+                 tracks: typing.List[typing.Dict],
+                 output: str,
+                 format_: str,
+                 block_size: int,
+                 crossfade: float = 0.0,
+                 workers: typing.Optional[int] = None,
+                 progress: typing.Callable[[str, float], None] = None):
+        """
+        Prepare a render
+        :param tracks:  The tracks in the order they are played, each has a path and optionally a linear gain
+                        and the cue_in, cue_out and segue in seconds
+        :param output:  The file to render to
+        :param format_:  The format to render to, one of FORMATS
+        :param block_size:  The number of frames in each block
+        :param crossfade:  The number of seconds to fade between each pair of tracks
+        :param workers:  The number of processes to decode with, the number of CPUs by default
+        :param progress:  Called with the stage and the fraction of it that is done
+        """
+        if format_ not in FORMATS:
+            raise ValueError('Unknown format ' + format_)
+        self._tracks = tracks
+        self._output = output
+        self._format = format_
+        self._block_size = block_size
+        self._crossfade = crossfade
+        self._workers = workers
+        self._progress = progress if progress is not None else lambda stage, done: None
+        self.skipped = []
+
+    def run(self) -> None:
+        """
+        Render the tracks, skipping any that can't be decoded
+        :raises ValueError:  None of the tracks could be decoded
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            tracks = self._decode(directory)
+            if not tracks:
+                raise ValueError('None of the tracks could be read')
+            self._mix(tracks)
+
+    def _decode(self, directory: str) -> typing.List[Decoded]:
+        """
+        Decode all of the tracks in worker processes
+        :param directory:  The directory to decode them into
+        :return:  The tracks that were decoded in order
+        """
+        self._progress('decode', 0.0)
+        decoded = [None] * len(self._tracks)
+        with concurrent.futures.ProcessPoolExecutor(self._workers) as executor:
+            futures = {
+                executor.submit(decode, path, os.path.join(directory, '{}.wav'.format(i))): i
+                for i, path in enumerate(track['path'] for track in self._tracks)
+            }
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                i = futures[future]
+                track = self._tracks[i]
+                try:
+                    decoded[i] = Decoded(
+                        os.path.join(directory, '{}.wav'.format(i)), track.get('gain', 1.0), *future.result()
+                    )
+                except Exception:
+                    self.skipped.append(track['path'])
+                else:
+                    decoded[i].set_cues(track.get('cue_in'), track.get('cue_out'), track.get('segue'))
+                self._progress('decode', done / len(futures))
+        return [track for track in decoded if track is not None and track.frames > 0]
+
+    def _sink(self, source, samplerate: int):
+        """
+        Create the writer for the output format
+        :param source:  The mixer to write
+        :param samplerate:  The sample rate of the mix
+        :return:  The writer, which has a close method
+        """
+        if self._format == 'wav':
+            writer = WavWriter(self._output, source.channels, samplerate)
+            source.add_callback(writer)
+            return writer
+        return Mp3Writer(self._output, source)
+
+    def _mix(self, tracks: typing.List[Decoded]) -> None:
+        """
+        Play the decoded tracks through a mixer into the output as fast as possible
+        :param tracks:  The decoded tracks
+        """
+        # Tracks aren't resampled, as when they are played live
+        samplerate = tracks[0].samplerate
+        length = schedule(tracks, int(self._crossfade * samplerate))
+        virtual = clock.VirtualClock()
+        mix = mixer.Mixer(self._block_size, 2)
+        sink = self._sink(mix, samplerate)
+        # The driver registers first so it sets the volumes before the tracks send their blocks
+        driver = virtual.register()
+        playing = {}
+        ended = []
+        ended_lock = threading.Lock()
+        pending = list(tracks)
+        blocks = int(math.ceil(length / self._block_size))
+        try:
+            self._progress('mix', 0.0)
+            for block in range(blocks + 1):
+                position = block * self._block_size
+                while pending and pending[0].start <= position:
+                    track = pending.pop(0)
+                    player = file.File(track.path, self._block_size, virtual)
+                    player.gain = track.gain
+                    player.set_cues(track.cue_in / samplerate, (track.cue_in + track.frames) / samplerate)
+                    mix.add_input(player)
+                    mix.set_volume(player, track.volume(0))
+
+                    def finished(track=track):
+                        with ended_lock:
+                            ended.append(track)
+                    player.set_end_callback(finished)
+                    playing[track] = player
+                    player.play()
+                with ended_lock:
+                    finished_tracks, ended[:] = list(ended), []
+                for track in finished_tracks:
+                    player = playing.pop(track)
+                    mix.remove_input(player)
+                    player.close()
+                for track, player in playing.items():
+                    # Each block is sent a block after the time it starts at
+                    mix.set_volume(player, track.volume(position - track.start - self._block_size // 2))
+                self._progress('mix', block / blocks if blocks else 1.0)
+                virtual.wait_until((block + 1) * self._block_size / samplerate, driver)
+        finally:
+            virtual.unregister()
+            for player in playing.values():
+                mix.remove_input(player)
+                player.close()
+            sink.close()
+
+
+def main() -> None:
+    """
+    Read a render from stdin as JSON and report the progress to stdout as a JSON object per line
+    """
+    spec = json.load(sys.stdin)
+    last = {}
+
+    def progress(stage: str, done: float) -> None:
+        # Only report whole percentages so that the reader isn't flooded
+        percent = int(done * 100)
+        if last.get(stage) != percent:
+            last[stage] = percent
+            print(json.dumps({'stage': stage, 'progress': done}), flush=True)
+
+    try:
+        renderer = Renderer(
+            spec['tracks'],
+            spec['output'],
+            spec.get('format', 'mp3'),
+            spec['block_size'],
+            spec.get('crossfade', 0.0),
+            spec.get('workers'),
+            progress
+        )
+        renderer.run()
+    except Exception as e:
+        print(json.dumps({'error': str(e)}), flush=True)
+        raise SystemExit(1)
+    print(json.dumps({'finished': True, 'skipped': renderer.skipped}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
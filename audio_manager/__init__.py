@@ -1,20 +1,42 @@
+import contextlib
 from . import output
 from . import input
 from . import mixer
 from . import live_player
 from . import exception
 from . import persist
+from . import broadcast
+from . import meter
+from . import graph
+from . import metrics
+from . import render
 
 
-def init_app(app):
+def _untimed(name: str) -> contextlib.nullcontext:
+    """
+    The step of restoring when it isn't being timed
+    :param name:  The name of the step
+    :return:  A context manager that does nothing
+    """
+    return contextlib.nullcontext()
+
+
+def init_app(app, step=_untimed):
     """
     Configure the database for the given Flask application and then
     restore all of the data from the database
     :param app:  The Flask application to configure for
+    :param step:  Called with the name of each part of the restore to get a context manager that times it
     """
-    persist.init_app(app)
-    input.Inputs.restore()
-    live_player.LivePlayers.restore()
-    output.Outputs.restore()
-    mixer.Mixers.restore()
-    output.Outputs.restore_inputs()
+    with step('audio database'):
+        persist.init_app(app)
+    with step('inputs'):
+        input.Inputs.restore()
+    with step('live players'):
+        live_player.LivePlayers.restore()
+    with step('outputs'):
+        output.Outputs.restore()
+    with step('mixers'):
+        mixer.Mixers.restore()
+    with step('output inputs'):
+        output.Outputs.restore_inputs()
@@ -0,0 +1,148 @@
+import typing
+import struct
+import threading
+
+
+class Broadcaster(object):
+    """
+    A single periodic sender for the values that change continuously (such as play times and
+    levels), each client subscribes to the keys it is showing and is sent one binary message
+    per tick containing only the values that have changed since it was last sent them
+    """
+
+    # The number of seconds between each check for changed values
+    INTERVAL = 0.1
+    # The format of each value in a message, the index of the key and the value
+    FORMAT = struct.Struct('<Hf')
+
+    # The getter and minimum change to send for each registered key
+    _sources = {}
+    # The index used for each key in messages
+    _indexes = {}
+    # The keys subscribed to by each client and the values they were last sent
+    _subscriptions = {}
+    _lock = threading.Lock()
+    _started = False
+
+    @classmethod
+    def register(cls, key: str, getter: typing.Callable[[], float], resolution: float = 0.0) -> None:
+        """
+        Add a value that can be subscribed to
+        :param key:  The name of the value
+        :param getter:  A function that gets the current value, this must not block
+        :param resolution:  The change required before the value is sent again
+        """
+        with cls._lock:
+            cls._sources[key] = (getter, resolution)
+
+    @classmethod
+    def unregister(cls, key: str) -> None:
+        """
+        Remove a value that can be subscribed to
+        :param key:  The name of the value
+        """
+        with cls._lock:
+            cls._sources.pop(key, None)
+
+    @classmethod
+    def _index(cls, key: str) -> int:
+        """
+        Get the index for a key, assigning one if it doesn't have one yet
+        :param key:  The key to get the index of
+        :return:  The index of the key in messages
+        """
+        index = cls._indexes.get(key)
+        if index is None:
+            index = len(cls._indexes)
+            if index > 0xffff:
+                raise ValueError('Too many keys to broadcast')
+            cls._indexes[key] = index
+        return index
+
+    @classmethod
+    def subscribe(cls, sid: str, keys: typing.Iterable[str]) -> typing.Dict[str, int]:
+        """
+        Start sending values to a client, the keys don't need to be registered yet
+        :param sid:  The SocketIO session of the client
+        :param keys:  The keys to send
+        :return:  The index used in messages for each of the keys
+        """
+        with cls._lock:
+            subscription = cls._subscriptions.setdefault(sid, {})
+            indexes = {}
+            for key in keys:
+                indexes[key] = cls._index(key)
+                # Send the current value on the next tick
+                subscription[key] = None
+            return indexes
+
+    @classmethod
+    def unsubscribe(cls, sid: str, keys: typing.Optional[typing.Iterable[str]] = None) -> None:
+        """
+        Stop sending values to a client
+        :param sid:  The SocketIO session of the client
+        :param keys:  The keys to stop sending or None for all of them
+        """
+        with cls._lock:
+            if keys is None:
+                cls._subscriptions.pop(sid, None)
+                return
+            subscription = cls._subscriptions.get(sid, {})
+            for key in keys:
+                subscription.pop(key, None)
+
+    @classmethod
+    def _collect(cls) -> typing.Dict[str, bytes]:
+        """
+        Find the values that have changed for each client
+        :return:  The message to send to each client that has changes
+        """
+        with cls._lock:
+            wanted = set()
+            for subscription in cls._subscriptions.values():
+                wanted.update(subscription)
+            values = {}
+            for key in wanted:
+                source = cls._sources.get(key)
+                if source is None:
+                    continue
+                try:
+                    values[key] = (float(source[0]()), source[1])
+                except Exception:
+                    continue
+            messages = {}
+            for sid, subscription in cls._subscriptions.items():
+                message = []
+                for key, sent in subscription.items():
+                    if key not in values:
+                        continue
+                    value, resolution = values[key]
+                    if sent is None or abs(value - sent) > resolution:
+                        subscription[key] = value
+                        message.append(cls.FORMAT.pack(cls._indexes[key], value))
+                if message:
+                    messages[sid] = b''.join(message)
+            return messages
+
+    @classmethod
+    def _run(cls, socketio) -> None:
+        """
+        Send the changed values to each of the clients every tick
+        :param socketio:  The SocketIO server to send with
+        """
+        while True:
+            socketio.sleep(cls.INTERVAL)
+            for sid, message in cls._collect().items():
+                socketio.emit('state', message, room=sid)
+
+    @classmethod
+    def start(cls, socketio) -> None:
+        """
+        Start sending values to the subscribed clients
+        :param socketio:  The SocketIO server to send with
+        """
+        with cls._lock:
+            if cls._started:
+                return
+            cls._started = True
+        socketio.start_background_task(cls._run, socketio)
@@ -4,3 +4,10 @@ class InUseException(Exception):
     An exception thrown when trying to delete something that is in use
     """
     pass
+
+
+class CycleException(Exception):
+    """
+    An exception thrown when a connection would make audio loop back on itself
+    """
+    pass
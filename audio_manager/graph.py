@@ -0,0 +1,152 @@
+import typing
+import collections
+from . import exception
+
+
+class Graph(object):
+    """
+    A snapshot of how the inputs, mixers, live players and outputs are connected, audio flows
+    along each edge from the source to the node that it is connected to
+    """
+
+    # A node in the graph
+    Node = collections.namedtuple('Node', ('id', 'type', 'display_name'))
+
+    def __init__(self, nodes: typing.Iterable[Node], edges: typing.Iterable[typing.Tuple[str, str]]):
+        """
+        Create a graph
+        :param nodes:  The nodes in the graph
+        :param edges:  The (source, destination) node IDs of each connection
+        """
+        self._nodes = collections.OrderedDict((node.id, node) for node in nodes)
+        self._edges = [edge for edge in edges if edge[0] in self._nodes and edge[1] in self._nodes]
+        self._destinations = collections.defaultdict(list)
+        self._sources = collections.defaultdict(list)
+        for source, destination in self._edges:
+            self._destinations[source].append(destination)
+            self._sources[destination].append(source)
+
+    @staticmethod
+    def _source_id(source) -> typing.Optional[str]:
+        """
+        Get the node ID of the source of a connection
+        :param source:  The audio object that is connected
+        :return:  The ID of the node or None if it isn't connected or isn't a node
+        """
+        from . import input
+        try:
+            return input.get_input_id(source) or None
+        except ValueError:
+            # Such as the multiplexer that feeds a device split into multiplexed outputs
+            return None
+
+    @classmethod
+    def build(cls) -> 'Graph':
+        """
+        Create a graph from the current nodes and their connections
+        :return:  The graph as it is now
+        """
+        from . import input
+        from . import mixer
+        from . import live_player
+        from . import output
+        nodes = []
+        edges = []
+        for input_ in input.Inputs.get():
+            nodes.append(cls.Node(input_.id, 'input', input_.display_name))
+        for player in live_player.LivePlayers.get():
+            nodes.append(cls.Node(player.id, 'player', player.display_name))
+        for mixer_ in mixer.Mixers.get():
+            nodes.append(cls.Node(mixer_.id, 'mixer', mixer_.display_name))
+            for channel_id in mixer_.mixer.get_channel_ids():
+                source = cls._source_id(mixer_.mixer.get_channel(channel_id).input)
+                if source is not None:
+                    edges.append((source, mixer_.id))
+        for output_ in output.Outputs.get():
+            nodes.append(cls.Node(output_.id, 'output', output_.display_name))
+            source = cls._source_id(output_.output.input)
+            if source is not None:
+                edges.append((source, output_.id))
+            if isinstance(output_.output, output.MultiplexedOutput):
+                parent = output.Outputs.find(output_.output.parent)
+                if parent is not None:
+                    edges.append((output_.id, parent.id))
+        return cls(nodes, edges)
+
+    @property
+    def nodes(self) -> typing.List[Node]:
+        """
+        Get the nodes in the graph
+        :return:  The nodes
+        """
+        return list(self._nodes.values())
+
+    @property
+    def edges(self) -> typing.List[typing.Tuple[str, str]]:
+        """
+        Get the connections in the graph
+        :return:  The (source, destination) node IDs of each connection
+        """
+        return list(self._edges)
+
+    def node(self, node_id: str) -> Node:
+        """
+        Get a node in the graph
+        :param node_id:  The ID of the node
+        :return:  The node
+        :raises KeyError:  The node isn't in the graph
+        """
+        return self._nodes[node_id]
+
+    def sources(self, node_id: str) -> typing.List[str]:
+        """
+        Get the nodes that are connected directly to a node
+        :param node_id:  The ID of the node
+        :return:  The IDs of the nodes that feed it
+        """
+        return list(self._sources[node_id])
+
+    def downstream(self, node_id: str) -> typing.Set[str]:
+        """
+        Find every node that audio from a node reaches
+        :param node_id:  The ID of the node to start from
+        :return:  The IDs of the nodes that it feeds directly or indirectly
+        """
+        found = set()
+        pending = [node_id]
+        while pending:
+            for destination in self._destinations[pending.pop()]:
+                if destination not in found:
+                    found.add(destination)
+                    pending.append(destination)
+        return found
+
+    def check_connection(self, source_id: str, destination_id: str) -> None:
+        """
+        Check that a connection can be made without audio looping back on itself
+        :param source_id:  The ID of the node to connect
+        :param destination_id:  The ID of the node that it is being connected to
+        :raises CycleException:  The connection would create a cycle
+        """
+        if source_id == destination_id or source_id in self.downstream(destination_id):
+            raise exception.CycleException('Connecting that input would create a loop')
+
+    def order(self) -> typing.List[str]:
+        """
+        Get an order to process the nodes in so that each node comes after all of its sources
+        :return:  The IDs of the nodes in processing order
+        :raises CycleException:  The graph contains a cycle
+        """
+        sources = collections.Counter(destination for _, destination in self._edges)
+        ready = collections.deque(node_id for node_id in self._nodes if sources[node_id] == 0)
+        order = []
+        while ready:
+            node_id = ready.popleft()
+            order.append(node_id)
+            for destination in self._destinations[node_id]:
+                sources[destination] -= 1
+                if sources[destination] == 0:
+                    ready.append(destination)
+        if len(order) != len(self._nodes):
+            raise exception.CycleException('The audio graph contains a loop')
+        return order
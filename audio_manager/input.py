@@ -3,7 +3,9 @@ import uuid
 import audio
 import settings
 from . import exception
+from . import meter
 from . import persist
+from . import registry
 
 
 class Input(object):
@@ -36,12 +38,23 @@ class Input(object):
         return self._input
 
 
+def _input_keys(input_: Input) -> typing.List[typing.Tuple[str, str]]:
+    """
+    Get the typed keys that an input can be found by
+    :param input_:  The input to get the keys for
+    :return:  The keys for the input
+    """
+    if audio.is_instance(input_.input, 'input_device', 'InputDevice'):
+        return [('device', input_.input.name)]
+    return []
+
+
 class Inputs(object):
     """
     A list of the created inputs in this process
     """
 
-    _inputs = []
+    _inputs = registry.Registry(lambda x: x.input, _input_keys)
 
     @classmethod
     def get(cls) -> typing.List[Input]:
@@ -49,7 +62,7 @@ class Inputs(object):
         Get the current inputs
         :return:  The list of inputs
         """
-        return cls._inputs
+        return cls._inputs.list()
 
     @classmethod
     def add_input(cls, display_name: str, input_) -> Input:
@@ -60,7 +73,7 @@ class Inputs(object):
         :return:  The newly created input instance
         """
         input_ = Input(str(uuid.uuid4()), display_name, input_)
-        cls._inputs.append(input_)
+        cls._inputs.add(input_)
         session = persist.db.session
         session.add(persist.Input(
             id=input_.id,
@@ -79,10 +92,16 @@ class Inputs(object):
         :return:  The found Input instance
         :raises ValueError:  The device is not found
         """
-        try:
-            return next(x for x in cls._inputs if x.input is input_ or x.id == input_)
-        except StopIteration:
-            raise ValueError('No such device found')
+        return cls._inputs.get(input_)
+
+    @classmethod
+    def find(cls, input_: typing.Union[typing.Any, str]) -> typing.Optional[Input]:
+        """
+        Find the Input class for the given input
+        :param input_:  The input or input ID
+        :return:  The found Input instance or None if there isn't one
+        """
+        return cls._inputs.find(input_)
 
     @classmethod
     def get_input_device(cls, name: str) -> Input:
@@ -92,12 +111,7 @@ class Inputs(object):
         :return:  The found Input instance
         :raises ValueError:  The device is not found
         """
-        try:
-            return next(x for x in cls._inputs
-                        if isinstance(x.input, audio.input_device.InputDevice) and
-                        x.input.name == name)
-        except StopIteration:
-            raise ValueError('No such device found')
+        return cls._inputs.get_typed(('device', name))
 
     @classmethod
     def delete_input(cls, input_: Input) -> None:
@@ -107,6 +121,8 @@ class Inputs(object):
         :raises InUseException:  The output is in use
         :raises ValueError:  The output doesn't exist
         """
+        # Meters aren't outputs, they shouldn't stop it being deleted
+        meter.Meters.release_source(input_.input)
         if input_.input.has_callbacks():
             raise exception.InUseException('Input has current outputs')
         cls._inputs.remove(input_)
@@ -124,7 +140,28 @@ class Inputs(object):
             if sql_input.type == persist.InputTypes.device:
                 input_object = audio.input_device.InputDevice(sql_input.parameters, settings.BLOCK_SIZE)
             input_ = Input(sql_input.id, sql_input.display_name, input_object)
-            cls._inputs.append(input_)
+            cls._inputs.add(input_)
+
+
+def _find_source(key) -> typing.Tuple[str, typing.Any]:
+    """
+    Find an input device, mixer or live player that can be used as an input
+    :param key:  The ID of the source or the audio object for it
+    :return:  The ID of the source and its audio object
+    :raises ValueError:  No such input found
+    """
+    from . import mixer
+    from . import live_player
+    node = Inputs.find(key)
+    if node is not None:
+        return node.id, node.input
+    node = mixer.Mixers.find(key)
+    if node is not None:
+        return node.id, node.mixer
+    node = live_player.LivePlayers.find(key)
+    if node is not None:
+        return node.id, node.playlist
+    raise ValueError('No such input found')
 
 
 def get_input(input_id: str):
@@ -137,19 +174,7 @@ def get_input(input_id: str):
     # An empty ID means set it to nothing
     if input_id == '':
         return None
-    # Look for a device input first
-    try:
-        return Inputs.get_input(input_id).input
-    except ValueError:
-        pass
-    from . import mixer
-    # Look for another mixer next
-    try:
-        return mixer.Mixers.get_mixer(input_id).mixer
-    except ValueError:
-        pass
-    from . import live_player
-    return live_player.LivePlayers.get_player(input_id).playlist
+    return _find_source(input_id)[1]
 
 
 def get_input_id(input_) -> str:
@@ -162,16 +187,4 @@ def get_input_id(input_) -> str:
     # An empty ID means set it to nothing
     if input_ is None:
         return ''
-    # Look for a device input first
-    try:
-        return Inputs.get_input(input_).id
-    except ValueError:
-        pass
-    from . import mixer
-    # Look for another mixer next
-    try:
-        return mixer.Mixers.get_mixer(input_).id
-    except ValueError:
-        pass
-    from . import live_player
-    return live_player.LivePlayers.get_player(input_).id
+    return _find_source(input_)[0]
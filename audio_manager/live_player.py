@@ -5,47 +5,70 @@ import settings
 import flask
 import threading
 from . import exception
+from . import broadcast
+from . import meter
+from . import registry
 
 
 class LivePlayer(object):
 
+    # The change in the play time in seconds before clients are sent it
+    TIME_RESOLUTION = 0.5
+
     def __init__(self, player: library.live_player.LivePlayer):
         self._player = player
         self._playlist = audio.playlist.Playlist(settings.BLOCK_SIZE)
         self._playlist.set_next_callback(self._track_finished)
-        self._update_event = None
+        # The jingle chosen to play next and the jingle that is currently playing
+        self._next_jingle = None
+        self._playing_jingle = None
+        # Guards the jingles, which are used by the audio thread and the prepare thread
+        self._jingle_lock = threading.Lock()
+        # Counts the times a chosen jingle has been put in the player
+        self._jingles_taken = 0
         if self._player.state == library.database.LivePlayerState.paused:
             self._playlist.pause()
-        else:
-            self._start_thread()
+        broadcast.Broadcaster.register(
+            'player_time_' + self.id, self._playlist.current_time, self.TIME_RESOLUTION
+        )
         self._app = flask.current_app._get_current_object()
         current = self._player.current_track()
         if current is not None:
             self._play_track(current[0])
 
-    def _start_thread(self):
-        self._update_event = threading.Event()
-        socketio = flask.current_app.extensions['socketio']
-        socketio.start_background_task(self._update_time, socketio)
-
-    def _stop_thread(self):
-        if self._update_event is not None:
-            self._update_event.set()
-
-    def _update_time(self, socketio):
-        while not self._update_event.wait(1):
-            socketio.emit(
-                'player_tracktime_' + str(self._player.id), self._playlist.current_time()
-            )
-        self._update_event = None
+    def _jingle_due(self, plays: int) -> bool:
+        """
+        Check whether a jingle should be played after a number of tracks
+        :param plays:  The number of tracks that will have been played since the last jingle
+        :return:  True if a jingle should be played
+        """
+        count = self._player.jingle_count
+        return bool(count) and self._player.jingle_playlist_id is not None and plays >= count
 
     def _track_finished(self):
-        # TODO: Handle jingle playing
+        # This is called from the audio thread so only uses the in-memory player state
         with self._app.app_context():
             current = self._player.current_track()
             if current[1] == library.database.LivePlayerType.loop:
                 self._play_track(current[0])
-            elif current[1] == library.database.LivePlayerType.play_next:
+                return
+            jingle = None
+            with self._jingle_lock:
+                finished_jingle = self._playing_jingle == current[0]
+                if finished_jingle:
+                    self._playing_jingle = None
+                else:
+                    plays = self._player.jingle_plays + 1
+                    if self._jingle_due(plays) and self._next_jingle is not None:
+                        jingle, self._next_jingle = self._next_jingle, None
+                        self._playing_jingle = jingle
+                        self._jingles_taken += 1
+                        plays = 0
+            if not finished_jingle:
+                if jingle is not None:
+                    self._player.insert_tracks(1, [(jingle, library.database.LivePlayerType.play_next)])
+                self._player.jingle_plays = plays
+            if current[1] == library.database.LivePlayerType.play_next:
                 self._play_next()
             else:
                 self._playlist.pause()
@@ -60,18 +83,64 @@ class LivePlayer(object):
 
     def set_state(self, state: library.database.LivePlayerState):
         if state == library.database.LivePlayerState.playing:
-            if self._update_event is None:
-                self._start_thread()
             self._playlist.play()
         else:
-            if self._update_event is not None:
-                self._stop_thread()
             self._playlist.pause()
 
+    @staticmethod
+    def gain(track: library.tracks.Track) -> float:
+        """
+        Get the gain to play a track at the target loudness
+        :param track:  The track to play
+        :return:  The linear gain, 1.0 if it hasn't been analysed or normalisation is off
+        """
+        if settings.LOUDNESS_TARGET is None:
+            return 1.0
+        return library.analysis.gain(
+            track.loudness, track.true_peak, settings.LOUDNESS_TARGET, settings.TRUE_PEAK_CEILING
+        )
+
     def _play_track(self, track_id: int):
         track = library.tracks.Track(track_id)
         track.record_play()
-        self._playlist.set_file(track.location)
+        self._playlist.set_file(track.location, self.gain(track), track.cue_in or 0.0, track.cue_out)
+        threading.Thread(target=self._prepare_next, daemon=True).start()
+
+    def _prepare_next(self):
+        """
+        Choose the next jingle if one will be due and start decoding whatever will play next,
+        this runs in the background so the database is never used from the audio thread
+        """
+        with self._app.app_context():
+            current = self._player.current_track()
+            if current is None:
+                return
+            next_track = None
+            if current[1] == library.database.LivePlayerType.loop:
+                next_track = current[0]
+            else:
+                with self._jingle_lock:
+                    due = current[0] != self._playing_jingle and self._jingle_due(self._player.jingle_plays + 1)
+                    next_track = self._next_jingle if due else None
+                    taken = self._jingles_taken
+                jingles = self._player.jingle_playlist if due and next_track is None else None
+                if jingles is not None:
+                    chosen = jingles.least_recently_played()
+                    with self._jingle_lock:
+                        # The choice is out of date if the audio thread put a jingle in meanwhile
+                        if taken == self._jingles_taken and self._next_jingle is None:
+                            self._next_jingle = chosen
+                        next_track = self._next_jingle
+            if next_track is None:
+                tracks = self._player.tracks
+                next_track = tracks[1][0] if len(tracks) > 1 else None
+            if next_track is not None:
+                try:
+                    track = library.tracks.Track(next_track)
+                    self._playlist.prepare(track.location, track.cue_in or 0.0)
+                except Exception:
+                    # The track will be opened again when it is played
+                    pass
 
     def set_track(self, track_id: int):
         self._playlist.set_next_callback(None)
@@ -100,7 +169,15 @@ class LivePlayers(object):
     A class to handle all the current LivePlayer objects
     """
 
-    _players = []
+    _players = registry.Registry(lambda x: x.playlist, message='No such player found')
+
+    @classmethod
+    def get(cls) -> typing.List[LivePlayer]:
+        """
+        Get the current players
+        :return:  The list of players
+        """
+        return cls._players.list()
 
     @classmethod
     def add(cls, player: library.live_player.LivePlayer):
@@ -108,7 +185,7 @@ class LivePlayers(object):
         Add a player to the list of players
         :param player:  The player to add
         """
-        cls._players.append(LivePlayer(player))
+        cls._players.add(LivePlayer(player))
 
     @classmethod
     def remove(cls, player: library.live_player.LivePlayer):
@@ -116,10 +193,14 @@ class LivePlayers(object):
         Remove a player from the list of players
         :param player:  The player to remove
         """
-        player_wrapper = next(x for x in cls._players if x.player is player)
+        # The library may have created a new instance for the same player so look it up by ID
+        player_wrapper = cls._players.get(str(player.id))
+        # Meters aren't outputs, they shouldn't stop it being deleted
+        meter.Meters.release_source(player_wrapper.playlist)
         if player_wrapper.playlist.has_callbacks():
             raise exception.InUseException('Input has current outputs')
         cls._players.remove(player_wrapper)
+        broadcast.Broadcaster.unregister('player_time_' + player_wrapper.id)
 
     @classmethod
     def restore(cls):
@@ -127,7 +208,7 @@ class LivePlayers(object):
         Restore the live players in the persistence database
         """
         for player in library.live_player.LivePlayer.list():
-            cls._players.append(LivePlayer(player))
+            cls._players.add(LivePlayer(player))
 
     @classmethod
     def get_player(cls, player: typing.Union[LivePlayer, str]) -> LivePlayer:
@@ -137,7 +218,13 @@ class LivePlayers(object):
         :return:  The found LivePlayer instance
         :raises ValueError:  The player is not found
         """
-        try:
-            return next(x for x in cls._players if x.playlist is player or str(x.id) == player)
-        except StopIteration:
-            raise ValueError('No such player found')
+        return cls._players.get(player)
+
+    @classmethod
+    def find(cls, player: typing.Union[LivePlayer, str]) -> typing.Optional[LivePlayer]:
+        """
+        Find the LivePlayer class for the given playlist
+        :param player:  The player or player ID
+        :return:  The found LivePlayer instance or None if there isn't one
+        """
+        return cls._players.find(player)
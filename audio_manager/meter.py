@@ -0,0 +1,200 @@
+import typing
+import threading
+import collections
+import audio
+from . import broadcast
+
+
+class Meter(object):
+    """
+    A meter attached to an input, mixer, player or output that publishes its levels
+    """
+
+    # The change in a level in dB before clients are sent it
+    RESOLUTION = 0.5
+    # The levels that are published for each channel
+    LEVELS = ('peak', 'rms', 'true_peak')
+
+    def __init__(self, id_: str, source):
+        """
+        Start metering a source
+        :param id_:  The ID of the input, mixer, player or output being metered
+        :param source:  The source of the audio
+        """
+        self._id = id_
+        self.source = source
+        self._meter = audio.meter.Meter()
+        self._meter.input = source
+        # The number of times each client session is using the meter, None for clients without one
+        self.sessions = collections.Counter()
+        self._register()
+
+    def _register(self) -> None:
+        """
+        Publish the levels of each channel of the source
+        """
+        getters = {
+            'peak': self._meter.current_peak,
+            'rms': self._meter.current_rms,
+            'true_peak': self._meter.current_true_peak
+        }
+        for channel in range(self._meter.channels):
+            for level in self.LEVELS:
+                broadcast.Broadcaster.register(
+                    self.key(channel, level), self._getter(getters[level], channel), self.RESOLUTION
+                )
+
+    def _unregister(self) -> None:
+        """
+        Stop publishing the levels
+        """
+        for channel in range(self._meter.channels):
+            for level in self.LEVELS:
+                broadcast.Broadcaster.unregister(self.key(channel, level))
+
+    @staticmethod
+    def _getter(levels: typing.Callable, channel: int) -> typing.Callable[[], float]:
+        """
+        Create a getter for a level of a single channel
+        :param levels:  The function to get the level for all channels
+        :param channel:  The channel to get the level for
+        :return:  A function that gets the level of the channel
+        """
+        return lambda: levels()[channel]
+
+    def key(self, channel: int, level: str) -> str:
+        """
+        Get the broadcast key for a level of a channel
+        :param channel:  The channel
+        :param level:  The type of level
+        :return:  The key that the level is published with
+        """
+        return 'meter_{}_{}_{}'.format(self._id, channel, level)
+
+    @property
+    def channels(self) -> int:
+        """
+        Get the number of channels being metered
+        :return:  The number of channels
+        """
+        return self._meter.channels
+
+    def rebind(self, source) -> None:
+        """
+        Meter a different source, such as when the input of an output being metered changes
+        :param source:  The new source of the audio, None to stop metering until there is one
+        """
+        # The new source may have a different number of channels
+        self._unregister()
+        self.source = source
+        self._meter.input = source
+        self._register()
+
+    def close(self) -> None:
+        """
+        Stop metering the source
+        """
+        self._unregister()
+        self._meter.input = None
+
+
+class Meters(object):
+    """
+    A static manager for the meters that clients are using, each source only has one meter
+    however many clients are showing it
+    """
+
+    _meters = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _get_source(id_: str):
+        """
+        Find the audio for an input, mixer, player or output
+        :param id_:  The ID to find the audio for
+        :return:  The source of the audio, for an output this is its input
+        :raises ValueError:  No such source found
+        """
+        from . import input
+        from . import output
+        try:
+            return input.get_input(id_)
+        except ValueError:
+            pass
+        source = output.Outputs.get_output(id_).output.input
+        if source is None:
+            raise ValueError('Output has no input to meter')
+        return source
+
+    @classmethod
+    def attach(cls, id_: str, session: typing.Optional[str] = None) -> Meter:
+        """
+        Start metering a source, or use its existing meter
+        :param id_:  The ID of the input, mixer, player or output to meter
+        :param session:  The SocketIO session of the client, its uses are released when it disconnects
+        :return:  The meter for the source
+        :raises ValueError:  No such source found
+        """
+        with cls._lock:
+            meter = cls._meters.get(id_)
+            if meter is None:
+                meter = Meter(id_, cls._get_source(id_))
+                cls._meters[id_] = meter
+            meter.sessions[session] += 1
+            return meter
+
+    @classmethod
+    def detach(cls, id_: str, session: typing.Optional[str] = None) -> None:
+        """
+        Stop using a meter, it stops metering when it is no longer used
+        :param id_:  The ID of the source that was metered
+        :param session:  The SocketIO session of the client that attached it
+        :raises ValueError:  The source is not being metered
+        """
+        with cls._lock:
+            meter = cls._meters.get(id_)
+            if meter is None or meter.sessions[session] <= 0:
+                raise ValueError('Source is not being metered')
+            meter.sessions[session] -= 1
+            if meter.sessions[session] <= 0:
+                del meter.sessions[session]
+            if not meter.sessions:
+                del cls._meters[id_]
+                meter.close()
+
+    @classmethod
+    def release_session(cls, session: str) -> None:
+        """
+        Stop using the meters a client attached, such as when it disconnects without detaching them
+        :param session:  The SocketIO session of the client
+        """
+        with cls._lock:
+            for id_, meter in list(cls._meters.items()):
+                meter.sessions.pop(session, None)
+                if not meter.sessions:
+                    del cls._meters[id_]
+                    meter.close()
+
+    @classmethod
+    def rebind(cls, id_: str, source) -> None:
+        """
+        Move the meter of an output to its new input, if it is being metered
+        :param id_:  The ID of the output
+        :param source:  The new input of the output, None if it has no input
+        """
+        with cls._lock:
+            meter = cls._meters.get(id_)
+            if meter is not None:
+                meter.rebind(source)
+
+    @classmethod
+    def release_source(cls, source) -> None:
+        """
+        Close any meters on a source so that they don't keep it in use, such as before it is deleted
+        :param source:  The audio object of the input, mixer or player
+        """
+        with cls._lock:
+            for id_, meter in list(cls._meters.items()):
+                if meter.source is source:
+                    del cls._meters[id_]
+                    meter.close()
@@ -0,0 +1,187 @@
+import typing
+import audio
+import library
+import settings
+from . import graph
+
+
+def _escape(value: str) -> str:
+    """
+    Escape a label value for the Prometheus text format
+    :param value:  The value to escape
+    :return:  The escaped value
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Exposition(object):
+    """
+    Builds a page of metrics in the Prometheus text exposition format
+    """
+
+    def __init__(self):
+        """
+        Start an empty page
+        """
+        self._lines = []
+
+    def family(self, name: str, type_: str, help_: str) -> None:
+        """
+        Start a metric family
+        :param name:  The name of the metric
+        :param type_:  The Prometheus type, such as counter or gauge
+        :param help_:  The description of the metric
+        """
+        self._lines.append('# HELP {} {}'.format(name, help_))
+        self._lines.append('# TYPE {} {}'.format(name, type_))
+
+    def sample(self, name: str, value: float, **labels: str) -> None:
+        """
+        Add a value to the current metric family
+        :param name:  The name of the metric
+        :param value:  The value
+        :param labels:  The labels for the value
+        """
+        if labels:
+            name += '{' + ','.join(
+                '{}="{}"'.format(key, _escape(label)) for key, label in sorted(labels.items())
+            ) + '}'
+        self._lines.append('{} {}'.format(name, repr(float(value))))
+
+    def text(self) -> str:
+        """
+        Get the page
+        :return:  The metrics in the text format
+        """
+        return '\n'.join(self._lines) + '\n'
+
+
+def _node_objects() -> typing.Dict[int, typing.Tuple[str, typing.Any]]:
+    """
+    Find the node that each audio object belongs to
+    :return:  The ID of the node and the object itself mapped by the id() of the object
+    """
+    from . import input
+    from . import mixer
+    from . import live_player
+    from . import output
+    objects = {}
+
+    def add(node_id: str, audio_object) -> None:
+        if audio_object is not None:
+            objects[id(audio_object)] = (node_id, audio_object)
+
+    for input_ in input.Inputs.get():
+        add(input_.id, input_.input)
+    for mixer_ in mixer.Mixers.get():
+        add(mixer_.id, mixer_.mixer.audio_mixer)
+    for player in live_player.LivePlayers.get():
+        add(player.id, player.playlist)
+    for output_ in output.Outputs.get():
+        add(output_.id, output_.output)
+        # Outputs that encode spend their time in their encoder's callbacks
+        add(output_.id, getattr(output_.output, 'encoder', None))
+    return objects
+
+
+def _device(node: graph.Graph.Node):
+    """
+    Get the audio device for an input or output node
+    :param node:  The node
+    :return:  The InputDevice or OutputDevice, None if it isn't a device
+    """
+    from . import input
+    from . import output
+    if node.type == 'input':
+        device = input.Inputs.get_input(node.id).input
+        return device if audio.is_instance(device, 'input_device', 'InputDevice') else None
+    if node.type == 'output':
+        device = output.Outputs.get_output(node.id).output
+        return device if audio.is_instance(device, 'output_device', 'OutputDevice') else None
+    return None
+
+
+def _input_latency(audio_graph: graph.Graph,
+                   node_id: str,
+                   block_time: float,
+                   found: typing.Dict[str, typing.Optional[float]]) -> typing.Optional[float]:
+    """
+    Find the longest time for audio from an input device to reach a node
+    :param audio_graph:  The audio graph
+    :param node_id:  The ID of the node to find the latency to
+    :param block_time:  The length of a block in seconds
+    :param found:  The latencies already found for nodes
+    :return:  The latency in seconds, None if no input devices feed the node
+    """
+    if node_id in found:
+        return found[node_id]
+    found[node_id] = None
+    node = audio_graph.node(node_id)
+    latency = None
+    if node.type == 'input':
+        device = _device(node)
+        latency = device.latency if device is not None else None
+    else:
+        for source in audio_graph.sources(node_id):
+            source_latency = _input_latency(audio_graph, source, block_time, found)
+            if source_latency is not None and (latency is None or source_latency > latency):
+                latency = source_latency
+        if latency is not None and node.type == 'mixer':
+            # A mixer holds each block until the next one starts
+            latency += block_time
+    found[node_id] = latency
+    return latency
+
+
+def render() -> str:
+    """
+    Collect the metrics for the audio graph and the library
+    :return:  The metrics in the Prometheus text format
+    """
+    page = Exposition()
+    objects = _node_objects()
+
+    # Consumers that aren't part of a node, such as meters, are only labelled with their type
+    timings = [
+        (timing, {'node': objects.get(id(consumer), ('', None))[0], 'consumer': timing.name})
+        for consumer, timing in audio.metrics.timings()
+    ]
+    page.family('audio_callback_seconds_total', 'counter',
+                'Time spent handling blocks, including any callbacks that the handler triggers')
+    for timing, labels in timings:
+        page.sample('audio_callback_seconds_total', timing.seconds, **labels)
+    page.family('audio_callback_blocks_total', 'counter', 'Blocks handled')
+    for timing, labels in timings:
+        page.sample('audio_callback_blocks_total', timing.calls, **labels)
+    page.family('audio_callback_max_seconds', 'gauge', 'The longest time taken to handle a block')
+    for timing, labels in timings:
+        page.sample('audio_callback_max_seconds', timing.maximum, **labels)
+
+    audio_graph = graph.Graph.build()
+    devices = [(node, _device(node)) for node in audio_graph.nodes]
+    devices = [(node, device) for node, device in devices if device is not None]
+    page.family('audio_xruns_total', 'counter', 'Overflows and underflows reported by a device')
+    for node, device in devices:
+        page.sample('audio_xruns_total', device.xruns, node=node.id)
+    page.family('audio_output_queue_depth', 'gauge', 'Blocks waiting to be played by an output device')
+    for node, device in devices:
+        if node.type == 'output':
+            page.sample('audio_output_queue_depth', device.queue_depth, node=node.id)
+    page.family('audio_latency_seconds', 'gauge',
+                'Estimated time for audio from the slowest input device to be heard on an output device')
+    for node, device in devices:
+        if node.type == 'output':
+            latency = _input_latency(audio_graph, node.id, settings.BLOCK_SIZE / device.samplerate, {})
+            if latency is not None:
+                page.sample('audio_latency_seconds', latency + device.latency, node=node.id)
+
+    page.family('library_write_queue_depth', 'gauge', 'Database writes waiting to be applied')
+    page.sample('library_write_queue_depth', library.writer.writer.depth())
+    # A scrape mustn't wait for the scanner, so this can be from the previous scrape
+    status = library.Library.cached_status()
+    if status is not None:
+        page.family('library_scanner_queue_depth', 'gauge', 'File changes waiting to be applied by the scanner')
+        page.sample('library_scanner_queue_depth', status.get('queue_depth', 0))
+        page.family('library_analysis_pending', 'gauge', 'Tracks waiting for loudness analysis')
+        page.sample('library_analysis_pending', status.get('analysis_pending', 0))
+    return page.text()
@@ -1,10 +1,13 @@
 import typing
+import sys
 import audio
 import settings
 import uuid
 import numpy
 from . import exception
+from . import meter
 from . import persist
+from . import registry
 
 
 class Channel(object):
@@ -12,14 +15,16 @@ class Channel(object):
     A channel for a mixer that can have an input assigned to it
     """
 
-    def __init__(self, channel_id: str, mixer: audio.mixer.Mixer):
+    def __init__(self, channel_id: str, mixer: audio.mixer.Mixer, mixer_id: str):
         """
         Create a channel for a given mixer
         :param channel_id:  The ID of this channel for persistence
         :param mixer:  The mixer to create the channel for
+        :param mixer_id:  The ID of the mixer in the audio graph
         """
         self._channel_id = channel_id
         self._mixer = mixer
+        self._mixer_id = mixer_id
         self._volume = 1.0
         self._source = None
 
@@ -36,9 +41,14 @@ class Channel(object):
         """
         Set the input source for this channel
         :param source:  The new input source
+        :raises CycleException:  The source is fed by this mixer
         """
         if self._source is source:
             return
+        from . import input
+        from . import graph
+        if source is not None:
+            graph.Graph.build().check_connection(input.get_input_id(source), self._mixer_id)
         if self._source is not None:
             self._mixer.remove_input(self._source)
             self._source = None
@@ -46,7 +56,6 @@ class Channel(object):
             self._mixer.add_input(source)
             self._source = source
             self._mixer.set_volume(source, self._volume)
-        from . import input
         session = persist.db.session
         channel = session.query(persist.MixerChannel).filter_by(id=self._channel_id).one()
         channel.input = input.get_input_id(source)
@@ -100,6 +109,14 @@ class ChannelMixer(object):
         """
         return self._mixer.channels
 
+    @property
+    def audio_mixer(self) -> audio.mixer.Mixer:
+        """
+        Get the mixer that the channels are mixed by
+        :return:  The underlying mixer
+        """
+        return self._mixer
+
     def get_channel(self, id_: str) -> Channel:
         """
         Get the mixer channel
@@ -134,7 +151,7 @@ class ChannelMixer(object):
         :return:  The new channel ID
         """
         id_ = str(uuid.uuid4())
-        new_channel = Channel(id_, self._mixer)
+        new_channel = Channel(id_, self._mixer, self._mixer_id)
         self._channels[id_] = new_channel
         session = persist.db.session
         session.add(persist.MixerChannel(id=id_, mixer=self._mixer_id, input='', volume=1.0))
@@ -181,10 +198,15 @@ class ChannelMixer(object):
         """
         from . import input
         for channel in channels:
-            new_channel = Channel(channel.id, self._mixer)
+            new_channel = Channel(channel.id, self._mixer, self._mixer_id)
             self._channels[channel.id] = new_channel
             new_channel.volume = channel.volume
-            new_channel.input = input.get_input(channel.input)
+            try:
+                new_channel.input = input.get_input(channel.input)
+            except exception.CycleException:
+                # Saved before loops were prevented, leave the channel empty rather than recurse forever
+                print('Mixer channel {} would create a loop, not restoring its input'.format(channel.id),
+                      file=sys.stderr)
 
 
 class Mixer(object):
@@ -222,11 +244,11 @@ class Mixers(object):
     A list of the created mixers
     """
 
-    _mixers = []
+    _mixers = registry.Registry(lambda x: x.mixer, message='No such mixer found')
 
     @classmethod
     def get(cls) -> typing.List[Mixer]:
-        return cls._mixers
+        return cls._mixers.list()
 
     @classmethod
     def add_mixer(cls, display_name: str, channels: int) -> Mixer:
@@ -239,7 +261,7 @@ class Mixers(object):
         id_ = str(uuid.uuid4())
         mixer = ChannelMixer(id_, channels)
         mixer = Mixer(id_, display_name, mixer)
-        cls._mixers.append(mixer)
+        cls._mixers.add(mixer)
         session = persist.db.session
         sql_mixer = persist.Mixer(id=mixer.id, display_name=display_name, output_channels=channels)
         session.add(sql_mixer)
@@ -254,10 +276,16 @@ class Mixers(object):
         :return:  The found Mixers.Mixer instance
         :raises ValueError:  The mixer is not found
         """
-        try:
-            return next(x for x in cls._mixers if x.mixer is mixer or x.id == mixer)
-        except StopIteration:
-            raise ValueError('No such mixer found')
+        return cls._mixers.get(mixer)
+
+    @classmethod
+    def find(cls, mixer: typing.Union[ChannelMixer, str]) -> typing.Optional[Mixer]:
+        """
+        Find the Mixers.Mixer class for the given mixer
+        :param mixer:  The mixer or mixer ID
+        :return:  The found Mixers.Mixer instance or None if there isn't one
+        """
+        return cls._mixers.find(mixer)
 
     @classmethod
     def delete_mixer(cls, mixer: Mixer) -> None:
@@ -267,6 +295,8 @@ class Mixers(object):
         :raises InUseException:  The mixer output is in use
         :raises ValueError:  The output doesn't exist
         """
+        # Meters aren't outputs, they shouldn't stop it being deleted
+        meter.Meters.release_source(mixer.mixer)
         if mixer.mixer.has_callbacks():
             raise exception.InUseException('Input has current outputs')
         for channel_id in mixer.mixer.get_channel_ids():
@@ -286,6 +316,6 @@ class Mixers(object):
         for sql_mixer in session.query(persist.Mixer).all():
             mixer = ChannelMixer(sql_mixer.id, sql_mixer.output_channels)
             mixer = Mixer(sql_mixer.id, sql_mixer.display_name, mixer)
-            cls._mixers.append(mixer)
+            cls._mixers.add(mixer)
         for mixer in cls._mixers:
             mixer.mixer.restore(session.query(persist.MixerChannel).filter_by(mixer=mixer.id))
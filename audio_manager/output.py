@@ -1,10 +1,15 @@
 import typing
 import uuid
+import threading
+import sys
+import flask
 import audio
 import settings
 import json
 from . import exception
+from . import meter
 from . import persist
+from . import registry
 
 
 class MultiplexedOutput(object):
@@ -13,7 +18,7 @@ class MultiplexedOutput(object):
     """
 
     def __init__(self,
-                 parent: audio.output_device.OutputDevice,
+                 parent: 'audio.output_device.OutputDevice',
                  multiplex: audio.multiplex.Multiplex,
                  channels: int,
                  offset: int):
@@ -47,7 +52,7 @@ class MultiplexedOutput(object):
         return self._offset
 
     @property
-    def parent(self) -> audio.output_device.OutputDevice:
+    def parent(self) -> 'audio.output_device.OutputDevice':
         """
         Get the output device that the multiplexer outputs to
         :return:  The output device
@@ -87,15 +92,18 @@ class MultiplexedOutput(object):
 
 class Output(object):
     """
-    A wrapper around an output for the ID and display name
+    A wrapper around an output for the ID, display name and whether it is up
     """
 
-    __slots__ = ('_id', '_display_name', '_output')
+    __slots__ = ('_id', '_display_name', '_output', 'status', 'error')
 
-    def __init__(self, id_, display_name, output):
+    def __init__(self, id_, display_name, output, status='up'):
         self._id = id_
         self._display_name = display_name
         self._output = output
+        # Whether the output is 'connecting', 'up' or has 'failed' and why it failed
+        self.status = status
+        self.error = None
 
     @property
     def id(self):
@@ -156,6 +164,7 @@ class Output(object):
             input_id = ''
         from . import input
         self._output.input = input.get_input(input_id)
+        meter.Meters.rebind(self._id, self._output.input)
         session = persist.db.session
         entity = session.query(persist.Output).get(self._id)
         if entity is not None:
@@ -164,12 +173,27 @@ class Output(object):
             session.commit()
 
 
+def _output_keys(output: Output) -> typing.List[typing.Tuple[str, str]]:
+    """
+    Get the typed keys that an output can be found by
+    :param output:  The output to get the keys for
+    :return:  The keys for the output
+    """
+    if audio.is_instance(output.output, 'output_device', 'OutputDevice'):
+        return [('device', output.output.name)]
+    if audio.is_instance(output.output, 'icecast', 'Icecast'):
+        return [('icecast', output.output.endpoint)]
+    if audio.is_instance(output.output, 'output_file', 'RollingFile'):
+        return [('file', output.output.base_path)]
+    return []
+
+
 class Outputs(object):
     """
     A static manager for the created outputs for this process
     """
 
-    _outputs = []
+    _outputs = registry.Registry(lambda x: x.output, _output_keys)
 
     @classmethod
     def get(cls) -> typing.List[Output]:
@@ -177,7 +201,7 @@ class Outputs(object):
         Get the list of outputs
         :return:  The list of registered outputs
         """
-        return cls._outputs
+        return cls._outputs.list()
 
     @classmethod
     def add_output(cls, display_name: str, output) -> Output:
@@ -189,13 +213,13 @@ class Outputs(object):
         """
         from . import input
         output = Output(str(uuid.uuid4()), display_name, output)
-        cls._outputs.append(output)
+        cls._outputs.add(output)
         type_ = None
         parameters = None
-        if isinstance(output.output, audio.output_device.OutputDevice):
+        if audio.is_instance(output.output, 'output_device', 'OutputDevice'):
             type_ = persist.OutputTypes.device
             parameters = output.output.name
-        elif isinstance(output.output, audio.icecast.Icecast):
+        elif audio.is_instance(output.output, 'icecast', 'Icecast'):
             type_ = persist.OutputTypes.icecast
             parameters = json.dumps({
                 'endpoint': output.output.endpoint,
@@ -208,7 +232,7 @@ class Outputs(object):
                 'channels': output.output.channels,
                 'offset': output.output.offset
             })
-        elif isinstance(output.output, audio.output_file.RollingFile):
+        elif audio.is_instance(output.output, 'output_file', 'RollingFile'):
             type_ = persist.OutputTypes.file
             parameters = output.output.base_path
         if type_ is not None:
@@ -225,19 +249,16 @@ class Outputs(object):
 
     @classmethod
     def get_output(cls, output: typing.Union[str,
-                                             audio.output_device.OutputDevice,
-                                             audio.icecast.Icecast,
-                                             audio.mp3.Mp3]) -> Output:
+                                             'audio.output_device.OutputDevice',
+                                             'audio.icecast.Icecast',
+                                             'audio.mp3.Mp3']) -> Output:
         """
         Get the Output class for the given output
         :param output:  The output or output ID
         :return:  The found Output instance
         :raises ValueError:  The device is not found
         """
-        try:
-            return next(x for x in cls._outputs if x.output is output or x.id == output)
-        except StopIteration:
-            raise ValueError('No such device found')
+        return cls._outputs.get(output)
 
     @classmethod
     def get_output_device(cls, name: str) -> Output:
@@ -247,12 +268,7 @@ class Outputs(object):
         :return:  The found Output instance
         :raises ValueError:  The device is not found
         """
-        try:
-            return next(x for x in cls._outputs
-                        if isinstance(x.output, audio.output_device.OutputDevice) and
-                        x.output.name == name)
-        except StopIteration:
-            raise ValueError('No such device found')
+        return cls._outputs.get_typed(('device', name))
 
     @classmethod
     def get_output_file(cls, path: str) -> Output:
@@ -262,12 +278,7 @@ class Outputs(object):
         :return:  The found Output instance
         :raises ValueError:  The device is not found
         """
-        try:
-            return next(x for x in cls._outputs
-                        if isinstance(x.output, audio.output_file.RollingFile) and
-                        x.output.base_path == path)
-        except StopIteration:
-            raise ValueError('No such device found')
+        return cls._outputs.get_typed(('file', path))
 
     @classmethod
     def get_icecast_output(cls, endpoint: str) -> Output:
@@ -277,12 +288,7 @@ class Outputs(object):
         :return:  The found Output instance
         :raises ValueError:  The device is not found
         """
-        try:
-            return next(x for x in cls._outputs
-                        if isinstance(x.output, audio.icecast.Icecast) and
-                        x.output.endpoint == endpoint)
-        except StopIteration:
-            raise ValueError('No such device found')
+        return cls._outputs.get_typed(('icecast', endpoint))
 
     @classmethod
     def delete_output(cls, output: Output) -> None:
@@ -304,39 +310,74 @@ class Outputs(object):
                        for x in cls._outputs if isinstance(x.output, MultiplexedOutput)):
                 output.output.parent.input = None
 
+    @staticmethod
+    def _connect(output: Output, endpoint: str, password: str, socketio) -> None:
+        """
+        Connect a restored Icecast output, this is run in the background so that an unreachable server
+        doesn't hold up the others or the server starting
+        :param output:  The output to connect
+        :param endpoint:  The Icecast endpoint to connect to
+        :param password:  The password to authenticate with
+        :param socketio:  The SocketIO server to tell the clients whether it connected
+        """
+        if output.output.connect(endpoint, password):
+            output.status = 'up'
+        else:
+            output.status = 'failed'
+            output.error = 'Unable to connect to Icecast endpoint'
+            print('Unable to connect output {} to {}'.format(output.display_name, endpoint), file=sys.stderr)
+        if socketio is not None:
+            socketio.emit('output_update', {'id': output.id, 'status': output.status, 'error': output.error})
+
     @classmethod
     def restore(cls):
         """
-        Restore the outputs from the database
+        Restore the outputs from the database, the Icecast outputs connect in the background and
+        take their input once they are connected
         """
         session = persist.db.session
         for sql_input in session.query(persist.Output).filter_by(type=persist.OutputTypes.device).all():
-            output_object = audio.output_device.OutputDevice(sql_input.parameters, settings.BLOCK_SIZE)
+            try:
+                output_object = audio.output_device.OutputDevice(sql_input.parameters, settings.BLOCK_SIZE)
+            except Exception as e:
+                # The device may have been unplugged, it is restored again when the server next starts
+                print('Unable to open output device {}: {}'.format(sql_input.parameters, e), file=sys.stderr)
+                continue
             output = Output(sql_input.id, sql_input.display_name, output_object)
-            cls._outputs.append(output)
+            cls._outputs.add(output)
+        socketio = flask.current_app.extensions.get('socketio')
         for sql_input in session.query(persist.Output).filter_by(type=persist.OutputTypes.icecast).all():
-            output_object = audio.icecast.Icecast()
             parameters = json.loads(sql_input.parameters)
-            output_object.connect(parameters['endpoint'], parameters['password'])
-            output = Output(sql_input.id, sql_input.display_name, output_object)
-            cls._outputs.append(output)
+            # The endpoint is known before connecting so that the output can be found by it straight away
+            output_object = audio.icecast.Icecast(endpoint=parameters['endpoint'], password=parameters['password'])
+            output = Output(sql_input.id, sql_input.display_name, output_object, 'connecting')
+            cls._outputs.add(output)
+            threading.Thread(
+                target=cls._connect,
+                args=(output, parameters['endpoint'], parameters['password'], socketio),
+                daemon=True
+            ).start()
+        # The multiplexer that has been created for each parent device
+        multiplexes = {}
         for sql_input in session.query(persist.Output).filter_by(type=persist.OutputTypes.multiplex).all():
             parameters = json.loads(sql_input.parameters)
-            parent = cls.get_output(parameters['parent']).output
-            multiplex = None
-            for other_output in cls._outputs:
-                if isinstance(other_output.output, MultiplexedOutput) and other_output.output.parent is parent:
-                    multiplex = other_output.output.multiplex
+            try:
+                parent = cls.get_output(parameters['parent']).output
+            except ValueError:
+                # The parent device couldn't be opened
+                continue
+            multiplex = multiplexes.get(id(parent))
             if multiplex is None:
                 multiplex = audio.multiplex.Multiplex(parent.channels, settings.BLOCK_SIZE)
                 parent.input = multiplex
+                multiplexes[id(parent)] = multiplex
             output_object = MultiplexedOutput(parent, multiplex, parameters['channels'], parameters['offset'])
             output = Output(sql_input.id, sql_input.display_name, output_object)
-            cls._outputs.append(output)
+            cls._outputs.add(output)
         for sql_input in session.query(persist.Output).filter_by(type=persist.OutputTypes.file).all():
             output_object = audio.output_file.RollingFile(sql_input.parameters)
             output = Output(sql_input.id, sql_input.display_name, output_object)
-            cls._outputs.append(output)
+            cls._outputs.add(output)
 
     @classmethod
     def restore_inputs(cls):
@@ -346,5 +387,6 @@ class Outputs(object):
         get an assertion in the PyAudio core.
         """
         session = persist.db.session
+        inputs = dict(session.query(persist.Output.id, persist.Output.input))
         for output in cls._outputs:
-            output.input = session.query(persist.Output).get(output.id).input
+            output.input = inputs[output.id]
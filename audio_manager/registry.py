@@ -0,0 +1,121 @@
+import typing
+import collections
+
+
+class Registry(object):
+    """
+    The nodes of one type in the audio graph, such as inputs or outputs, indexed by their ID,
+    by the audio object they wrap and by any typed keys (e.g. the name of a device) so that
+    finding a node takes the same time however many there are
+    """
+
+    def __init__(self,
+                 target: typing.Callable[[typing.Any], typing.Any],
+                 keys: typing.Callable[[typing.Any], typing.Iterable[typing.Hashable]] = None,
+                 message: str = 'No such device found'):
+        """
+        Create an empty registry
+        :param target:  A function to get the audio object that a node wraps
+        :param keys:  A function to get the typed keys for a node, such as ('device', name)
+        :param message:  The message for the ValueError raised when a node isn't found
+        """
+        self._target = target
+        self._keys = keys
+        self._message = message
+        # The nodes in the order they were added by ID
+        self._nodes = collections.OrderedDict()
+        # The nodes by the id() of the audio object they wrap
+        self._objects = {}
+        # The nodes by their typed keys
+        self._typed = {}
+
+    def __iter__(self) -> typing.Iterator:
+        """
+        Iterate over the nodes in the order they were added
+        :return:  An iterator of the nodes
+        """
+        return iter(list(self._nodes.values()))
+
+    def __len__(self) -> int:
+        """
+        Get the number of nodes
+        :return:  The number of registered nodes
+        """
+        return len(self._nodes)
+
+    def list(self) -> typing.List:
+        """
+        Get all of the nodes
+        :return:  The nodes in the order they were added
+        """
+        return list(self._nodes.values())
+
+    def add(self, node) -> None:
+        """
+        Register a node
+        :param node:  The node to add, it must have an id property
+        """
+        self._nodes[node.id] = node
+        target = self._target(node)
+        if target is not None:
+            self._objects[id(target)] = node
+        if self._keys is not None:
+            for key in self._keys(node):
+                self._typed[key] = node
+
+    def remove(self, node) -> None:
+        """
+        Remove a node from the registry
+        :param node:  The node to remove
+        :raises ValueError:  The node isn't registered
+        """
+        if self._nodes.get(node.id) is not node:
+            raise ValueError(self._message)
+        del self._nodes[node.id]
+        target = self._target(node)
+        if target is not None:
+            self._objects.pop(id(target), None)
+        if self._keys is not None:
+            for key in self._keys(node):
+                if self._typed.get(key) is node:
+                    del self._typed[key]
+
+    def find(self, key) -> typing.Optional[typing.Any]:
+        """
+        Find a node by its ID or the audio object it wraps
+        :param key:  The ID of the node or the audio object
+        :return:  The node or None if there isn't one
+        """
+        if isinstance(key, str):
+            node = self._nodes.get(key)
+            if node is not None:
+                return node
+        node = self._objects.get(id(key))
+        # Only trust the identity index while the object is still the one the node wraps
+        if node is not None and self._target(node) is key:
+            return node
+        return None
+
+    def get(self, key):
+        """
+        Get a node by its ID or the audio object it wraps
+        :param key:  The ID of the node or the audio object
+        :return:  The node
+        :raises ValueError:  No such node found
+        """
+        node = self.find(key)
+        if node is None:
+            raise ValueError(self._message)
+        return node
+
+    def get_typed(self, key: typing.Hashable):
+        """
+        Get a node by one of its typed keys
+        :param key:  The typed key, such as ('device', name)
+        :return:  The node
+        :raises ValueError:  No such node found
+        """
+        try:
+            return self._typed[key]
+        except KeyError:
+            raise ValueError(self._message)
@@ -0,0 +1,288 @@
+import typing
+import atexit
+import subprocess
+import threading
+import itertools
+import tempfile
+import shutil
+import json
+import sys
+import os.path
+import library
+import settings
+from . import broadcast
+from . import live_player
+from . import registry
+
+
+class RenderJob(object):
+    """
+    A render of a rundown to a file, running in a separate process so that it doesn't take
+    time from the live audio while it goes as fast as it can
+    """
+
+    # The change in progress before clients are sent it
+    PROGRESS_RESOLUTION = 0.01
+    # The share of the progress bar for decoding, the rest is for mixing
+    DECODE_SHARE = 0.3
+
+    def __init__(self, job_id: str, name: str, tracks: typing.List[typing.Dict],
+                 format_: str, crossfade: float, socketio=None):
+        """
+        Create a render job, it is started with start
+        :param job_id:  The ID of the job
+        :param name:  The name to give the rendered file
+        :param tracks:  The path, linear gain and cue points of each track in the order they are played
+        :param format_:  The format to render to, 'mp3' or 'wav'
+        :param crossfade:  The number of seconds to fade between each track
+        :param socketio:  The SocketIO server to tell clients when the job changes state
+        """
+        self.id = job_id
+        self.name = name
+        self.format = format_
+        self._tracks = tracks
+        self._crossfade = crossfade
+        self._socketio = socketio
+        self._directory = tempfile.mkdtemp(prefix='render_')
+        self.path = os.path.join(self._directory, 'render.' + format_)
+        self.state = 'queued'
+        self.error = None
+        self.skipped = []
+        self._stage = None
+        self._stage_progress = 0.0
+        self._process = None
+
+    @property
+    def progress(self) -> float:
+        """
+        Get how much of the render is done
+        :return:  The fraction done between 0 and 1
+        """
+        if self.state == 'finished':
+            return 1.0
+        if self._stage == 'decode':
+            return self.DECODE_SHARE * self._stage_progress
+        if self._stage == 'mix':
+            return self.DECODE_SHARE + (1.0 - self.DECODE_SHARE) * self._stage_progress
+        return 0.0
+
+    def status(self) -> typing.Dict:
+        """
+        Get the state of the job for clients
+        :return:  The state, progress and any error or tracks that couldn't be read
+        """
+        return {
+            'id': self.id,
+            'name': self.name,
+            'format': self.format,
+            'state': self.state,
+            'progress': self.progress,
+            'error': self.error,
+            'skipped': self.skipped,
+        }
+
+    def start(self) -> None:
+        """
+        Start the render process
+        """
+        self._process = subprocess.Popen(
+            [sys.executable, '-m', 'audio.render'],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            universal_newlines=True
+        )
+        self._process.stdin.write(json.dumps({
+            'tracks': self._tracks,
+            'output': self.path,
+            'format': self.format,
+            'block_size': settings.BLOCK_SIZE,
+            'crossfade': self._crossfade,
+        }))
+        self._process.stdin.close()
+        self._set_state('rendering')
+        threading.Thread(target=self._read, args=(self._process, ), daemon=True).start()
+
+    def _set_state(self, state: str) -> None:
+        """
+        Change the state of the job and tell the clients
+        :param state:  The new state
+        """
+        self.state = state
+        if self._socketio is not None:
+            self._socketio.emit('render_update', self.status())
+
+    def _read(self, process: subprocess.Popen) -> None:
+        """
+        Follow the progress reported by the render process until it exits
+        :param process:  The render process
+        """
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if 'stage' in message:
+                self._stage = message['stage']
+                self._stage_progress = message['progress']
+            elif 'error' in message:
+                self.error = message['error']
+            elif message.get('finished'):
+                self.skipped = message.get('skipped', [])
+        process.wait()
+        if self.state == 'cancelled':
+            return
+        if process.returncode == 0:
+            self._set_state('finished')
+        else:
+            if self.error is None:
+                self.error = 'The render stopped unexpectedly'
+            self._set_state('failed')
+
+    def cancel(self) -> None:
+        """
+        Stop the render if it is running and delete the rendered file
+        """
+        if self._process is not None and self._process.poll() is None:
+            self.state = 'cancelled'
+            self._process.kill()
+            self._process.wait()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+
+class RenderJobs(object):
+    """
+    The renders that have been requested since the server started
+    """
+
+    # The number of renders that have ended to keep the files of, the oldest are removed as more are started
+    RETAINED = 10
+
+    _jobs = registry.Registry(lambda x: None, message='No such render found')
+    _ids = itertools.count(1)
+
+    @staticmethod
+    def _player_tracks(player: library.LivePlayer) -> typing.List[library.database.Track]:
+        """
+        Get the tracks that a live player will play, with its jingles put in the way the player would, each track is
+        played once whatever the player would do after it
+        :param player:  The live player
+        :return:  The tracks in order
+        """
+        tracks = [library.tracks.Track(track_id) for track_id, _ in player.tracks]
+        jingles = player.jingle_playlist
+        if not player.jingle_count or jingles is None:
+            return tracks
+        # The player plays the least recently played jingle, which is then the most recent, so it goes through
+        # them from the least recently played preferring those never played, then in the order of the playlist
+        order = {}
+        for track in jingles:
+            order.setdefault(track.id, len(order))
+        played = library.tracks.Tracks.with_last_play(order.keys())
+        jingles = [track for track, last_play in sorted(
+            played, key=lambda x: (x[1] is not None, x[1] or 0, order[x[0].id])
+        )]
+        if not jingles:
+            return tracks
+        rundown = []
+        jingle = itertools.cycle(jingles)
+        plays = player.jingle_plays
+        for i, track in enumerate(tracks, 1):
+            rundown.append(track)
+            plays += 1
+            if plays >= player.jingle_count and i < len(tracks):
+                rundown.append(next(jingle))
+                plays = 0
+        return rundown
+
+    @classmethod
+    def create(cls, name: str, playlist_id: typing.Optional[int] = None, player_id: typing.Optional[int] = None,
+               format_: str = 'mp3', crossfade: float = 0.0, socketio=None) -> RenderJob:
+        """
+        Start rendering a playlist or the rundown of a live player
+        :param name:  The name to give the rendered file
+        :param playlist_id:  The ID of the playlist to render
+        :param player_id:  The ID of the live player to render if there isn't a playlist
+        :param format_:  The format to render to, 'mp3' or 'wav'
+        :param crossfade:  The number of seconds to fade between each track
+        :param socketio:  The SocketIO server to tell clients when the job changes state
+        :return:  The job that was started
+        :raises ValueError:  The playlist or player doesn't exist or there are no tracks to render
+        """
+        if playlist_id is not None:
+            session = library.database.db.session
+            if session.query(library.database.Playlist.id).filter_by(id=playlist_id).count() == 0:
+                raise ValueError('No such playlist found')
+            tracks = list(library.Playlist(playlist_id))
+        else:
+            tracks = cls._player_tracks(library.LivePlayer(player_id))
+        if not tracks:
+            raise ValueError('There are no tracks to render')
+        cls._prune()
+        job = RenderJob(
+            str(next(cls._ids)), name,
+            [
+                {
+                    'path': track.location,
+                    'gain': live_player.LivePlayer.gain(track),
+                    'cue_in': track.cue_in,
+                    'cue_out': track.cue_out,
+                    'segue': track.segue,
+                } for track in tracks
+            ],
+            format_, crossfade, socketio
+        )
+        cls._jobs.add(job)
+        broadcast.Broadcaster.register('render_progress_' + job.id, lambda: job.progress, job.PROGRESS_RESOLUTION)
+        job.start()
+        return job
+
+    @classmethod
+    def get(cls) -> typing.List[RenderJob]:
+        """
+        Get all of the render jobs
+        :return:  The jobs in the order they were created
+        """
+        return cls._jobs.list()
+
+    @classmethod
+    def get_job(cls, job_id: str) -> RenderJob:
+        """
+        Get a render job
+        :param job_id:  The ID of the job
+        :return:  The job
+        :raises ValueError:  No such job
+        """
+        return cls._jobs.get(job_id)
+
+    @classmethod
+    def remove(cls, job_id: str) -> None:
+        """
+        Cancel a render job if it is running and delete its file
+        :param job_id:  The ID of the job
+        :raises ValueError:  No such job
+        """
+        job = cls._jobs.get(job_id)
+        cls._jobs.remove(job)
+        broadcast.Broadcaster.unregister('render_progress_' + job.id)
+        job.cancel()
+
+    @classmethod
+    def _prune(cls) -> None:
+        """
+        Remove the oldest renders that have ended so that the files of only RETAINED of them are kept
+        """
+        ended = [job for job in cls._jobs.list() if job.state in ('finished', 'failed', 'cancelled')]
+        for job in ended[:max(0, len(ended) - cls.RETAINED)]:
+            cls.remove(job.id)
+
+    @classmethod
+    def close(cls) -> None:
+        """
+        Stop all of the renders and delete their files, such as when the server stops
+        """
+        for job in cls._jobs.list():
+            cls.remove(job.id)
+
+
+atexit.register(RenderJobs.close)
@@ -0,0 +1,364 @@
+"""
+Benchmark the audio engine without any audio hardware.
+
+Builds graphs from the mixer, multiplexer, MP3 encoder and file player that are fed by
+synthetic in-memory sources and drained by null sinks, then runs them as fast as possible
+to measure the throughput, the CPU used per second of audio, the memory allocated per block
+and the p99 time to push a block through the graph.  Results can be saved as JSON and
+compared with an earlier run to catch regressions between commits.
+
+Run from the repository root with:
+
+    python -m benchmark.audio_engine [--seconds 60] [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+import typing
+import wave
+import numpy
+import settings
+from audio import callback
+from audio import clock
+from audio import file
+from audio import mixer
+from audio import mp3
+from audio import multiplex
+
+
+# The sample rate of the synthetic audio
+SAMPLE_RATE = 44100
+# The number of rounds to run before measuring
+WARM_UP = 200
+# The most rounds to trace the allocations of, tracing is slow
+TRACED_ROUNDS = 2000
+# The default change in a measurement for the worse that is reported as a regression when comparing
+REGRESSION = 0.1
+
+
+class Synthetic(callback.Callback):
+    """
+    A source that sends the same block of a sine wave each time it is ticked
+    """
+
+    def __init__(self, channels: int, block_size: int, frequency: float):
+        """
+        Generate the block for the source
+        :param channels:  The number of channels to produce
+        :param block_size:  The number of frames in each block
+        :param frequency:  The frequency of the sine wave
+        """
+        super().__init__()
+        self._channels = channels
+        wave_ = numpy.sin(2.0 * numpy.pi * frequency * numpy.arange(block_size) / SAMPLE_RATE) * 8000
+        self._block = numpy.repeat(wave_.astype(numpy.int16), channels)
+
+    @property
+    def channels(self) -> int:
+        return self._channels
+
+    def tick(self) -> None:
+        """
+        Send a block to the callbacks
+        """
+        self.notify_callbacks(self._block)
+
+
+class NullSink(object):
+    """
+    A sink that counts the blocks that it is sent and discards them
+    """
+
+    def __init__(self):
+        self.blocks = 0
+
+    def __call__(self, _, blocks) -> None:
+        self.blocks += 1
+
+
+def _sources(count: int, channels: int) -> typing.List[Synthetic]:
+    """
+    Create synthetic sources with different tones
+    :param count:  The number of sources
+    :param channels:  The number of channels for each source
+    :return:  The sources
+    """
+    return [Synthetic(channels, settings.BLOCK_SIZE, 220.0 * (i + 1)) for i in range(count)]
+
+
+def _round(sources: typing.List[Synthetic]) -> typing.Callable[[], None]:
+    """
+    Create a function that sends one block from each source, a block period of audio
+    :param sources:  The sources to tick
+    :return:  The function
+    """
+    def tick() -> None:
+        for source in sources:
+            source.tick()
+    return tick
+
+
+def build_mixer(sources: int = 8, channels: int = 2) -> typing.Tuple[typing.Callable[[], None], NullSink]:
+    """
+    A stereo mixer fed by several sources
+    :param sources:  The number of sources to mix
+    :param channels:  The number of channels of each source, mono sources are mapped up to stereo
+    :return:  The function to run a round and the sink
+    """
+    inputs = _sources(sources, channels)
+    mix = mixer.Mixer(settings.BLOCK_SIZE, 2)
+    for source in inputs:
+        mix.add_input(source)
+        mix.set_volume(source, 0.5)
+    sink = NullSink()
+    mix.add_callback(sink)
+    return _round(inputs), sink
+
+
+def build_multiplex(sources: int = 4) -> typing.Tuple[typing.Callable[[], None], NullSink]:
+    """
+    Stereo sources split across the channels of a multi-channel device
+    :param sources:  The number of stereo sources
+    :return:  The function to run a round and the sink
+    """
+    inputs = _sources(sources, 2)
+    multiplexer = multiplex.Multiplex(sources * 2, settings.BLOCK_SIZE)
+    for i, source in enumerate(inputs):
+        multiplexer.add_input(source, i * 2)
+    sink = NullSink()
+    multiplexer.add_callback(sink)
+    return _round(inputs), sink
+
+
+def build_mp3(sources: int = 4) -> typing.Tuple[typing.Callable[[], None], NullSink]:
+    """
+    A mixer fanned out to several MP3 encoders, like Icecast, recording and browser outputs
+    :param sources:  The number of sources to mix
+    :return:  The function to run a round and the sink that every encoder feeds
+    """
+    inputs = _sources(sources, 2)
+    mix = mixer.Mixer(settings.BLOCK_SIZE, 2)
+    for source in inputs:
+        mix.add_input(source)
+    sink = NullSink()
+    for _ in range(3):
+        encoder = mp3.Mp3()
+        encoder.input = mix
+        encoder.add_callback(sink)
+    return _round(inputs), sink
+
+
+SCENARIOS = {
+    'mixer': build_mixer,
+    'mixer_mono_up': lambda: build_mixer(channels=1),
+    'multiplex': build_multiplex,
+    'mp3_fan_out': build_mp3,
+}
+
+
+def _percentile(values: typing.List[float], percentile: float) -> float:
+    """
+    Get a percentile of some values
+    :param values:  The values
+    :param percentile:  The percentile between 0 and 100
+    :return:  The value at the percentile
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(len(ordered) * percentile / 100.0)) - 1)]
+
+
+def _allocated_per_round(step: typing.Callable[[], None], rounds: int) -> float:
+    """
+    Measure the memory allocated while running rounds
+    :param step:  The function that runs a round
+    :param rounds:  The number of rounds to trace
+    :return:  The mean of the peak bytes allocated during each round
+    """
+    total = 0
+    tracemalloc.start()
+    try:
+        for _ in range(rounds):
+            if hasattr(tracemalloc, 'reset_peak'):
+                current = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+            else:
+                # Before Python 3.9 the peak can only be reset by tracing again from nothing
+                tracemalloc.stop()
+                tracemalloc.start()
+                current = 0
+            step()
+            total += tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+    return total / rounds
+
+
+def run(name: str, seconds: float) -> typing.Dict[str, float]:
+    """
+    Run a scenario
+    :param name:  The name of the scenario
+    :param seconds:  The amount of audio to process
+    :return:  The measurements
+    """
+    step, sink = SCENARIOS[name]()
+    for _ in range(WARM_UP):
+        step()
+    rounds = int(seconds * SAMPLE_RATE / settings.BLOCK_SIZE)
+    durations = []
+    sink.blocks = 0
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for _ in range(rounds):
+        start = time.perf_counter()
+        step()
+        durations.append(time.perf_counter() - start)
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    audio_seconds = rounds * settings.BLOCK_SIZE / SAMPLE_RATE
+    return {
+        'blocks_per_second': sink.blocks / wall,
+        'realtime_factor': audio_seconds / wall,
+        'cpu_per_audio_second': cpu / audio_seconds,
+        'alloc_bytes_per_block': _allocated_per_round(step, min(rounds, TRACED_ROUNDS)),
+        'p99_round_us': _percentile(durations, 99) * 1e6,
+    }
+
+
+def run_file(seconds: float) -> typing.Dict[str, float]:
+    """
+    Measure how quickly a file is played into a null sink, paced by a virtual clock
+    :param seconds:  The length of the file to play
+    :return:  The measurements
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'tone.wav')
+        frames = int(seconds * SAMPLE_RATE)
+        samples = (numpy.sin(2.0 * numpy.pi * 440.0 * numpy.arange(frames) / SAMPLE_RATE) * 8000).astype(numpy.int16)
+        with wave.open(path, 'wb') as output:
+            output.setnchannels(2)
+            output.setsampwidth(2)
+            output.setframerate(SAMPLE_RATE)
+            output.writeframes(numpy.repeat(samples, 2).tobytes())
+        sink = NullSink()
+        finished = threading.Event()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        player = file.File(path, settings.BLOCK_SIZE, clock.VirtualClock())
+        player.add_callback(sink)
+        player.set_end_callback(finished.set)
+        player.play()
+        finished.wait()
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        player.close()
+    return {
+        'blocks_per_second': sink.blocks / wall,
+        'realtime_factor': seconds / wall,
+        'cpu_per_audio_second': cpu / seconds,
+        'alloc_bytes_per_block': None,
+        'p99_round_us': None,
+    }
+
+
+def _commit() -> typing.Optional[str]:
+    """
+    Get the commit that is being measured
+    :return:  The commit hash or None if it isn't known
+    """
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Whether a larger value of each measurement is better
+HIGHER_IS_BETTER = {
+    'blocks_per_second': True,
+    'realtime_factor': True,
+    'cpu_per_audio_second': False,
+    'alloc_bytes_per_block': False,
+    'p99_round_us': False,
+}
+
+
+def _format(value: typing.Optional[float]) -> str:
+    return '-' if value is None else '{:.4g}'.format(value)
+
+
+def report(results: typing.Dict[str, typing.Dict[str, float]],
+           baseline: typing.Optional[typing.Dict[str, typing.Dict[str, float]]],
+           threshold: float = REGRESSION) -> bool:
+    """
+    Print the results, compared with a baseline if there is one
+    :param results:  The measurements for each scenario
+    :param baseline:  The measurements of an earlier run to compare with
+    :param threshold:  The fraction that a measurement can get worse by before it is a regression
+    :return:  True if any measurement regressed compared with the baseline
+    """
+    regressed = False
+    columns = list(HIGHER_IS_BETTER)
+    print('{:<16}'.format('scenario') + ''.join('{:>24}'.format(column) for column in columns))
+    for name, measurements in results.items():
+        cells = []
+        for column in columns:
+            value = measurements[column]
+            cell = _format(value)
+            before = (baseline or {}).get(name, {}).get(column)
+            if value is not None and before:
+                change = (value - before) / before
+                worse = -change if HIGHER_IS_BETTER[column] else change
+                cell += ' ({:+.0%}{})'.format(change, '!' if worse > threshold else '')
+                regressed = regressed or worse > threshold
+            cells.append('{:>24}'.format(cell))
+        print('{:<16}'.format(name) + ''.join(cells))
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=60.0, help='The amount of audio to process per scenario')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS) + ['file'],
+                        help='A scenario to run, all of them by default')
+    parser.add_argument('--json', help='Save the results to this file')
+    parser.add_argument('--compare', help='Compare with results saved by an earlier run')
+    parser.add_argument('--threshold', type=float, default=REGRESSION,
+                        help='The fraction a measurement can get worse by before the run fails the comparison')
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.scenario or list(SCENARIOS) + ['file']:
+        results[name] = run_file(args.seconds) if name == 'file' else run(name, args.seconds)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as saved:
+            previous = json.load(saved)
+        print('Compared with {}'.format(previous.get('commit') or args.compare))
+        baseline = previous['results']
+    regressed = report(results, baseline, args.threshold)
+
+    if args.json:
+        with open(args.json, 'w') as saved:
+            json.dump({
+                'commit': _commit(),
+                'python': platform.python_version(),
+                'numpy': numpy.__version__,
+                'block_size': settings.BLOCK_SIZE,
+                'seconds': args.seconds,
+                'results': results,
+            }, saved, indent=2)
+    if regressed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark the library database configuration.
+
+Compares the original configuration of the library database (rollback journal, full
+sync and no secondary indexes) with the configuration applied by library.database
+for the queries that the scanner and the live player perform.
+
+Run from the repository root with:
+
+    python -m benchmark.library_db [--tracks 20000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import typing
+import sqlalchemy.schema
+import sqlalchemy.dialects.sqlite
+from library import database
+
+
+def _create(path: str, tuned: bool) -> sqlite3.Connection:
+    """
+    Create a library database with the schema from library.database
+    :param path:  The file to create the database in
+    :param tuned:  Whether to apply the pragmas and indexes
+    :return:  The connection to the database
+    """
+    connection = sqlite3.connect(path, isolation_level=None)
+    if tuned:
+        for pragma, value in database.PRAGMAS:
+            connection.execute('PRAGMA {} = {}'.format(pragma, value))
+    dialect = sqlalchemy.dialects.sqlite.dialect()
+    for table in (database.Track.__table__, database.TrackPlay.__table__):
+        connection.execute(str(sqlalchemy.schema.CreateTable(table).compile(dialect=dialect)))
+    if tuned:
+        for statements in database.MIGRATIONS:
+            for statement in statements:
+                connection.execute(statement)
+    return connection
+
+
+def _populate(connection: sqlite3.Connection, tracks: int) -> typing.List[str]:
+    """
+    Fill the database with tracks and plays in a single transaction
+    :param connection:  The database to fill
+    :param tracks:  The number of tracks to add
+    :return:  The locations of the tracks
+    """
+    locations = ['/music/artist{}/album{}/track{}.mp3'.format(i % 500, i % 2000, i) for i in range(tracks)]
+    connection.execute('BEGIN')
+    connection.executemany(
+        'INSERT INTO track (location, artist, title, length) VALUES (?, ?, ?, ?)',
+        ((location, 'Artist', 'Title', 180.0) for location in locations)
+    )
+    connection.executemany(
+        'INSERT INTO track_play (track, time) VALUES (?, ?)',
+        ((i % tracks + 1, '2020-01-01 00:00:{:02}.{:06}'.format(i % 60, i)) for i in range(tracks * 2))
+    )
+    connection.execute('COMMIT')
+    return locations
+
+
+def _rate(operation: typing.Callable[[int], None], count: int) -> float:
+    """
+    Time an operation
+    :param operation:  The operation to run, passed the iteration number
+    :param count:  The number of times to run it
+    :return:  The number of operations per second
+    """
+    start = time.perf_counter()
+    for i in range(count):
+        operation(i)
+    return count / (time.perf_counter() - start)
+
+
+def _measure(connection: sqlite3.Connection, locations: typing.List[str], count: int) -> typing.Dict[str, float]:
+    """
+    Measure the throughput of the queries the application performs
+    :param connection:  The database to measure
+    :param locations:  The locations of the tracks in the database
+    :param count:  The number of times to perform each query
+    :return:  The operations per second for each query
+    """
+    rand = random.Random(0)
+    lookups = [rand.choice(locations) for _ in range(count)]
+    track_ids = [rand.randint(1, len(locations)) for _ in range(count)]
+
+    def lookup(i):
+        connection.execute('SELECT id FROM track WHERE location = ?', (lookups[i], )).fetchone()
+
+    def last_play(i):
+        connection.execute(
+            'SELECT max(time) FROM track_play WHERE track = ?', (track_ids[i], )
+        ).fetchone()
+
+    def recent_plays(i):
+        connection.execute('SELECT track FROM track_play ORDER BY time DESC LIMIT 20').fetchall()
+
+    def insert(i):
+        connection.execute(
+            'INSERT INTO track (location, artist, title, length) VALUES (?, ?, ?, ?)',
+            ('/music/new/{}.mp3'.format(i), 'Artist', 'Title', 180.0)
+        )
+
+    def record_play(i):
+        connection.execute(
+            'INSERT INTO track_play (track, time) VALUES (?, ?)', (track_ids[i], '2021-01-01 {:06}'.format(i))
+        )
+
+    return {
+        'location lookup': _rate(lookup, count),
+        'last play': _rate(last_play, count),
+        'recent plays': _rate(recent_plays, max(count // 10, 1)),
+        'insert (commit each)': _rate(insert, max(count // 10, 1)),
+        'record play (commit each)': _rate(record_play, max(count // 10, 1)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tracks', type=int, default=20000, help='The number of tracks in the library')
+    parser.add_argument('--count', type=int, default=2000, help='The number of times to run each query')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, tuned in (('original', False), ('tuned', True)):
+            connection = _create(os.path.join(directory, name + '.db'), tuned)
+            locations = _populate(connection, args.tracks)
+            results[name] = _measure(connection, locations, args.count)
+            connection.close()
+
+    print('{:<28}{:>14}{:>14}{:>10}'.format('operation (ops/s)', 'original', 'tuned', 'speedup'))
+    for operation, original in results['original'].items():
+        tuned = results['tuned'][operation]
+        print('{:<28}{:>14.0f}{:>14.0f}{:>9.1f}x'.format(operation, original, tuned, tuned / original))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,20 @@
+import importlib
 from .library import Library
 from .tracks import Track, Tracks
 from .playlist import Playlist
 from .live_player import LivePlayer
 from . import database
-from . import youtube
+from . import analysis
+from . import peaks
+
+
+def __getattr__(name: str):
+    """
+    Import the YouTube downloader on first use as it is slow to import and rarely needed
+    :param name:  The name of the module
+    :return:  The module
+    :raises AttributeError:  There is no such module
+    """
+    if name == 'youtube':
+        return importlib.import_module('.youtube', __name__)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
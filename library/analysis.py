@@ -0,0 +1,255 @@
+import typing
+import audioread
+import numpy
+
+
+# Increased when the analysis changes so that tracks are analysed again, 2 added the peaks and 3 the cue points
+ANALYSIS_VERSION = 3
+
+# The length of the step between gating blocks in seconds, each block is four steps (400ms)
+STEP = 0.1
+# The number of steps in each gating block
+STEPS_PER_BLOCK = 4
+# Blocks quieter than this (LUFS) are ignored
+ABSOLUTE_GATE = -70.0
+# Blocks more than this (LU) below the ungated loudness are ignored
+RELATIVE_GATE = -10.0
+# The factor to oversample by to find the true-peak
+OVERSAMPLE = 4
+# The number of steps to decode before processing them
+CHUNK_STEPS = 50
+# The length of the windows that silence is measured over in seconds
+SILENCE_WINDOW = 0.01
+# Windows quieter than this (dBFS RMS) at the start and end of a track are silence to skip
+SILENCE_THRESHOLD = -60.0
+# The number of seconds the level is averaged over to find the segue point
+SEGUE_SMOOTHING = 0.4
+# The segue point is where the level last falls this far (dB) below the average level of the track
+SEGUE_DROP = -20.0
+
+
+def _biquad_response(b: typing.Sequence[float], a: typing.Sequence[float], frequencies: numpy.array) -> numpy.array:
+    """
+    Evaluate the power response of a biquad filter
+    :param b:  The numerator coefficients
+    :param a:  The denominator coefficients
+    :param frequencies:  The normalised angular frequencies to evaluate at
+    :return:  The squared magnitude of the response at each frequency
+    """
+    z = numpy.exp(-1j * frequencies)
+    response = (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+    return numpy.abs(response) ** 2
+
+
+def k_weighting(samplerate: int, size: int) -> numpy.array:
+    """
+    Get the power response of the ITU-R BS.1770 K-weighting filter for the bins of a real FFT
+    :param samplerate:  The sample rate of the audio
+    :param size:  The length of the FFT
+    :return:  The squared magnitude of the filter for each bin
+    """
+    frequencies = 2.0 * numpy.pi * numpy.fft.rfftfreq(size)
+    # Stage one, a high shelf modelling the acoustic effect of the head
+    gain, q, centre = 3.99984385397, 0.7071752369554193, 1681.974450955533
+    k = numpy.tan(numpy.pi * centre / samplerate)
+    high = 10.0 ** (gain / 20.0)
+    band = high ** 0.4996667741545416
+    stage1 = _biquad_response(
+        (high + band * k / q + k * k, 2.0 * (k * k - high), high - band * k / q + k * k),
+        (1.0 + k / q + k * k, 2.0 * (k * k - 1.0), 1.0 - k / q + k * k),
+        frequencies
+    )
+    # Stage two, the RLB high pass
+    q, centre = 0.5003270373238773, 38.13547087602444
+    k = numpy.tan(numpy.pi * centre / samplerate)
+    stage2 = _biquad_response(
+        (1.0, -2.0, 1.0),
+        (1.0 + k / q + k * k, 2.0 * (k * k - 1.0), 1.0 - k / q + k * k),
+        frequencies
+    )
+    return stage1 * stage2
+
+
+class Analyser(object):
+    """
+    Measures the integrated loudness (EBU R128 / ITU-R BS.1770) and true-peak of a stream of audio.
+
+    The K-weighting is applied in the frequency domain to each 100ms step, so the mean square
+    of each step is found with one FFT rather than filtering sample by sample.
+    """
+
+    def __init__(self, samplerate: int, channels: int):
+        """
+        Prepare to analyse audio
+        :param samplerate:  The sample rate of the audio
+        :param channels:  The number of channels in the audio
+        """
+        self._channels = channels
+        self._step = int(round(samplerate * STEP))
+        self._weighting = k_weighting(samplerate, self._step)
+        self._energies = []
+        self._peak = 0.0
+        self._pending = numpy.zeros((0, channels), numpy.float32)
+
+    def add(self, samples: numpy.array) -> None:
+        """
+        Add audio to the analysis
+        :param samples:  The samples as an array of (frame, channel) between -1.0 and 1.0
+        """
+        self._pending = numpy.concatenate((self._pending, samples))
+        if len(self._pending) >= self._step * CHUNK_STEPS:
+            self._process(len(self._pending) // self._step)
+
+    def _process(self, steps: int) -> None:
+        """
+        Measure the energy and peak of the complete steps that are pending
+        :param steps:  The number of steps to process
+        """
+        length = steps * self._step
+        chunk, self._pending = self._pending[:length], self._pending[length:]
+        if length == 0:
+            return
+        # Mean square of the K-weighted signal for each step and channel using Parseval's theorem
+        spectrum = numpy.fft.rfft(chunk.reshape(steps, self._step, self._channels), axis=1)
+        power = numpy.abs(spectrum) ** 2 * self._weighting[None, :, None]
+        # Count the bins that appear twice in the full spectrum twice
+        power[:, 1:(self._step + 1) // 2] *= 2.0
+        self._energies.append(power.sum(axis=1) / (self._step * self._step))
+        # True-peak by band-limited interpolation of the chunk
+        oversampled = numpy.fft.irfft(numpy.fft.rfft(chunk, axis=0), length * OVERSAMPLE, axis=0) * OVERSAMPLE
+        self._peak = max(self._peak, float(numpy.abs(oversampled).max()), float(numpy.abs(chunk).max()))
+
+    def loudness(self) -> typing.Optional[float]:
+        """
+        Get the integrated loudness of the audio that has been added
+        :return:  The loudness in LUFS or None if the audio is silent or too short
+        """
+        self._process(len(self._pending) // self._step)
+        if not self._energies:
+            return None
+        steps = numpy.concatenate(self._energies)
+        if len(steps) < STEPS_PER_BLOCK:
+            return None
+        # Overlapping 400ms blocks with a 100ms step
+        cumulative = numpy.concatenate((numpy.zeros((1, self._channels)), numpy.cumsum(steps, axis=0)))
+        blocks = (cumulative[STEPS_PER_BLOCK:] - cumulative[:-STEPS_PER_BLOCK]) / STEPS_PER_BLOCK
+        energy = blocks.sum(axis=1)
+        with numpy.errstate(divide='ignore'):
+            block_loudness = -0.691 + 10.0 * numpy.log10(energy)
+        gated = energy[block_loudness > ABSOLUTE_GATE]
+        if len(gated) == 0:
+            return None
+        relative = -0.691 + 10.0 * numpy.log10(gated.mean()) + RELATIVE_GATE
+        gated = energy[(block_loudness > ABSOLUTE_GATE) & (block_loudness > relative)]
+        if len(gated) == 0:
+            return None
+        return float(-0.691 + 10.0 * numpy.log10(gated.mean()))
+
+    def true_peak(self) -> float:
+        """
+        Get the true-peak of the audio that has been added
+        :return:  The true-peak in dBTP
+        """
+        self._process(len(self._pending) // self._step)
+        return float(20.0 * numpy.log10(max(self._peak, 1e-5)))
+
+
+class Cues(object):
+    """
+    Finds where the sound starts and ends in a track, skipping silence, and the segue point where
+    its ending has faded enough for the next track to start
+    """
+
+    def __init__(self, samplerate: int):
+        """
+        Prepare to find the cue points of audio
+        :param samplerate:  The sample rate of the audio
+        """
+        self._samplerate = samplerate
+        self._window = max(1, int(round(samplerate * SILENCE_WINDOW)))
+        self._powers = []
+        self._pending = numpy.zeros(0, numpy.float64)
+
+    def add(self, samples: numpy.array) -> None:
+        """
+        Add audio to find the cue points in
+        :param samples:  The samples as an array of (frame, channel) between -1.0 and 1.0
+        """
+        power = numpy.concatenate((self._pending, (samples.astype(numpy.float64) ** 2).mean(axis=1)))
+        whole = len(power) - len(power) % self._window
+        self._powers.append(power[:whole].reshape(-1, self._window).mean(axis=1))
+        self._pending = power[whole:]
+
+    def cues(self) -> typing.Tuple[typing.Optional[float], typing.Optional[float], typing.Optional[float]]:
+        """
+        Get the cue points of the audio that has been added
+        :return:  The cue-in, cue-out and segue times in seconds, None if the audio is silent
+        """
+        powers = self._powers + ([self._pending.mean(keepdims=True)] if len(self._pending) else [])
+        if not powers:
+            return None, None, None
+        powers = numpy.concatenate(powers)
+        frames = (len(powers) - 1) * self._window + (len(self._pending) or self._window)
+        sound = numpy.flatnonzero(powers > 10.0 ** (SILENCE_THRESHOLD / 10.0))
+        if len(sound) == 0:
+            return None, None, None
+        first, last = sound[0], sound[-1] + 1
+        # The level averaged over a moving window starting at each window
+        smoothing = min(max(1, int(round(SEGUE_SMOOTHING / SILENCE_WINDOW))), last - first)
+        cumulative = numpy.concatenate(([0.0], numpy.cumsum(powers[first:last])))
+        smoothed = (cumulative[smoothing:] - cumulative[:-smoothing]) / smoothing
+        loud = numpy.flatnonzero(smoothed > powers[first:last].mean() * 10.0 ** (SEGUE_DROP / 10.0))
+        segue = first + loud[-1] + smoothing if len(loud) else last
+        return (
+            float(first * self._window / self._samplerate),
+            float(min(last * self._window, frames) / self._samplerate),
+            float(min(segue * self._window, frames) / self._samplerate)
+        )
+
+
+def analyse(filename: str, decoded: typing.Optional[typing.Callable[[numpy.array, int], None]] = None) -> \
+        typing.Dict[str, typing.Optional[float]]:
+    """
+    Measure the loudness, true-peak and cue points of a file
+    :param filename:  The path to the file to analyse
+    :param decoded:  Called with the int16 samples and sample rate as they are decoded, so that
+                     other measurements can share the decoding
+    :return:  The track columns: the integrated loudness in LUFS, the true-peak in dBTP and the cue-in,
+              cue-out and segue in seconds, each None if it could not be measured
+    """
+    try:
+        with audioread.audio_open(filename) as audio:
+            analyser = Analyser(audio.samplerate, audio.channels)
+            cues = Cues(audio.samplerate)
+            for buffer in audio:
+                samples = numpy.frombuffer(buffer, numpy.int16).reshape(-1, audio.channels)
+                if decoded is not None:
+                    decoded(samples, audio.samplerate)
+                samples = samples.astype(numpy.float32) / 32768.0
+                analyser.add(samples)
+                cues.add(samples)
+            cue_in, cue_out, segue = cues.cues()
+            return {
+                'loudness': analyser.loudness(),
+                'true_peak': analyser.true_peak(),
+                'cue_in': cue_in,
+                'cue_out': cue_out,
+                'segue': segue,
+            }
+    except Exception:
+        return dict.fromkeys(('loudness', 'true_peak', 'cue_in', 'cue_out', 'segue'))
+
+
+def gain(loudness: typing.Optional[float], true_peak: typing.Optional[float],
+         target: float, ceiling: float) -> float:
+    """
+    Get the gain to play a track at the target loudness without its peaks going over the ceiling
+    :param loudness:  The integrated loudness of the track in LUFS
+    :param true_peak:  The true-peak of the track in dBTP
+    :param target:  The loudness to play at in LUFS
+    :param ceiling:  The highest true-peak allowed after the gain in dBTP
+    :return:  The linear gain to apply, 1.0 if the track has not been analysed
+    """
+    if loudness is None or true_peak is None:
+        return 1.0
+    return 10.0 ** (min(target - loudness, ceiling - true_peak) / 20.0)
@@ -1,6 +1,8 @@
 import enum
 import os.path
 import datetime
+import sqlalchemy
+import sqlalchemy.event
 import flask_sqlalchemy
 
 
@@ -14,13 +16,25 @@ class Track(db.Model):
     # The ID of the track
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     # The location of the file
-    location = db.Column(db.String, nullable=False)
+    location = db.Column(db.String, nullable=False, index=True)
     # The artist of the track
-    artist = db.Column(db.String)
+    artist = db.Column(db.String, index=True)
     # The title of the track
-    title = db.Column(db.String)
+    title = db.Column(db.String, index=True)
     # The length of the track in seconds
     length = db.Column(db.Float)
+    # The integrated loudness of the track in LUFS
+    loudness = db.Column(db.Float)
+    # The true-peak of the track in dBTP
+    true_peak = db.Column(db.Float)
+    # The time in seconds that the sound starts after any silence
+    cue_in = db.Column(db.Float)
+    # The time in seconds that the sound ends before any silence
+    cue_out = db.Column(db.Float)
+    # The time in seconds that the ending has faded enough for the next track to start
+    segue = db.Column(db.Float)
+    # The version of the analysis that measured the loudness, NULL if it hasn't been analysed
+    analysis_version = db.Column(db.Integer, index=True)
 
 
 class TrackPlay(db.Model):
@@ -30,7 +44,7 @@ class TrackPlay(db.Model):
     # The ID of the track
     track = db.Column(db.Integer, db.ForeignKey('track.id'), primary_key=True)
     # The time and date it was played
-    time = db.Column(db.DateTime, default=datetime.datetime.utcnow, primary_key=True)
+    time = db.Column(db.DateTime, default=datetime.datetime.utcnow, primary_key=True, index=True)
 
 
 class TrackTags(db.Model):
@@ -123,6 +137,73 @@ class LivePlayerTrack(db.Model):
     type = db.Column(db.Enum(LivePlayerType), nullable=False)
 
 
+# The settings applied to every connection to the library database
+PRAGMAS = (
+    # Allow readers to continue while the scanner is writing
+    ('journal_mode', 'WAL'),
+    # With WAL this is still safe against corruption, but doesn't sync on every commit
+    ('synchronous', 'NORMAL'),
+    # Read the database through a 256MB memory map
+    ('mmap_size', 256 * 1024 * 1024),
+    # Use a 16MB page cache (negative values are in KB)
+    ('cache_size', -16 * 1024),
+    # Wait for other writers rather than failing with "database is locked"
+    ('busy_timeout', 5000),
+)
+
+# The statements to bring a database created by an older version up to date in order.
+# The database records how many have been applied in its user_version.
+MIGRATIONS = (
+    # Indexes for the scanner, searching and finding the last play of a track
+    (
+        'CREATE INDEX IF NOT EXISTS ix_track_location ON track (location)',
+        'CREATE INDEX IF NOT EXISTS ix_track_artist ON track (artist)',
+        'CREATE INDEX IF NOT EXISTS ix_track_title ON track (title)',
+        'CREATE INDEX IF NOT EXISTS ix_track_play_time ON track_play (time)',
+    ),
+    # Loudness analysis
+    (
+        'ALTER TABLE track ADD COLUMN loudness FLOAT',
+        'ALTER TABLE track ADD COLUMN true_peak FLOAT',
+        'ALTER TABLE track ADD COLUMN analysis_version INTEGER',
+        'CREATE INDEX IF NOT EXISTS ix_track_analysis_version ON track (analysis_version)',
+    ),
+    # Cue points
+    (
+        'ALTER TABLE track ADD COLUMN cue_in FLOAT',
+        'ALTER TABLE track ADD COLUMN cue_out FLOAT',
+        'ALTER TABLE track ADD COLUMN segue FLOAT',
+    ),
+)
+
+
+def _set_pragmas(connection, _) -> None:
+    """
+    Configure a new connection to the database
+    :param connection:  The DB-API connection that was opened
+    """
+    cursor = connection.cursor()
+    for pragma, value in PRAGMAS:
+        cursor.execute('PRAGMA {} = {}'.format(pragma, value))
+    cursor.close()
+
+
+def _migrate(engine, created: bool) -> None:
+    """
+    Apply the migrations that haven't been applied to the database yet
+    :param engine:  The engine for the database
+    :param created:  True if the database was just created and so is already up to date
+    """
+    with engine.connect() as connection:
+        version = connection.execute('PRAGMA user_version').scalar()
+        if not created:
+            for statements in MIGRATIONS[version:]:
+                with connection.begin():
+                    for statement in statements:
+                        connection.execute(statement)
+        connection.execute('PRAGMA user_version = {}'.format(len(MIGRATIONS)))
+
+
 def init_app(app):
     """
     Configure the database for the given Flask application
@@ -133,4 +214,8 @@ def init_app(app):
     app.config['SQLALCHEMY_BINDS'] = binds
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     db.init_app(app)
+    engine = db.get_engine(app, bind='library')
+    sqlalchemy.event.listen(engine, 'connect', _set_pragmas)
+    created = 'track' not in sqlalchemy.inspect(engine).get_table_names()
     db.create_all(bind='library', app=app)
+    _migrate(engine, created)
@@ -1,41 +1,212 @@
 import typing
 import subprocess
+import threading
+import queue
+import json
 import sys
 import os.path
 import atexit
 from . import database
+from . import tracks
 
 
-class DirectoryScanner(object):
+class ScannerService(object):
     """
-    A class that manages the external directory scanner process
+    A class that manages the single external scanner process that watches all of the library roots
     """
 
-    def __init__(self, directory: str):
+    # The number of seconds to wait for the scanner to reply to a command
+    TIMEOUT = 30
+
+    def __init__(self):
+        """
+        Create the manager, the process is started when the first command is sent
+        """
+        self._process = None
+        self._directories = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._replies = {}
+        self._exit_registered = False
+        # The last state the scanner reported and whether a new one has been requested
+        self._status = None
+        self._refreshing = False
+
+    def _start(self) -> None:
+        """
+        Start the scanner process and tell it about all of the directories we know about
+        """
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(__file__), 'scanner.py')],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            universal_newlines=True
+        )
+        threading.Thread(target=self._read, args=(self._process, ), daemon=True).start()
+        if not self._exit_registered:
+            atexit.register(self.close)
+            self._exit_registered = True
+        for directory in self._directories:
+            self._send(self._process, 'add', directory)
+
+    def _read(self, process: subprocess.Popen) -> None:
+        """
+        Read the replies from the scanner process and pass them to the waiting request,
+        events are handled as they arrive
+        :param process:  The process to read from
+        """
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get('event') == 'tracks_changed':
+                tracks.TrackCache.invalidate(message.get('ids', []))
+                continue
+            reply = self._replies.get(message.get('id'))
+            if reply is not None:
+                reply.put(message)
+
+    def _send(self, process: subprocess.Popen, command: str, *arguments) -> int:
+        """
+        Send a command to the scanner process
+        :param process:  The process to send to
+        :param command:  The command to send
+        :param arguments:  The arguments to the command
+        :return:  The ID of the command that the reply will have
+        """
+        self._next_id += 1
+        process.stdin.write(json.dumps({'id': self._next_id, 'command': command, 'arguments': arguments}) + '\n')
+        process.stdin.flush()
+        return self._next_id
+
+    def request(self, command: str, *arguments) -> typing.Any:
+        """
+        Send a command to the scanner process and wait for the result
+        :param command:  The command to send
+        :param arguments:  The arguments to the command
+        :return:  The result of the command
+        :raises RuntimeError:  The scanner failed to perform the command
+        """
+        reply = queue.Queue(1)
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+            request_id = self._next_id + 1
+            self._replies[request_id] = reply
+            self._send(self._process, command, *arguments)
+        try:
+            message = reply.get(timeout=self.TIMEOUT)
+        except queue.Empty:
+            raise RuntimeError('Scanner did not respond')
+        finally:
+            self._replies.pop(request_id, None)
+        if 'error' in message:
+            raise RuntimeError(message['error'])
+        return message.get('result')
+
+    @property
+    def directories(self) -> typing.List[str]:
+        """
+        Get the directories that the scanner is watching
+        :return:  The locations that are being scanned
+        """
+        return self._directories
+
+    def restore(self, directories: typing.Iterable[str]) -> None:
+        """
+        Start scanning directories that were already in the library, the scanner process is started
+        in the background so that nothing waits for it
+        :param directories:  The directories to scan
+        """
+        self._directories.extend(directories)
+        if self._directories:
+            threading.Thread(target=self._ensure_started, daemon=True).start()
+
+    def _ensure_started(self) -> None:
+        """
+        Start the scanner process if it isn't running, it is told about the directories as it starts
+        """
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+
+    def add_directory(self, directory: str) -> None:
         """
         Start scanning for files in the directory and changes and keep the database up to date
         :param directory:  The directory to scan for audio files in
+        :raises RuntimeError:  The scanner failed to add the directory
         """
-        self._directory = directory
-        self._process = subprocess.Popen([
-            sys.executable, os.path.join(os.path.dirname(__file__), 'scanner.py'), directory
-        ])
-        atexit.register(self.close)
+        self.request('add', directory)
+        # Only once the scanner has it, so that a failed add isn't replayed when the scanner restarts
+        self._directories.append(directory)
 
-    @property
-    def directory(self) -> str:
+    def remove_directory(self, directory: str) -> None:
+        """
+        Stop scanning for files in this directory and remove its tracks from the database
+        :param directory:  The directory to stop scanning
+        """
+        self._directories.remove(directory)
+        self.request('remove', directory)
+
+    def rescan(self, directory: str = None) -> typing.List[str]:
         """
-        Get the directory location that this scanner is working for
-        :return:  The location that is being scanned by this scanner
+        Walk a directory again to pick up any changes that were missed
+        :param directory:  The directory to walk, or None for all of them
+        :return:  The directories that are being scanned
         """
-        return self._directory
+        return self.request('rescan', directory)
+
+    def import_file(self, path: str) -> bool:
+        """
+        Add a file that has been put in a library directory straight away
+        :param path:  The file to add
+        :return:  True if it was queued, False if it isn't in a library directory
+        """
+        return self.request('import', path)
+
+    def status(self) -> typing.Dict:
+        """
+        Get the state of the scanner
+        :return:  The roots being watched, those being scanned and the number of queued changes
+        """
+        self._status = self.request('status')
+        return self._status
+
+    def cached_status(self) -> typing.Optional[typing.Dict]:
+        """
+        Get the last state of the scanner without waiting for it, a new one is requested in the background
+        if the scanner is running so that the next call is up to date, the scanner is never started
+        :return:  The last state the scanner reported or None if it hasn't reported one
+        """
+        with self._lock:
+            refresh = self._process is not None and self._process.poll() is None and not self._refreshing
+            if refresh:
+                self._refreshing = True
+        if refresh:
+            threading.Thread(target=self._refresh_status, daemon=True).start()
+        return self._status
+
+    def _refresh_status(self) -> None:
+        """
+        Request the state of the scanner for cached_status
+        """
+        try:
+            self.status()
+        except RuntimeError:
+            pass
+        finally:
+            self._refreshing = False
 
     def close(self):
         """
-        Stop scanning for files in this directory
+        Stop scanning for files
         """
         atexit.unregister(self.close)
-        self._process.terminate()
+        self._exit_registered = False
+        if self._process is not None:
+            self._process.terminate()
+            self._process = None
 
 
 class Library(object):
@@ -43,17 +214,18 @@ class Library(object):
     The maintainer of the library root directories
     """
 
-    _directory_handlers = []
+    _scanner = ScannerService()
 
     @classmethod
     def add_directory(cls, directory: str):
         """
         Add a directory to the library
         :param directory:  The location of the directory to add
+        :raises RuntimeError:  The scanner failed to add the directory
         """
         session = database.db.session
         if session.query(database.Library.id).filter(database.Library.location.startswith(directory)).count() == 0:
-            cls._directory_handlers.append(DirectoryScanner(directory))
+            cls._scanner.add_directory(directory)
             session.add(database.Library(location=directory))
             session.commit()
 
@@ -63,18 +235,14 @@ class Library(object):
         Remove a directory from the library
         :param directory:  The location of the directory to remove
         """
-        try:
-            handler = next(x for x in cls._directory_handlers if x.directory == directory)
-        except StopIteration:
+        if directory not in cls._scanner.directories:
             return
-        handler.close()
-        cls._directory_handlers.remove(handler)
         session = database.db.session
         session.query(database.Library).filter_by(location=directory).delete()
-        session.query(database.Track).filter(database.Track.location.startswith(directory)).\
-            delete(synchronize_session='fetch')
         session.commit()
         session.close()
+        # The scanner removes the tracks so that there is only one writer for them
+        cls._scanner.remove_directory(directory)
 
     @classmethod
     def list(cls) -> typing.Iterable[str]:
@@ -82,15 +250,48 @@ class Library(object):
         Get an iterator over the directories for the root of the library
         :return:  An iterator of the directories
         """
-        for handler in cls._directory_handlers:
-            yield handler.directory
+        for directory in cls._scanner.directories:
+            yield directory
+
+    @classmethod
+    def rescan(cls, directory: str = None) -> typing.List[str]:
+        """
+        Check a library directory for changes that were missed
+        :param directory:  The directory to check, or None for all of them
+        :return:  The directories that are being scanned
+        """
+        return cls._scanner.rescan(directory)
+
+    @classmethod
+    def import_file(cls, path: str) -> bool:
+        """
+        Add a file that has been downloaded into a library directory
+        :param path:  The location of the file
+        :return:  True if it was queued, False if it isn't in a library directory
+        """
+        return cls._scanner.import_file(path)
+
+    @classmethod
+    def status(cls) -> typing.Dict:
+        """
+        Get the state of the library scanner
+        :return:  The roots being watched, those being scanned and the number of queued changes
+        """
+        return cls._scanner.status()
+
+    @classmethod
+    def cached_status(cls) -> typing.Optional[typing.Dict]:
+        """
+        Get the last state of the library scanner without waiting for it
+        :return:  The last state it reported or None if it hasn't reported one
+        """
+        return cls._scanner.cached_status()
 
     @classmethod
     def restore(cls):
         """
-        Load the library from the database
+        Load the library from the database, the scanner starts watching it in the background
         """
         session = database.db.session
-        for directory in session.query(database.Library).all():
-            cls._directory_handlers.append(DirectoryScanner(directory.location))
+        cls._scanner.restore([directory.location for directory in session.query(database.Library).all()])
         session.close()
@@ -1,7 +1,33 @@
 import typing
+import threading
 import flask
 from . import database
 from . import playlist
+from . import ordering
+from .writer import writer
+
+
+class PlayerState(object):
+    """
+    The in memory copy of a live player, this is the source of truth while the server is
+    running and changes to it are written to the database in the background
+    """
+
+    def __init__(self, player: database.LivePlayer, tracks: typing.List[typing.Tuple[int, database.LivePlayerType]],
+                 keys: typing.List[int]):
+        """
+        Copy the state of a player from the database
+        :param player:  The database row for the player
+        :param tracks:  The tracks in the player in order
+        :param keys:  The index of each of the tracks in the database
+        """
+        self.name = player.name
+        self.state = player.state
+        self.jingle_playlist = player.jingle_playlist
+        self.jingle_count = player.jingle_count
+        self.jingle_plays = player.jingle_plays
+        self.tracks = tracks
+        self.keys = keys
 
 
 class LivePlayer(object):
@@ -12,14 +38,25 @@ class LivePlayer(object):
     # Cached socketio instance
     _socketio = None
 
+    # The state of each of the players by ID
+    _states = {}
+    # Guards the player states, re-entrant as setters call each other
+    _lock = threading.RLock()
+    # Whether all of the players have been loaded from the database
+    _loaded = False
+
     @staticmethod
     def list() -> typing.Iterable['LivePlayer']:
-        session = database.db.session
-        try:
-            for playlist in session.query(database.LivePlayer):
-                yield LivePlayer(playlist.id)
-        finally:
-            session.close()
+        with LivePlayer._lock:
+            if not LivePlayer._loaded:
+                session = database.db.session
+                try:
+                    for player in session.query(database.LivePlayer.id).all():
+                        LivePlayer(player.id)._state
+                finally:
+                    session.close()
+                LivePlayer._loaded = True
+            return [LivePlayer(id) for id in LivePlayer._states]
 
     @classmethod
     def create(cls, name: str) -> int:
@@ -27,6 +64,8 @@ class LivePlayer(object):
         playlist = database.LivePlayer(name=name, state=database.LivePlayerState.paused, jingle_plays=0)
         session.add(playlist)
         session.commit()
+        with cls._lock:
+            cls._states[playlist.id] = PlayerState(playlist, [], [])
         import audio_manager
         audio_manager.live_player.LivePlayers.add(LivePlayer(playlist.id))
         return playlist.id
@@ -49,17 +88,134 @@ class LivePlayer(object):
         """
         self._playlist_id = id
 
+    @property
+    def _state(self) -> PlayerState:
+        """
+        Get the in memory state of the player, loading it from the database the first time
+        :return:  The state of the player
+        :raises ValueError:  The player does not exist
+        """
+        with self._lock:
+            state = self._states.get(self._playlist_id)
+            if state is None:
+                state = self._load(database.db.session)
+                self._states[self._playlist_id] = state
+            return state
+
+    def _load(self, session) -> PlayerState:
+        """
+        Read the state of the player from the database
+        :param session:  The database session to read with
+        :return:  The state of the player
+        :raises ValueError:  The player does not exist
+        """
+        player = session.query(database.LivePlayer).get(self._playlist_id)
+        if player is None:
+            raise ValueError('No such player found')
+        query = session.query(database.LivePlayerTrack). \
+            filter(database.LivePlayerTrack.playlist == self._playlist_id). \
+            order_by(database.LivePlayerTrack.index)
+        rows = query.all()
+        return PlayerState(player, [(row.track, row.type) for row in rows], [row.index for row in rows])
+
+    def _write_failed(self, _: Exception) -> None:
+        """
+        Called by the writer when a change to this player couldn't be written, the player is read back
+        from the database once everything before now has been written so that it matches what a restart
+        would restore, changes made after that are applied to both as usual
+        :param _:  The error that the write failed with
+        """
+        def reload(session):
+            with self._lock:
+                previous = self._states.get(self._playlist_id)
+                if previous is None:
+                    # Deleted or not loaded yet, so it will be read from the database anyway
+                    return
+                try:
+                    state = self._load(session)
+                except ValueError:
+                    return
+                self._states[self._playlist_id] = state
+                current_track = previous.tracks[0] if previous.tracks else None
+                tracks = list(state.tracks)
+            self._tracks_changed(current_track, tracks)
+        writer.submit(reload)
+
+    def _update(self, values: typing.Dict) -> None:
+        """
+        Queue an update to the database row for this player
+        :param values:  The columns to update
+        """
+        player_id = self._playlist_id
+
+        def update(session):
+            session.query(database.LivePlayer). \
+                filter(database.LivePlayer.id == player_id). \
+                update(values)
+        writer.submit(update, self._write_failed)
+
+    def _rows(self, tracks: typing.List[typing.Tuple[int, database.LivePlayerType]],
+              keys: typing.List[int]) -> typing.List[typing.Dict]:
+        """
+        Create the database rows for tracks in this player
+        :param tracks:  The tracks to create the rows for
+        :param keys:  The index of each of the tracks
+        :return:  The column values for each row
+        """
+        return [
+            {'playlist': self._playlist_id, 'track': track, 'index': key, 'type': type_}
+            for (track, type_), key in zip(tracks, keys)
+        ]
+
+    def _write_tracks(self, tracks: typing.List[typing.Tuple[int, database.LivePlayerType]],
+                      keys: typing.List[int]) -> None:
+        """
+        Queue replacing the tracks for this player in the database
+        :param tracks:  The tracks in the player in order
+        :param keys:  The index of each of the tracks
+        """
+        player_id = self._playlist_id
+        rows = self._rows(tracks, keys)
+
+        def write(session):
+            session.query(database.LivePlayerTrack). \
+                filter(database.LivePlayerTrack.playlist == player_id). \
+                delete()
+            if rows:
+                session.bulk_insert_mappings(database.LivePlayerTrack, rows)
+        writer.submit(write, self._write_failed)
+
+    def _change_rows(self, removed: typing.List[int],
+                     tracks: typing.List[typing.Tuple[int, database.LivePlayerType]] = (),
+                     keys: typing.List[int] = ()) -> None:
+        """
+        Queue removing and adding tracks to this player in the database in one transaction
+        :param removed:  The index of each of the tracks to remove
+        :param tracks:  The tracks to add
+        :param keys:  The index of each of the tracks to add
+        """
+        player_id = self._playlist_id
+        rows = self._rows(tracks, keys)
+
+        def change(session):
+            if removed:
+                session.query(database.LivePlayerTrack). \
+                    filter(database.LivePlayerTrack.playlist == player_id). \
+                    filter(database.LivePlayerTrack.index.in_(removed)). \
+                    delete(synchronize_session=False)
+            if rows:
+                session.bulk_insert_mappings(database.LivePlayerTrack, rows)
+        writer.submit(change, self._write_failed)
+
     @property
     def name(self) -> str:
-        return database.db.session.query(database.LivePlayer).get(self._playlist_id).name
+        return self._state.name
 
     @name.setter
     def name(self, name: str):
-        session = database.db.session
-        session.query(database.LivePlayer). \
-            filter(database.LivePlayer.id == self._playlist_id). \
-            update({database.LivePlayer.name: name})
-        session.commit()
+        with self._lock:
+            self._state.name = name
+            self._update({database.LivePlayer.name: name})
 
     @property
     def id(self) -> int:
@@ -68,11 +224,18 @@ class LivePlayer(object):
     def delete(self):
         import audio_manager
         audio_manager.live_player.LivePlayers.remove(self)
-        session = database.db.session
-        session.query(database.LivePlayer). \
-            filter(database.LivePlayer.id == self._playlist_id). \
-            delete()
-        session.commit()
+        player_id = self._playlist_id
+        with self._lock:
+            self._states.pop(player_id, None)
+
+            def delete(session):
+                session.query(database.LivePlayerTrack). \
+                    filter(database.LivePlayerTrack.playlist == player_id). \
+                    delete()
+                session.query(database.LivePlayer). \
+                    filter(database.LivePlayer.id == player_id). \
+                    delete()
+            writer.submit(delete)
 
     def _get_player(self):
         import audio_manager
@@ -80,120 +243,179 @@ class LivePlayer(object):
 
     @property
     def state(self) -> database.LivePlayerState:
-        return database.db.session.query(database.LivePlayer).get(self._playlist_id).state
+        return self._state.state
 
     @state.setter
     def state(self, state: database.LivePlayerState):
-        session = database.db.session
-        session.query(database.LivePlayer). \
-            filter(database.LivePlayer.id == self._playlist_id). \
-            update({database.LivePlayer.state: state})
-        session.commit()
+        with self._lock:
+            self._state.state = state
+            self._update({database.LivePlayer.state: state})
         self._get_player().set_state(state)
         self._emit('player_state_' + str(self.id), state.name)
 
     @property
     def jingle_playlist(self) -> typing.Optional[playlist.Playlist]:
-        playlist_id = database.db.session.query(database.LivePlayer).get(self._playlist_id).jingle_playlist
+        playlist_id = self._state.jingle_playlist
         return None if not playlist_id else playlist.Playlist(playlist_id)
 
+    @property
+    def jingle_playlist_id(self) -> typing.Optional[int]:
+        """
+        Get the ID of the jingle playlist from the in-memory state, without using the database
+        :return:  The ID of the playlist or None if there isn't one
+        """
+        return self._state.jingle_playlist or None
+
     @jingle_playlist.setter
-    def jingle_playlist(self, playlist: playlist.Playlist):
-        session = database.db.session
-        session.query(database.LivePlayer). \
-            filter(database.LivePlayer.id == self._playlist_id). \
-            update({database.LivePlayer.jingle_playlist: None if playlist is None else playlist.id})
-        session.commit()
-        self._emit('player_jingles_' + str(self.id), '' if playlist is None else playlist.id)
+    def jingle_playlist(self, jingles: typing.Union[playlist.Playlist, int, None]):
+        playlist_id = jingles.id if isinstance(jingles, playlist.Playlist) else jingles
+        with self._lock:
+            self._state.jingle_playlist = playlist_id
+            self._update({database.LivePlayer.jingle_playlist: playlist_id})
+        self._emit('player_jingles_' + str(self.id), '' if playlist_id is None else playlist_id)
 
     @property
     def jingle_count(self) -> int:
-        return database.db.session.query(database.LivePlayer).get(self._playlist_id).jingle_count
+        return self._state.jingle_count
 
     @jingle_count.setter
     def jingle_count(self, jingle_count: typing.Optional[int]):
-        session = database.db.session
         update = {
             database.LivePlayer.jingle_count: jingle_count
         }
-        if jingle_count is None:
-            update[database.LivePlayer.jingle_plays] = 0
-        session.query(database.LivePlayer). \
-            filter(database.LivePlayer.id == self._playlist_id). \
-            update(update)
-        session.commit()
+        with self._lock:
+            state = self._state
+            state.jingle_count = jingle_count
+            if jingle_count is None:
+                state.jingle_plays = 0
+                update[database.LivePlayer.jingle_plays] = 0
+            self._update(update)
 
     @property
     def jingle_plays(self) -> int:
-        return database.db.session.query(database.LivePlayer).get(self._playlist_id).jingle_plays
+        return self._state.jingle_plays
 
     @jingle_plays.setter
     def jingle_plays(self, jingle_plays: int):
-        session = database.db.session
-        session.query(database.LivePlayer). \
-            filter(database.LivePlayer.id == self._playlist_id). \
-            update({database.LivePlayer.jingle_plays: jingle_plays})
-        session.commit()
+        with self._lock:
+            self._state.jingle_plays = jingle_plays
+            self._update({database.LivePlayer.jingle_plays: jingle_plays})
 
     def current_track(self) -> typing.Optional[typing.Tuple[int, database.LivePlayerType]]:
-        query = database.db.session.query(database.LivePlayerTrack). \
-            filter(database.LivePlayerTrack.playlist == self.id). \
-            order_by(database.LivePlayerTrack.index)
-        track = query.first()
-        if track is None:
-            return None
-        return track.track, track.type
+        tracks = self._state.tracks
+        return tracks[0] if tracks else None
 
     def remove_track(self):
-        session = database.db.session
-        query = session.query(database.LivePlayerTrack). \
-            filter(database.LivePlayerTrack.playlist == self.id). \
-            order_by(database.LivePlayerTrack.index)
-        session.delete(query.first())
-        session.query(database.LivePlayerTrack). \
-            update({'index': (database.LivePlayerTrack.index - 1)})
-        session.commit()
-        self._send_tracks(session)
+        with self._lock:
+            state = self._state
+            if not state.tracks:
+                return
+            self._change_rows(state.keys[:1])
+            del state.tracks[0]
+            del state.keys[0]
+            tracks = list(state.tracks)
+        self._send_tracks(tracks)
 
-    def _send_tracks(self, session):
-        query = session.query(database.LivePlayerTrack). \
-            filter(database.LivePlayerTrack.playlist == self.id). \
-            order_by(database.LivePlayerTrack.index)
+    def _send_tracks(self, tracks: typing.List[typing.Tuple[int, database.LivePlayerType]]):
         self._emit(
             'player_tracks_' + str(self.id),
-            [{'id': track.track, 'type': track.type.name} for track in query.all()]
+            [{'id': track, 'type': type_.name} for track, type_ in tracks]
         )
 
+    def _tracks_changed(self, current_track: typing.Optional[typing.Tuple[int, database.LivePlayerType]],
+                        tracks: typing.List[typing.Tuple[int, database.LivePlayerType]]):
+        """
+        Start the new first track if it has changed and tell the clients about the new tracks
+        :param current_track:  The first track before the change
+        :param tracks:  The tracks after the change
+        """
+        if len(tracks) > 0 and (current_track is None or tracks[0][0] != current_track[0]):
+            self._get_player().set_track(tracks[0][0])
+        elif len(tracks) == 0:
+            self._get_player().playlist.set_file(None)
+        self._send_tracks(tracks)
+
     @property
     def tracks(self) -> typing.List[typing.Tuple[int, database.LivePlayerType]]:
-        query = database.db.session.query(database.LivePlayerTrack). \
-            filter(database.LivePlayerTrack.playlist == self.id). \
-            order_by(database.LivePlayerTrack.index)
-        return [(track.track, track.type) for track in query.all()]
+        return list(self._state.tracks)
 
     @tracks.setter
     def tracks(self, tracks: typing.List[typing.Tuple[int, database.LivePlayerType]]):
-        session = database.db.session
-        current_track = session.query(database.LivePlayerTrack). \
-            filter(database.LivePlayerTrack.playlist == self.id). \
-            order_by(database.LivePlayerTrack.index). \
-            first()
-        query = session.query(database.LivePlayerTrack). \
-            filter(database.LivePlayerTrack.playlist == self.id)
-        query.delete()
-        for index, (track, type_) in enumerate(tracks):
-            session.add(database.LivePlayerTrack(playlist=self.id, track=track, index=index, type=type_))
-        session.commit()
-        if len(tracks) > 0 and (current_track is None or tracks[0][0] != current_track.track):
-            self._get_player().set_track(tracks[0][0])
-            self._emit('player_tracktime_' + str(self.id), 0)
-        elif len(tracks) == 0:
-            self._emit('player_tracktime_' + str(self.id), 0)
-            self._get_player().playlist.set_file(None)
-        self._emit(
-            'player_tracks_' + str(self.id),
-            [{'id': track, 'type': type_.name} for track, type_ in tracks]
-        )
+        tracks = list(tracks)
+        with self._lock:
+            state = self._state
+            current_track = state.tracks[0] if state.tracks else None
+            state.tracks = tracks
+            state.keys = ordering.spaced(len(tracks))
+            self._write_tracks(tracks, state.keys)
+            tracks = list(tracks)
+        self._tracks_changed(current_track, tracks)
+
+    def insert_tracks(self, position: int, tracks: typing.List[typing.Tuple[int, database.LivePlayerType]]):
+        """
+        Add tracks to the player
+        :param position:  The position to insert the tracks before, the end if past the last track
+        :param tracks:  The tracks to insert
+        """
+        with self._lock:
+            state = self._state
+            current_track = state.tracks[0] if state.tracks else None
+            position = max(0, min(position, len(state.tracks)))
+            keys = ordering.allocate(state.keys, position, len(tracks))
+            state.tracks[position:position] = tracks
+            if keys is None:
+                state.keys = ordering.spaced(len(state.tracks))
+                self._write_tracks(state.tracks, state.keys)
+            else:
+                state.keys[position:position] = keys
+                self._change_rows([], tracks, keys)
+            tracks = list(state.tracks)
+        self._tracks_changed(current_track, tracks)
+
+    def remove_tracks(self, position: int, count: int = 1):
+        """
+        Remove tracks from the player
+        :param position:  The position of the first track to remove
+        :param count:  The number of tracks to remove
+        :raises ValueError:  The tracks are not in the player
+        """
+        with self._lock:
+            state = self._state
+            ordering.check_range(len(state.tracks), position, count)
+            current_track = state.tracks[0]
+            self._change_rows(state.keys[position:position + count])
+            del state.tracks[position:position + count]
+            del state.keys[position:position + count]
+            tracks = list(state.tracks)
+        self._tracks_changed(current_track, tracks)
+
+    def move_tracks(self, position: int, count: int, destination: int):
+        """
+        Move tracks to a different position in the player
+        :param position:  The position of the first track to move
+        :param count:  The number of tracks to move
+        :param destination:  The position to move them to once they have been taken out of the player
+        :raises ValueError:  The tracks are not in the player
+        """
+        with self._lock:
+            state = self._state
+            ordering.check_range(len(state.tracks), position, count)
+            current_track = state.tracks[0]
+            moved = state.tracks[position:position + count]
+            removed = state.keys[position:position + count]
+            del state.tracks[position:position + count]
+            del state.keys[position:position + count]
+            destination = max(0, min(destination, len(state.tracks)))
+            keys = ordering.allocate(state.keys, destination, count)
+            state.tracks[destination:destination] = moved
+            if keys is None:
+                state.keys = ordering.spaced(len(state.tracks))
+                self._write_tracks(state.tracks, state.keys)
+            else:
+                state.keys[destination:destination] = keys
+                self._change_rows(removed, moved, keys)
+            tracks = list(state.tracks)
+        self._tracks_changed(current_track, tracks)
 
     def __iter__(self) -> typing.Iterable[database.Track]:
         """
@@ -0,0 +1,48 @@
+import typing
+
+
+# Ordered entries are stored with a gap between the indexes of neighbours so that they can be
+# inserted, moved or removed by writing only the rows that changed, this is the distance between
+# neighbours when a list is renumbered because there is no room left
+GAP = 1 << 16
+
+
+def spaced(count: int) -> typing.List[int]:
+    """
+    Create evenly spaced keys for a list
+    :param count:  The number of entries in the list
+    :return:  The keys for each entry in order
+    """
+    return [GAP * (index + 1) for index in range(count)]
+
+
+def allocate(keys: typing.Sequence[int], position: int, count: int) -> typing.Optional[typing.List[int]]:
+    """
+    Find keys for new entries inserted before the given position
+    :param keys:  The current keys of the list in order
+    :param position:  The position to insert at, between 0 and len(keys)
+    :param count:  The number of entries being inserted
+    :return:  The keys for the new entries in order, or None if the list must be renumbered
+    """
+    if count == 0:
+        return []
+    if not keys:
+        return spaced(count)
+    lower = keys[position - 1] if position > 0 else keys[0] - GAP * (count + 1)
+    upper = keys[position] if position < len(keys) else keys[-1] + GAP * (count + 1)
+    step = (upper - lower) // (count + 1)
+    if step < 1:
+        return None
+    return [lower + step * (index + 1) for index in range(count)]
+
+
+def check_range(length: int, position: int, count: int) -> None:
+    """
+    Check that a range of entries exists in a list
+    :param length:  The length of the list
+    :param position:  The position of the first entry
+    :param count:  The number of entries
+    :raises ValueError:  The range is outside the list
+    """
+    if count < 1 or position < 0 or position + count > length:
+        raise ValueError('Positions {} to {} are not in the list'.format(position, position + count - 1))
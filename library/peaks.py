@@ -0,0 +1,170 @@
+import typing
+import struct
+import os
+import os.path
+import numpy
+
+
+# The directory the peak files are kept in, next to the library database
+DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'peaks')
+# The number of frames summarised by each value in the finest level
+FRAMES_PER_BIN = 256
+# The sample rate, frames per bin and number of frames at the start of each file
+HEADER = struct.Struct('<IIQ')
+# The rows of (minimum, maximum) pairs that the header takes up
+HEADER_ROWS = HEADER.size // 2
+# The number of values returned when no width is asked for
+DEFAULT_WIDTH = 1024
+
+
+def path(track_id: int) -> str:
+    """
+    Get the file that the peaks for a track are kept in
+    :param track_id:  The ID of the track
+    :return:  The path of the file
+    """
+    return os.path.join(DIRECTORY, '{}.npy'.format(track_id))
+
+
+def remove(track_ids: typing.Iterable[int]) -> None:
+    """
+    Delete the peaks for tracks that have been removed from the library
+    :param track_ids:  The IDs of the tracks
+    """
+    for track_id in track_ids:
+        try:
+            os.remove(path(track_id))
+        except OSError:
+            pass
+
+
+def level_sizes(bins: int) -> typing.List[int]:
+    """
+    Get the number of values in each level, each level halves the one before until there is one left
+    :param bins:  The number of values in the finest level
+    :return:  The number of values in each level from the finest
+    """
+    sizes = [bins]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+
+class PeakBuilder(object):
+    """
+    Collects the minimum and maximum of each bin of a track as it is decoded and builds a
+    pyramid of coarser levels from them
+    """
+
+    def __init__(self):
+        """
+        Start with no audio
+        """
+        self._carry = numpy.zeros((0, 2), numpy.int16)
+        self._minimums = []
+        self._maximums = []
+        self._frames = 0
+        self.samplerate = None
+
+    def add(self, samples: numpy.array, samplerate: int) -> None:
+        """
+        Add decoded audio
+        :param samples:  The int16 samples with a column for each channel
+        :param samplerate:  The sample rate of the audio
+        """
+        self.samplerate = samplerate
+        self._frames += len(samples)
+        # The envelope of all the channels together
+        envelope = numpy.stack((samples.min(axis=1), samples.max(axis=1)), axis=1)
+        if len(self._carry):
+            envelope = numpy.concatenate((self._carry, envelope))
+        whole = len(envelope) - len(envelope) % FRAMES_PER_BIN
+        bins = envelope[:whole].reshape(-1, FRAMES_PER_BIN, 2)
+        self._minimums.append(bins[:, :, 0].min(axis=1))
+        self._maximums.append(bins[:, :, 1].max(axis=1))
+        self._carry = envelope[whole:]
+
+    def pyramid(self) -> numpy.array:
+        """
+        Build every level from the audio added
+        :return:  The int8 (minimum, maximum) pairs of each level from the finest, one after the other
+        """
+        minimums = list(self._minimums)
+        maximums = list(self._maximums)
+        if len(self._carry):
+            # The last bin is shorter than the others
+            minimums.append(self._carry[:, 0].min(keepdims=True))
+            maximums.append(self._carry[:, 1].max(keepdims=True))
+        minimums = numpy.concatenate(minimums) if minimums else numpy.zeros(0, numpy.int16)
+        maximums = numpy.concatenate(maximums) if maximums else numpy.zeros(0, numpy.int16)
+        # Round away from the centre so quiet audio still shows and peaks are never hidden
+        levels = [numpy.stack((
+            minimums.astype(numpy.int32) >> 8,
+            numpy.minimum((maximums.astype(numpy.int32) + 255) >> 8, 127)
+        ), axis=1).astype(numpy.int8)]
+        while len(levels[-1]) > 1:
+            level = levels[-1]
+            if len(level) % 2:
+                level = numpy.concatenate((level, level[-1:]))
+            pairs = level.reshape(-1, 2, 2)
+            levels.append(numpy.stack((pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)), axis=1))
+        return numpy.concatenate(levels)
+
+    def save(self, track_id: int) -> None:
+        """
+        Write the peaks for a track, replacing the file in one step so readers never see it part written
+        :param track_id:  The ID of the track
+        """
+        header = numpy.frombuffer(
+            HEADER.pack(self.samplerate or 0, FRAMES_PER_BIN, self._frames), numpy.int8
+        ).reshape(HEADER_ROWS, 2)
+        os.makedirs(DIRECTORY, exist_ok=True)
+        temporary = path(track_id) + '.tmp.npy'
+        numpy.save(temporary, numpy.concatenate((header, self.pyramid())))
+        os.replace(temporary, path(track_id))
+
+
+def read(track_id: int, width: typing.Optional[int] = None, level: typing.Optional[int] = None,
+         start: float = 0.0, end: typing.Optional[float] = None) -> typing.Optional[typing.Dict]:
+    """
+    Get the peaks for part of a track at a zoom level
+    :param track_id:  The ID of the track
+    :param width:  The most values to return, used to choose the level if one isn't given
+    :param level:  The level to read, 0 is the finest and each level after has half as many values
+    :param start:  The time in seconds to start from
+    :param end:  The time in seconds to end at, the end of the track if not given
+    :return:  The level, the seconds covered by each value and the flat list of minimum and maximum
+              pairs scaled to -128 to 127, None if the track hasn't been analysed
+    :raises ValueError:  The level doesn't exist
+    """
+    try:
+        stored = numpy.load(path(track_id), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    samplerate, frames_per_bin, frames = HEADER.unpack(stored[:HEADER_ROWS].tobytes())
+    if not samplerate:
+        return None
+    sizes = level_sizes(-(-frames // frames_per_bin))
+    duration = frames / samplerate
+    end = duration if end is None else min(end, duration)
+    start = max(0.0, min(start, end))
+    if level is None:
+        # The finest level that fits the part asked for into the width
+        width = width or DEFAULT_WIDTH
+        level = 0
+        while level < len(sizes) - 1 and \
+                (end - start) * samplerate / (frames_per_bin << level) > width:
+            level += 1
+    if not 0 <= level < len(sizes):
+        raise ValueError('The level must be between 0 and {}'.format(len(sizes) - 1))
+    seconds_per_bin = (frames_per_bin << level) / samplerate
+    offset = HEADER_ROWS + sum(sizes[:level])
+    first = min(int(start / seconds_per_bin), sizes[level])
+    last = min(max(first, int(numpy.ceil(end / seconds_per_bin))), sizes[level])
+    return {
+        'level': level,
+        'levels': len(sizes),
+        'seconds_per_bin': seconds_per_bin,
+        'start': first * seconds_per_bin,
+        'peaks': numpy.asarray(stored[offset + first:offset + last]).ravel().tolist(),
+    }
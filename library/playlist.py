@@ -1,5 +1,7 @@
 import typing
+import sqlalchemy
 from . import database
+from . import ordering
 
 
 class Playlist(object):
@@ -45,10 +47,110 @@ class Playlist(object):
     def tracks(self, tracks: typing.List[int]):
         self._session.query(database.PlaylistTrack). \
             filter(database.PlaylistTrack.playlist == self.id).delete()
-        for index, track in enumerate(tracks):
-            self._session.add(database.PlaylistTrack(playlist=self.id, track=track, index=index))
+        self._insert(tracks, ordering.spaced(len(tracks)))
         self._session.commit()
 
+    def _keys(self) -> typing.List[int]:
+        """
+        Get the index of each of the tracks in the playlist
+        :return:  The indexes in order
+        """
+        query = self._session.query(database.PlaylistTrack.index). \
+            filter(database.PlaylistTrack.playlist == self.id). \
+            order_by(database.PlaylistTrack.index)
+        return [index for index, in query]
+
+    def _insert(self, tracks: typing.List[int], keys: typing.List[int]) -> None:
+        """
+        Add tracks to the playlist with a single bulk insert
+        :param tracks:  The IDs of the tracks to add
+        :param keys:  The index of each of the tracks
+        """
+        if tracks:
+            self._session.execute(database.PlaylistTrack.__table__.insert(), [
+                {'playlist': self.id, 'track': track, 'index': key} for track, key in zip(tracks, keys)
+            ])
+
+    def _remove(self, keys: typing.List[int]) -> typing.List[int]:
+        """
+        Remove a contiguous range of tracks from the playlist
+        :param keys:  The indexes of the tracks in the range
+        :return:  The IDs of the tracks that were removed in order
+        """
+        query = self._session.query(database.PlaylistTrack). \
+            filter(database.PlaylistTrack.playlist == self.id). \
+            filter(database.PlaylistTrack.index.between(keys[0], keys[-1]))
+        tracks = [track for track, in query.with_entities(database.PlaylistTrack.track).
+                  order_by(database.PlaylistTrack.index)]
+        query.delete(synchronize_session=False)
+        return tracks
+
+    def _insert_at(self, keys: typing.List[int], position: int, tracks: typing.List[int]) -> None:
+        """
+        Add tracks at a position in the playlist, renumbering it if there is no room
+        :param keys:  The indexes of the tracks that are currently in the playlist
+        :param position:  The position to insert the tracks before
+        :param tracks:  The IDs of the tracks to add
+        """
+        new_keys = ordering.allocate(keys, position, len(tracks))
+        if new_keys is None:
+            existing = self.tracks
+            existing[position:position] = tracks
+            self.tracks = existing
+        else:
+            self._insert(tracks, new_keys)
+
+    def insert_tracks(self, position: int, tracks: typing.List[int]) -> None:
+        """
+        Add tracks to the playlist
+        :param position:  The position to insert the tracks before, the end if past the last track
+        :param tracks:  The IDs of the tracks to add
+        """
+        keys = self._keys()
+        self._insert_at(keys, max(0, min(position, len(keys))), tracks)
+        self._session.commit()
+
+    def remove_tracks(self, position: int, count: int = 1) -> None:
+        """
+        Remove tracks from the playlist
+        :param position:  The position of the first track to remove
+        :param count:  The number of tracks to remove
+        :raises ValueError:  The tracks are not in the playlist
+        """
+        keys = self._keys()
+        ordering.check_range(len(keys), position, count)
+        self._remove(keys[position:position + count])
+        self._session.commit()
+
+    def move_tracks(self, position: int, count: int, destination: int) -> None:
+        """
+        Move tracks to a different position in the playlist
+        :param position:  The position of the first track to move
+        :param count:  The number of tracks to move
+        :param destination:  The position to move them to once they have been taken out of the playlist
+        :raises ValueError:  The tracks are not in the playlist
+        """
+        keys = self._keys()
+        ordering.check_range(len(keys), position, count)
+        tracks = self._remove(keys[position:position + count])
+        del keys[position:position + count]
+        self._insert_at(keys, max(0, min(destination, len(keys))), tracks)
+        self._session.commit()
+
+    def least_recently_played(self) -> typing.Optional[int]:
+        """
+        Find the track in the playlist that was played the longest time ago
+        :return:  The ID of the track, preferring tracks that have never been played, or None if it is empty
+        """
+        last_play = sqlalchemy.func.max(database.TrackPlay.time)
+        query = self._session.query(database.PlaylistTrack.track). \
+            outerjoin(database.TrackPlay, database.TrackPlay.track == database.PlaylistTrack.track). \
+            filter(database.PlaylistTrack.playlist == self.id). \
+            group_by(database.PlaylistTrack.track). \
+            order_by(last_play.isnot(None), last_play, sqlalchemy.func.min(database.PlaylistTrack.index))
+        track = query.first()
+        return None if track is None else track.track
+
     @property
     def id(self) -> int:
         return self._playlist.id
@@ -2,52 +2,514 @@ import audioread
 import eyed3
 import watchdog.observers
 import watchdog.events
+import sqlalchemy
+import collections
+import json
+import threading
+import time
 import os
 import sys
 import typing
+import concurrent.futures
+import analysis
 import database
+import peaks
 
 
-class DirectoryScanner(watchdog.events.FileSystemEventHandler):
+class EventQueue(object):
     """
-    A class that searches a directory for all audio files to populate the database
-    and then watches it for changes.
+    A queue of file system changes that debounces files until they have finished
+    being written and coalesces directory moves and deletes so that the changes
+    can be applied to the database in batches
     """
 
-    def __init__(self, directory: str):
+    # The number of seconds a file must be unchanged for before it is parsed
+    SETTLE_TIME = 2.0
+    # The number of seconds between checking the queue for changes to apply
+    POLL_INTERVAL = 0.5
+    # The maximum number of changes to apply in a single transaction
+    BATCH_SIZE = 500
+    # Files with this extension are still being downloaded, they are parsed once renamed
+    PARTIAL_SUFFIX = '.part'
+
+    # A file that is waiting for its size and modification time to settle
+    Pending = collections.namedtuple('Pending', ('stat', 'changed'))
+
+    def __init__(self, apply: typing.Callable[[typing.List[typing.Tuple], typing.List[str]], None]):
+        """
+        Create an empty queue
+        :param apply:  The callback to apply a batch of moves and deletes and a batch of files to add
+        """
+        self._apply = apply
+        self._lock = threading.Lock()
+        # The moves and deletes in the order they happened, as ('move', src, dest) or ('delete', path)
+        self._structural = []
+        # The files that have been created or modified mapped to their Pending state
+        self._updates = collections.OrderedDict()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def depth(self) -> int:
+        """
+        Get the number of changes waiting to be applied
+        :return:  The number of queued changes
+        """
+        with self._lock:
+            return len(self._structural) + len(self._updates)
+
+    def start(self) -> None:
+        """
+        Start the thread that applies the changes in the queue
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop applying changes from the queue
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @staticmethod
+    def _is_under(path: str, directory: str) -> bool:
+        """
+        Check whether a path is a directory or within the directory
+        :param path:  The path to check
+        :param directory:  The directory to check that it is in
+        :return:  True if the path is the directory or within it
+        """
+        return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+    def update(self, path: str, settle: bool = True) -> None:
+        """
+        Queue a file that has been created or modified to be parsed once it stops changing
+        :param path:  The path to the file
+        :param settle:  False if the file is known to be complete and doesn't need to settle
+        """
+        if path.endswith(self.PARTIAL_SUFFIX):
+            return
+        with self._lock:
+            self._updates.pop(path, None)
+            self._updates[path] = self.Pending(None, time.time() if settle else None)
+
+    def delete(self, path: str, is_directory: bool) -> None:
+        """
+        Queue the removal of a file or a directory of files
+        :param path:  The path that was deleted
+        :param is_directory:  Whether the path was a directory
+        """
+        with self._lock:
+            # Files that haven't been parsed yet don't need to be any more
+            if is_directory:
+                for pending in [x for x in self._updates if self._is_under(x, path)]:
+                    del self._updates[pending]
+            else:
+                self._updates.pop(path, None)
+            # Deleting a directory covers the deletes of its contents immediately before it
+            if is_directory:
+                while self._structural and self._structural[-1][0] == 'delete' and \
+                        self._is_under(self._structural[-1][1], path):
+                    self._structural.pop()
+            # Deleting the contents of a directory that is already deleted does nothing
+            for change in reversed(self._structural):
+                if change[0] != 'delete':
+                    break
+                if self._is_under(path, change[1]):
+                    return
+            self._structural.append(('delete', path))
+
+    def move(self, source: str, destination: str) -> None:
+        """
+        Queue the move of a file or a directory of files
+        :param source:  The path that was moved
+        :param destination:  The path that it was moved to
+        """
+        with self._lock:
+            # Files that are still waiting to be parsed are now waiting at the new location
+            for pending in [x for x in self._updates if self._is_under(x, source)]:
+                self._updates[destination + pending[len(source):]] = self._updates.pop(pending)
+            self._structural.append(('move', source, destination))
+
+    def _take_batch(self) -> typing.Tuple[typing.List[typing.Tuple], typing.List[str]]:
+        """
+        Remove the changes that are ready to be applied from the queue
+        :return:  The moves and deletes and the files that have stopped changing
+        """
+        with self._lock:
+            structural = self._structural[:self.BATCH_SIZE]
+            del self._structural[:self.BATCH_SIZE]
+            candidates = list(self._updates.items())
+        now = time.time()
+        ready = []
+        changed = {}
+        for path, pending in candidates:
+            if len(ready) >= self.BATCH_SIZE:
+                break
+            if pending.changed is None:
+                # The file is known to be complete already
+                ready.append((path, pending, True))
+                continue
+            try:
+                stat = os.stat(path)
+                stat = (stat.st_size, stat.st_mtime)
+            except OSError:
+                # The file has gone before it was parsed
+                ready.append((path, pending, False))
+                continue
+            if pending.stat == stat:
+                if now - pending.changed >= self.SETTLE_TIME:
+                    ready.append((path, pending, True))
+            else:
+                changed[path] = (pending, self.Pending(stat, now if pending.stat is not None else pending.changed))
+        with self._lock:
+            for path, pending, _ in ready:
+                # Only remove it if it hasn't been modified again since we looked at it
+                if self._updates.get(path) is pending:
+                    del self._updates[path]
+            for path, (pending, updated) in changed.items():
+                if self._updates.get(path) is pending:
+                    self._updates[path] = updated
+        return structural, [path for path, _, exists in ready if exists]
+
+    def flush(self) -> None:
+        """
+        Apply all of the changes that are ready to be applied
+        """
+        while True:
+            structural, updates = self._take_batch()
+            if not structural and not updates:
+                break
+            self._apply(structural, updates)
+            depth = self.depth()
+            if depth > 0:
+                print('Scanner applied {} changes, {} queued'.format(len(structural) + len(updates), depth),
+                      file=sys.stderr)
+
+    def _run(self) -> None:
+        """
+        The thread that periodically applies the changes that are ready
+        """
+        while not self._stop.wait(self.POLL_INTERVAL):
+            self.flush()
+
+
+def _lower_priority() -> None:
+    """
+    Run an analysis worker at a low priority so that it doesn't disturb playback
+    """
+    if hasattr(os, 'nice'):
+        os.nice(10)
+
+
+def _analyse(track: typing.Tuple[int, str]) -> typing.Dict[str, typing.Optional[float]]:
+    """
+    Measure a track and save its peaks from the same decoding, run in a worker process
+    :param track:  The ID and location of the track
+    :return:  The measured column values, None where they could not be measured
+    """
+    track_id, location = track
+    builder = peaks.PeakBuilder()
+    measurements = analysis.analyse(location, builder.add)
+    # Silent tracks have no loudness but still have peaks
+    if builder.samplerate:
+        builder.save(track_id)
+    return measurements
+
+
+class AnalysisJob(object):
+    """
+    A background job that measures the loudness and peaks of the tracks that haven't been analysed by the
+    current version of the analysis using a process for each core.  The results are stored on the
+    tracks as each batch finishes, so if the scanner is stopped the job continues from there.
+    """
+
+    # The number of tracks to give each worker in a batch
+    TRACKS_PER_WORKER = 4
+    # The number of seconds to wait before looking for tracks again once they are all analysed
+    IDLE_TIME = 30.0
+
+    def __init__(self, app, changed: typing.Callable[[typing.List[int]], None], workers: int = None):
+        """
+        Prepare the job
+        :param app:  The Flask application to use the database with
+        :param changed:  The callback with the IDs of the tracks that have been analysed
+        :param workers:  The number of processes to analyse with, the number of cores by default
+        """
+        self._app = app
+        self._changed = changed
+        self._workers = workers or os.cpu_count() or 1
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Start analysing tracks in the background
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop analysing once the current batch is finished
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wake(self) -> None:
+        """
+        Look for tracks to analyse now rather than waiting, called when tracks are added
+        """
+        self._wake.set()
+
+    @staticmethod
+    def _outdated():
+        """
+        Get the filter for tracks that need to be analysed
+        :return:  The SQL expression that matches the tracks
+        """
+        return sqlalchemy.or_(
+            database.Track.analysis_version == None,
+            database.Track.analysis_version < analysis.ANALYSIS_VERSION
+        )
+
+    def pending(self) -> int:
+        """
+        Get the number of tracks waiting to be analysed
+        :return:  The number of tracks
+        """
+        with self._app.app_context():
+            session = database.db.session
+            try:
+                return session.query(database.Track.id).filter(self._outdated()).count()
+            finally:
+                session.close()
+
+    def _next_batch(self) -> typing.List[typing.Tuple[int, str]]:
+        """
+        Find the next tracks to analyse
+        :return:  The ID and location of each of the tracks
+        """
+        with self._app.app_context():
+            session = database.db.session
+            try:
+                query = session.query(database.Track.id, database.Track.location).\
+                    filter(self._outdated()).\
+                    order_by(database.Track.id).\
+                    limit(self._workers * self.TRACKS_PER_WORKER)
+                return query.all()
+            finally:
+                session.close()
+
+    def _store(self, results: typing.List[typing.Dict]) -> None:
+        """
+        Save the measurements for a batch of tracks in a single transaction
+        :param results:  The new column values for each track including its ID
+        """
+        with self._app.app_context():
+            session = database.db.session
+            try:
+                session.bulk_update_mappings(database.Track, results)
+                session.commit()
+            finally:
+                session.close()
+
+    def _run(self) -> None:
+        """
+        The thread that hands batches of tracks to the workers and stores the results
+        """
+        with concurrent.futures.ProcessPoolExecutor(self._workers, initializer=_lower_priority) as pool:
+            while not self._stop.is_set():
+                try:
+                    batch = self._next_batch()
+                    if not batch:
+                        self._wake.wait(self.IDLE_TIME)
+                        self._wake.clear()
+                        continue
+                    measurements = pool.map(_analyse, batch)
+                    # Tracks that can't be decoded are still marked as analysed so they aren't tried again
+                    self._store([
+                        dict(values, id=id_, analysis_version=analysis.ANALYSIS_VERSION)
+                        for (id_, _), values in zip(batch, measurements)
+                    ])
+                    self._changed([id_ for id_, _ in batch])
+                except Exception as e:
+                    print('Loudness analysis failed: {}'.format(e), file=sys.stderr)
+                    self._stop.wait(self.IDLE_TIME)
+
+
+class ScannerService(watchdog.events.FileSystemEventHandler):
+    """
+    A service that searches the library root directories for all audio files to populate
+    the database and then watches them for changes.  It is controlled by the server with
+    one JSON command per line on stdin and replies with one JSON object per line on stdout.
+    Changes to existing tracks are announced on stdout as JSON objects with an event name.
+    """
+
+    def __init__(self, app):
         """
         Setup for scanning
-        :param directory:  The directory to scan for audio files in
+        :param app:  The Flask application to use the database with
         """
-        self._directory = directory
+        self._app = app
+        self._queue = EventQueue(self._apply)
+        self._analysis = AnalysisJob(app, self._analysed)
+        self._observer = watchdog.observers.Observer()
+        self._roots = {}
+        self._scanning = set()
+        self._lock = threading.Lock()
+        self._output_lock = threading.Lock()
 
     def start(self):
         """
-        Walk over all the files in this directory recursively to check they are in the library
+        Start watching for changes and applying them to the database
+        """
+        self._queue.start()
+        self._observer.start()
+        self._analysis.start()
+
+    def run(self, commands: typing.Iterable[str]):
+        """
+        Handle commands until there are no more
+        :param commands:  The command lines to handle
+        """
+        for line in commands:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                continue
+            reply = {'id': request.get('id')}
+            handler = getattr(self, '_command_' + str(request.get('command')), None)
+            if handler is None:
+                reply['error'] = 'Unknown command'
+            else:
+                try:
+                    reply['result'] = handler(*request.get('arguments', []))
+                except Exception as e:
+                    reply['error'] = str(e)
+            self._send(reply)
+        self._observer.stop()
+        self._queue.stop()
+        self._analysis.stop()
+
+    def _send(self, message: typing.Dict) -> None:
+        """
+        Send a message to the server
+        :param message:  The message to send
+        """
+        with self._output_lock:
+            sys.stdout.write(json.dumps(message) + '\n')
+            sys.stdout.flush()
+
+    def _command_add(self, directory: str) -> bool:
+        """
+        Start watching a library root directory and add all of the files in it
+        :param directory:  The directory to add
+        :return:  True if it was added, False if it was already being watched
+        """
+        with self._lock:
+            if directory in self._roots:
+                return False
+            self._roots[directory] = self._observer.schedule(self, directory, recursive=True)
+        self._command_rescan(directory)
+        return True
+
+    def _command_remove(self, directory: str) -> bool:
+        """
+        Stop watching a library root directory and remove its tracks
+        :param directory:  The directory to remove
+        :return:  True if it was removed, False if it wasn't being watched
+        """
+        with self._lock:
+            watch = self._roots.pop(directory, None)
+        if watch is None:
+            return False
+        self._observer.unschedule(watch)
+        self._queue.delete(directory, True)
+        return True
+
+    def _command_rescan(self, directory: str = None) -> typing.List[str]:
+        """
+        Walk a library root directory in the background to find any changes that were missed
+        :param directory:  The directory to scan, or None for all of them
+        :return:  The directories that are being scanned
         """
-        for path, _, filenames in os.walk(self._directory):
-            for filename in filenames:
-                self._parse_file(os.path.join(path, filename))
-        directory_observer = watchdog.observers.Observer()
-        directory_observer.schedule(self, self._directory, recursive=True)
-        directory_observer.start()
+        with self._lock:
+            directories = list(self._roots) if directory is None else [directory]
+            directories = [x for x in directories if x in self._roots and x not in self._scanning]
+            self._scanning.update(directories)
+        for root in directories:
+            threading.Thread(target=self._scan, args=(root, ), daemon=True).start()
+        return directories
+
+    def _command_import(self, path: str) -> bool:
+        """
+        Add a file that has just been put in the library without waiting for it to settle
+        :param path:  The file to add
+        :return:  True if it was queued, False if it isn't in a library root
+        """
+        with self._lock:
+            roots = [root.rstrip(os.sep) + os.sep for root in self._roots]
+        if not any(path.startswith(root) for root in roots):
+            return False
+        self._queue.update(path, settle=False)
+        return True
+
+    def _command_status(self) -> typing.Dict:
+        """
+        Get the current state of the scanner
+        :return:  The roots being watched, those being scanned, the number of queued changes and
+                  the number of tracks waiting for loudness analysis
+        """
+        with self._lock:
+            status = {
+                'roots': list(self._roots),
+                'scanning': list(self._scanning),
+                'queue_depth': self._queue.depth()
+            }
+        status['analysis_pending'] = self._analysis.pending()
+        return status
+
+    def _scan(self, directory: str):
+        """
+        Queue all of the files in a directory and the removal of tracks that no longer exist
+        :param directory:  The directory to scan
+        """
+        try:
+            found = set()
+            for path, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    location = os.path.join(path, filename)
+                    found.add(location)
+                    self._queue.update(location, settle=False)
+            with self._app.app_context():
+                session = database.db.session
+                try:
+                    query = session.query(database.Track.location).\
+                        filter(database.Track.location.startswith(directory.rstrip(os.sep) + os.sep))
+                    missing = [location for location, in query if location not in found]
+                finally:
+                    session.close()
+            for location in missing:
+                self._queue.delete(location, False)
+        finally:
+            with self._lock:
+                self._scanning.discard(directory)
 
     def on_moved(self, event: typing.Union[watchdog.events.DirMovedEvent, watchdog.events.FileMovedEvent]):
         """
         Called when a file or a directory is moved or renamed
         :param event:  Event representing file/directory movement
         """
-        session = database.db.session
-        if isinstance(event, watchdog.events.FileMovedEvent):
-            track = session.query(database.Track).filter_by(filename=event.src_path).one_or_none()
-            if track is not None:
-                track.location = event.dest_path
-                session.commit()
-        else:
-            for track in session.query(database.Track).filter(database.Track.location.startswith(event.src_path)).all():
-                track.location = event.dest_path + track.location[len(event.src_path):]
-            session.commit()
-        session.close()
+        self._queue.move(event.src_path, event.dest_path)
 
     def on_created(self, event: typing.Union[watchdog.events.DirCreatedEvent, watchdog.events.FileCreatedEvent]):
         """
@@ -55,20 +517,14 @@ class DirectoryScanner(watchdog.events.FileSystemEventHandler):
         :param event:  Event representing file/directory creation
         """
         if isinstance(event, watchdog.events.FileCreatedEvent):
-            self._parse_file(event.src_path)
+            self._queue.update(event.src_path)
 
     def on_deleted(self, event: typing.Union[watchdog.events.DirDeletedEvent, watchdog.events.FileDeletedEvent]):
         """
         Called when a file or directory is deleted
         :param event:  Event representing file/directory deletion
         """
-        session = database.db.session
-        if isinstance(event, watchdog.events.FileDeletedEvent):
-            session.query(database.Track).filter_by(location=event.src_path).delete()
-        elif isinstance(event, watchdog.events.DirDeletedEvent):
-            session.query(database.Track).filter(database.Track.location.startswith(event.src_path)).delete()
-        session.commit()
-        session.close()
+        self._queue.delete(event.src_path, isinstance(event, watchdog.events.DirDeletedEvent))
 
     def on_modified(self, event: typing.Union[watchdog.events.DirModifiedEvent, watchdog.events.FileModifiedEvent]):
         """
@@ -77,19 +533,122 @@ class DirectoryScanner(watchdog.events.FileSystemEventHandler):
         """
         if isinstance(event, watchdog.events.FileModifiedEvent):
             # If it wasn't there before, but is now playable, add it
-            self._parse_file(event.src_path)
+            self._queue.update(event.src_path)
+
+    def _apply(self, structural: typing.List[typing.Tuple], filenames: typing.List[str]):
+        """
+        Apply a batch of changes to the database in a single transaction
+        :param structural:  The moves and deletes to apply in order
+        :param filenames:  The files that should be added if they aren't already
+        """
+        # Read the files before starting to write so the database isn't locked while parsing
+        with self._app.app_context():
+            session = database.db.session
+            try:
+                tracks = self._parse_files(session, filenames)
+            finally:
+                session.close()
+        with self._app.app_context():
+            session = database.db.session
+            changed = set()
+            removed = set()
+            try:
+                for change in structural:
+                    if change[0] == 'move':
+                        changed.update(self._move(session, change[1], change[2]))
+                    else:
+                        removed.update(self._delete(session, change[1]))
+                changed.update(removed)
+                session.flush()
+                # A move in this batch may have already put a track at the location
+                existing = self._existing(session, [track.location for track in tracks])
+                session.add_all(track for track in tracks if track.location not in existing)
+                session.commit()
+            finally:
+                session.close()
+        peaks.remove(removed)
+        if changed:
+            # Let the server drop any copies of the tracks it has cached
+            self._send({'event': 'tracks_changed', 'ids': sorted(changed)})
+        if tracks:
+            self._analysis.wake()
+
+    def _analysed(self, ids: typing.List[int]) -> None:
+        """
+        Called when the loudness of tracks has been measured
+        :param ids:  The IDs of the tracks that were analysed
+        """
+        self._send({'event': 'tracks_changed', 'ids': ids})
 
     @staticmethod
-    def _parse_file(filename: str):
+    def _move(session, source: str, destination: str) -> typing.List[int]:
         """
-        Add a new file to the database if it doesn't already exist and it is an audio file
-        :param filename:  The path of the file to add
+        Update the location of any tracks that have been moved
+        :param session:  The database session to update in
+        :param source:  The file or directory that was moved
+        :param destination:  Where it was moved to
+        :return:  The IDs of the tracks that were moved
+        """
+        prefix = source.rstrip(os.sep) + os.sep
+        query = session.query(database.Track).filter(sqlalchemy.or_(
+            database.Track.location == source,
+            database.Track.location.startswith(prefix)
+        ))
+        tracks = query.all()
+        for track in tracks:
+            track.location = destination + track.location[len(source):]
+        return [track.id for track in tracks]
+
+    @staticmethod
+    def _delete(session, path: str) -> typing.List[int]:
+        """
+        Remove any tracks for a file or directory that was deleted
+        :param session:  The database session to update in
+        :param path:  The file or directory that was deleted
+        :return:  The IDs of the tracks that were removed
+        """
+        prefix = path.rstrip(os.sep) + os.sep
+        query = session.query(database.Track).filter(sqlalchemy.or_(
+            database.Track.location == path,
+            database.Track.location.startswith(prefix)
+        ))
+        ids = [track_id for track_id, in query.with_entities(database.Track.id)]
+        if ids:
+            query.delete(synchronize_session=False)
+        return ids
+
+    @staticmethod
+    def _existing(session, filenames: typing.List[str]) -> typing.Set[str]:
+        """
+        Find which of the given files are already in the database
+        :param session:  The database session to query
+        :param filenames:  The paths of the files to look for
+        :return:  The paths that already have a track
+        """
+        if not filenames:
+            return set()
+        query = session.query(database.Track.location).filter(database.Track.location.in_(filenames))
+        return set(location for location, in query)
+
+    @classmethod
+    def _parse_files(cls, session, filenames: typing.List[str]) -> typing.List[database.Track]:
+        """
+        Parse the files that aren't already in the database
+        :param session:  The database session to check for existing tracks in
+        :param filenames:  The paths of the files to parse
+        :return:  The new tracks for the files that are audio files
+        """
+        existing = cls._existing(session, filenames)
+        tracks = (cls._parse_file(filename) for filename in filenames if filename not in existing)
+        return [track for track in tracks if track is not None]
+
+    @staticmethod
+    def _parse_file(filename: str) -> typing.Optional[database.Track]:
+        """
+        Read the details of a file if it is an audio file
+        :param filename:  The path of the file to parse
+        :return:  The new track for the file or None if it isn't playable
         """
-        session = database.db.session
-        file = session.query(database.Track).filter_by(location=filename).one_or_none()
-        if file is not None:
-            session.close()
-            return
         try:
             with audioread.audio_open(filename) as track:
                 length = track.duration
@@ -97,22 +656,22 @@ class DirectoryScanner(watchdog.events.FileSystemEventHandler):
         except:
             length = 0.0
             valid = False
-        if valid and length > 0.0:
-            try:
-                file = eyed3.load(filename)
-                artist = file.tag.artist
-                title = file.tag.title
-            except:
-                artist = ''
-                title = ''
-            session.add(database.Track(location=filename, artist=artist, title=title, length=length))
-            session.commit()
-        session.close()
+        if not valid or length <= 0.0:
+            return None
+        try:
+            file = eyed3.load(filename)
+            artist = file.tag.artist
+            title = file.tag.title
+        except:
+            artist = ''
+            title = ''
+        return database.Track(location=filename, artist=artist, title=title, length=length)
 
 
 if __name__ == "__main__":
     import flask
     app = flask.Flask(__name__)
     database.init_app(app)
-    with app.app_context():
-        DirectoryScanner(sys.argv[1]).start()
+    service = ScannerService(app)
+    service.start()
+    service.run(sys.stdin)
@@ -1,6 +1,54 @@
 import typing
+import datetime
+import collections
+import threading
 import sqlalchemy
 from . import database
+from .writer import writer
+
+
+class TrackCache(object):
+    """
+    A bounded cache of the track details so that reading a track doesn't touch the database
+    """
+
+    # The maximum number of tracks to keep
+    SIZE = 4096
+
+    _tracks = collections.OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, id: int) -> typing.Optional[typing.Dict]:
+        """
+        Get the details of a track, loading it from the database if it isn't cached
+        :param id:  The ID of the track
+        :return:  The column values of the track or None if it doesn't exist
+        """
+        with cls._lock:
+            track = cls._tracks.get(id)
+            if track is not None:
+                cls._tracks.move_to_end(id)
+                return track
+        row = database.db.session.query(database.Track).get(id)
+        if row is None:
+            return None
+        track = {column.name: getattr(row, column.name) for column in database.Track.__table__.columns}
+        with cls._lock:
+            cls._tracks[id] = track
+            while len(cls._tracks) > cls.SIZE:
+                cls._tracks.popitem(last=False)
+        return track
+
+    @classmethod
+    def invalidate(cls, ids: typing.Iterable[int]) -> None:
+        """
+        Remove tracks that have changed in the database
+        :param ids:  The IDs of the tracks that changed
+        """
+        with cls._lock:
+            for id in ids:
+                cls._tracks.pop(id, None)
 
 
 class Track(object):
@@ -13,29 +61,26 @@ class Track(object):
         Open a track or editing
         :param id:  The ID of the track
         """
-        session = database.db.session
-        self.__dict__['_session'] = session
-        self.__dict__['_track'] = session.query(database.Track).get(id)
+        self.__dict__['_id'] = id
+        self.__dict__['_track'] = TrackCache.get(id)
 
     def record_play(self):
         """
-        Record a track being played
+        Record a track being played, the play is written in the background as a plain insert so that
+        it can be written again on its own if the batch it is in fails
         """
-        session = database.db.session
-        session.add(database.TrackPlay(track=self._track.id))
-        session.commit()
+        play = {'track': self._id, 'time': datetime.datetime.utcnow()}
+        writer.submit(lambda session: session.execute(database.TrackPlay.__table__.insert(), [play]))
 
     def last_play(self):
         """
         Get the last time this track was played
         :return:  The last time the track was played
         """
-        session = self._session
-        last_play = session.query(database.TrackPlay). \
-            filter(database.TrackPlay.track == self._track.id). \
-            order_by(database.TrackPlay.time). \
-            first()
-        return None if last_play is None else last_play.time
+        session = database.db.session
+        return session.query(sqlalchemy.func.max(database.TrackPlay.time)). \
+            filter(database.TrackPlay.track == self._id). \
+            scalar()
 
     def __getattr__(self, item):
         """
@@ -43,8 +88,10 @@ class Track(object):
         :param item:  The name of the attribute to get
         :return:  The underlying attribute
         """
-        local_value = getattr(self.__dict__, item, None)
-        return local_value if local_value is not None else getattr(self.__dict__['_track'], item)
+        track = self.__dict__['_track']
+        if track is None or item not in track:
+            raise AttributeError(item)
+        return track[item]
 
     def __setattr__(self, key, value):
         """
@@ -52,9 +99,12 @@ class Track(object):
         :param key:  The item to update
         :param value:  The value to set
         """
-        track = self.__dict__['_track']
+        session = database.db.session
+        track = session.query(database.Track).get(self._id)
         setattr(track, key, value)
-        self.__dict__['_session'].commit()
+        session.commit()
+        TrackCache.invalidate((self._id, ))
+        self.__dict__['_track'] = TrackCache.get(self._id)
 
 
 class Tracks(object):
@@ -62,6 +112,28 @@ class Tracks(object):
     An accessor for searching tracks
     """
 
+    # The maximum number of IDs to put in a single query
+    _CHUNK_SIZE = 500
+
+    @classmethod
+    def with_last_play(cls, ids: typing.Iterable[int]) -> \
+            typing.Iterable[typing.Tuple[database.Track, typing.Optional[datetime.datetime]]]:
+        """
+        Get many tracks and the last time each was played
+        :param ids:  The IDs of the tracks to get
+        :return:  An iterator of the tracks that exist and their last play time
+        """
+        ids = list(ids)
+        session = database.db.session
+        last_play = sqlalchemy.func.max(database.TrackPlay.time)
+        for start in range(0, len(ids), cls._CHUNK_SIZE):
+            query = session.query(database.Track, last_play). \
+                outerjoin(database.TrackPlay, database.TrackPlay.track == database.Track.id). \
+                filter(database.Track.id.in_(ids[start:start + cls._CHUNK_SIZE])). \
+                group_by(database.Track.id)
+            for track, played in query.all():
+                yield track, played
+
     def __init__(self, results: int, query: str = None):
         """
         Start a query for a given track
@@ -0,0 +1,140 @@
+import typing
+import threading
+import queue
+import atexit
+import sys
+import flask
+from . import database
+
+
+class Writer(object):
+    """
+    A background writer that applies database changes in batches so that the caller
+    doesn't have to wait for the database
+    """
+
+    # The maximum number of operations to apply in one transaction
+    BATCH_SIZE = 200
+
+    def __init__(self):
+        """
+        Create the writer, the thread is started when the first operation is submitted
+        """
+        self._queue = queue.Queue()
+        self._app = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, operation: typing.Callable[[typing.Any], None],
+               on_error: typing.Optional[typing.Callable[[Exception], None]] = None) -> None:
+        """
+        Queue a change to be made to the database, operations are applied in the order submitted
+        :param operation:  A function that is passed the session to make the change in
+        :param on_error:  Called on the writer thread with the error if the change can't be written,
+                          so that the owner can bring its copy back in line with the database
+        """
+        with self._lock:
+            if self._app is None:
+                self._app = flask.current_app._get_current_object()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        self._queue.put((operation, on_error))
+
+    def depth(self) -> int:
+        """
+        Get the number of operations waiting to be written
+        :return:  The number of queued operations
+        """
+        return self._queue.qsize()
+
+    def _take_batch(self) -> typing.List[typing.Any]:
+        """
+        Wait for the next operations in the queue
+        :return:  The operations to apply
+        """
+        batch = [self._queue.get()]
+        while len(batch) < self.BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _apply(operations: typing.List[typing.Tuple[typing.Callable, typing.Optional[typing.Callable]]]) -> None:
+        """
+        Apply operations in a single transaction
+        :param operations:  The operations and their error handlers
+        :raises Exception:  An operation failed and nothing was written
+        """
+        session = database.db.session
+        try:
+            for operation, _ in operations:
+                operation(session)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @staticmethod
+    def _failed(on_error: typing.Optional[typing.Callable[[Exception], None]], error: Exception) -> None:
+        """
+        Tell the owner of an operation that it couldn't be written
+        :param on_error:  The error handler it was submitted with
+        :param error:  The error that it failed with
+        """
+        if on_error is None:
+            print('Failed to write a change to the library: {}'.format(error), file=sys.stderr)
+            return
+        try:
+            on_error(error)
+        except Exception as e:
+            print('Failed to handle a failed library write: {}'.format(e), file=sys.stderr)
+
+    def _write(self, batch: typing.List[typing.Any]) -> None:
+        """
+        Apply a batch of operations in a single transaction, if it fails they are applied again one
+        at a time so that only the operations that fail are lost and later ones still see the rest
+        :param batch:  The operations to apply and flush markers to set once they are written
+        """
+        operations = [operation for operation in batch if not isinstance(operation, threading.Event)]
+        if operations:
+            with self._app.app_context():
+                try:
+                    self._apply(operations)
+                except Exception:
+                    for operation, on_error in operations:
+                        try:
+                            self._apply([(operation, on_error)])
+                        except Exception as e:
+                            self._failed(on_error, e)
+        for marker in batch:
+            if isinstance(marker, threading.Event):
+                marker.set()
+
+    def _run(self) -> None:
+        """
+        Apply operations as they are submitted
+        """
+        while True:
+            self._write(self._take_batch())
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Wait for everything that has been submitted so far to be written
+        :param timeout:  The maximum number of seconds to wait
+        :return:  True if everything was written, False if it timed out
+        """
+        if self._thread is None:
+            return True
+        marker = threading.Event()
+        self._queue.put(marker)
+        return marker.wait(timeout)
+
+
+# The writer shared by the library for changes that are not needed immediately
+writer = Writer()
@@ -1,16 +1,304 @@
-import pytube
+import typing
+import itertools
+import threading
+import collections
+import concurrent.futures
+import http.client
+import urllib.error
+import urllib.request
+import sys
+import os
+import os.path
+from . import library
 
 
-def import_video(url: str, location: str) -> str:
+# The extension of downloads that haven't finished, which the scanner ignores
+PARTIAL_SUFFIX = '.part'
+
+
+def resolve(url: str) -> typing.Tuple[str, str]:
+    """
+    Find the audio stream of a YouTube video
+    :param url:  The YouTube URL of the video
+    :return:  The URL to download the audio from and the name to give the file
+    """
+    import pytube
+    stream = pytube.YouTube(url).streams.filter(only_audio=True, subtype='mp4').first()
+    if stream is None:
+        raise ValueError('The video has no audio to download')
+    return stream.url, stream.default_filename
+
+
+class Cancelled(Exception):
+    """
+    Raised in an import when it has been cancelled
+    """
+    pass
+
+
+class ImportJob(object):
     """
-    Download the audio from a YouTube video
-    :param url:  The YouTube URL to download from
-    :param location:  The directory to download it to
-    :return:  The name of the file that was downloaded
+    A download of a video's audio into the library, which resumes where it stopped if the connection
+    drops and then hands the file to the library scanner
     """
-    yt = pytube.YouTube(url)
-    file = yt.streams. \
-        filter(only_audio=True, subtype='mp4'). \
-        first(). \
-        download(location)
-    return file
+
+    # The number of bytes to read at a time
+    CHUNK_SIZE = 64 * 1024
+    # The number of times to try downloading before giving up, each try carries on from the last
+    ATTEMPTS = 5
+    # The number of seconds to wait before trying again, doubled each time
+    RETRY_DELAY = 1.0
+    # The number of seconds to wait for the remote server
+    TIMEOUT = 30.0
+    # The change in progress before clients are sent it
+    PROGRESS_RESOLUTION = 0.01
+    # The states of an import that hasn't ended
+    ACTIVE = ('queued', 'downloading', 'importing')
+
+    # The files being downloaded by any import, so that two imports never write the same file
+    _paths = set()
+    _paths_lock = threading.Lock()
+
+    def __init__(self, job_id: str, url: str, directory: str,
+                 resolver: typing.Callable[[str], typing.Tuple[str, str]] = resolve, socketio=None):
+        """
+        Create an import, it is run by ImportJobs
+        :param job_id:  The ID of the job
+        :param url:  The URL of the video to import
+        :param directory:  The library directory to download it into
+        :param resolver:  Finds the URL to download and the file name for the URL
+        :param socketio:  The SocketIO server to tell clients about the progress
+        """
+        self.id = job_id
+        self.url = url
+        self.directory = directory
+        self._resolver = resolver
+        self._socketio = socketio
+        self.state = 'queued'
+        self.error = None
+        self.path = None
+        self.downloaded = 0
+        self.size = None
+        self._sent = None
+        self._cancelled = threading.Event()
+
+    @property
+    def progress(self) -> float:
+        """
+        Get how much of the file has been downloaded
+        :return:  The fraction done between 0 and 1
+        """
+        if self.state in ('importing', 'finished'):
+            return 1.0
+        if not self.size:
+            return 0.0
+        return min(1.0, self.downloaded / self.size)
+
+    def status(self) -> typing.Dict:
+        """
+        Get the state of the import for clients
+        :return:  The state, progress and any error
+        """
+        return {
+            'id': self.id,
+            'url': self.url,
+            'state': self.state,
+            'progress': self.progress,
+            'path': self.path,
+            'error': self.error,
+        }
+
+    def _emit(self) -> None:
+        """
+        Tell the clients about the state of the import
+        """
+        self._sent = self.progress
+        if self._socketio is not None:
+            self._socketio.emit('import_update', self.status())
+
+    def _set_state(self, state: str) -> None:
+        """
+        Change the state of the import and tell the clients
+        :param state:  The new state
+        """
+        self.state = state
+        self._emit()
+
+    def _download(self, source: str, partial: str) -> None:
+        """
+        Download to the partial file, carrying on from the end of it if it is already there
+        :param source:  The URL to download
+        :param partial:  The file to download into
+        :raises OSError:  The download failed or stopped early
+        :raises http.client.HTTPException:  The server sent a broken response
+        :raises Cancelled:  The import was cancelled
+        """
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        request = urllib.request.Request(source)
+        if offset:
+            request.add_header('Range', 'bytes={}-'.format(offset))
+        try:
+            response = urllib.request.urlopen(request, timeout=self.TIMEOUT)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                # There is nothing after the end, it was all downloaded before
+                return
+            raise
+        with response:
+            if response.status != 206:
+                # The server sent the whole file
+                offset = 0
+            length = response.headers.get('Content-Length')
+            self.size = None if length is None else offset + int(length)
+            self.downloaded = offset
+            with open(partial, 'ab' if offset else 'wb') as output:
+                while True:
+                    if self._cancelled.is_set():
+                        raise Cancelled()
+                    chunk = response.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    output.write(chunk)
+                    self.downloaded += len(chunk)
+                    if self._sent is None or self.progress - self._sent > self.PROGRESS_RESOLUTION:
+                        self._emit()
+        if self.size is not None and self.downloaded < self.size:
+            raise OSError('The download stopped early')
+
+    def _fetch(self, source: str, path: str) -> None:
+        """
+        Download the file, trying again from where it stopped if it fails
+        :param source:  The URL to download
+        :param path:  Where to put the file once it has all been downloaded
+        :raises OSError:  The download failed too many times
+        :raises http.client.HTTPException:  The server sent a broken response too many times
+        :raises Cancelled:  The import was cancelled
+        """
+        partial = path + PARTIAL_SUFFIX
+        delay = self.RETRY_DELAY
+        for attempt in range(1, self.ATTEMPTS + 1):
+            try:
+                self._download(source, partial)
+                break
+            except (OSError, http.client.HTTPException) as e:
+                if attempt == self.ATTEMPTS or \
+                        (isinstance(e, urllib.error.HTTPError) and e.code in (401, 403, 404, 410)):
+                    raise
+                print('Import of {} failed, trying again: {}'.format(self.url, e), file=sys.stderr)
+            if self._cancelled.wait(delay):
+                raise Cancelled()
+            delay *= 2
+        os.replace(partial, path)
+
+    def run(self) -> None:
+        """
+        Download the file and add it to the library, this is run by a worker
+        """
+        if self._cancelled.is_set():
+            return
+        self._set_state('downloading')
+        try:
+            source, filename = self._resolver(self.url)
+            path = os.path.join(self.directory, os.path.basename(filename))
+            with self._paths_lock:
+                if path in self._paths:
+                    raise ValueError('Another import is already downloading this file')
+                self._paths.add(path)
+            try:
+                self.path = path
+                if not os.path.exists(path):
+                    self._fetch(source, path)
+            finally:
+                with self._paths_lock:
+                    self._paths.discard(path)
+            self._set_state('importing')
+            if not library.Library.import_file(self.path):
+                raise ValueError('The library scanner refused the file, the directory may have been removed')
+            self._set_state('finished')
+        except Cancelled:
+            self._set_state('cancelled')
+        except Exception as e:
+            self.error = str(e)
+            self._set_state('failed')
+
+    def cancel(self) -> None:
+        """
+        Stop the import if it hasn't finished, the partial download is kept so it can be resumed
+        """
+        self._cancelled.set()
+        if self.state == 'queued':
+            self._set_state('cancelled')
+
+
+class ImportJobs(object):
+    """
+    The imports that have been requested since the server started, a few are downloaded at a time
+    and the rest wait their turn
+    """
+
+    # The number of imports to download at once
+    WORKERS = 3
+
+    _jobs = collections.OrderedDict()
+    _ids = itertools.count(1)
+    _executor = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def create(cls, url: str, directory: str, socketio=None,
+               resolver: typing.Callable[[str], typing.Tuple[str, str]] = resolve) -> ImportJob:
+        """
+        Queue an import of a video into the library
+        :param url:  The URL of the video
+        :param directory:  The library directory to download it into
+        :param socketio:  The SocketIO server to tell clients about the progress
+        :param resolver:  Finds the URL to download and the file name for the URL
+        :return:  The job that was queued
+        :raises ValueError:  The video is already being imported into the directory
+        """
+        with cls._lock:
+            for existing in cls._jobs.values():
+                if existing.url == url and existing.directory == directory and existing.state in ImportJob.ACTIVE:
+                    raise ValueError('The video is already being imported into that directory')
+            job = ImportJob(str(next(cls._ids)), url, directory, resolver, socketio)
+            cls._jobs[job.id] = job
+            if cls._executor is None:
+                cls._executor = concurrent.futures.ThreadPoolExecutor(cls.WORKERS)
+            cls._executor.submit(job.run)
+        return job
+
+    @classmethod
+    def get(cls) -> typing.List[ImportJob]:
+        """
+        Get all of the imports
+        :return:  The imports in the order they were requested
+        """
+        with cls._lock:
+            return list(cls._jobs.values())
+
+    @classmethod
+    def get_job(cls, job_id: str) -> ImportJob:
+        """
+        Get an import
+        :param job_id:  The ID of the import
+        :return:  The import
+        :raises ValueError:  No such import
+        """
+        with cls._lock:
+            job = cls._jobs.get(job_id)
+        if job is None:
+            raise ValueError('No such import found')
+        return job
+
+    @classmethod
+    def remove(cls, job_id: str) -> None:
+        """
+        Cancel an import if it hasn't finished and forget about it
+        :param job_id:  The ID of the import
+        :raises ValueError:  No such import
+        """
+        with cls._lock:
+            job = cls._jobs.pop(job_id, None)
+        if job is None:
+            raise ValueError('No such import found')
+        job.cancel()
@@ -0,0 +1,72 @@
+import { useEffect, useState } from 'react';
+import { useSocket } from './socket.js';
+
+// Each value in a state message is a little endian uint16 key index and float32 value
+const ENTRY_SIZE = 6;
+
+const listeners = {};
+const keys = {};
+const values = {};
+let attachedSocket = null;
+
+const subscribe = (socket, subscribeKeys) => {
+    socket.emit('state_subscribe', subscribeKeys, indexes => {
+        Object.keys(indexes).forEach(key => { keys[indexes[key]] = key; });
+    });
+};
+
+const handleState = data => {
+    const view = new DataView(data);
+    for (let offset = 0; offset + ENTRY_SIZE <= view.byteLength; offset += ENTRY_SIZE) {
+        const key = keys[view.getUint16(offset, true)];
+        if (key === undefined) {
+            continue;
+        }
+        const value = view.getFloat32(offset + 2, true);
+        values[key] = value;
+        if (key in listeners) {
+            listeners[key].forEach(listener => listener(value));
+        }
+    }
+};
+
+const attach = socket => {
+    if (attachedSocket === socket) {
+        return;
+    }
+    attachedSocket = socket;
+    socket.on('state', handleState);
+    // The subscriptions are lost if the socket reconnects
+    socket.on('reconnect', () => {
+        const subscribed = Object.keys(listeners);
+        if (subscribed.length > 0) {
+            subscribe(socket, subscribed);
+        }
+    });
+};
+
+const useBroadcast = (key, initial = 0.0) => {
+    const socket = useSocket();
+    const [ value, setValue ] = useState(key in values ? values[key] : initial);
+
+    useEffect(() => {
+        attach(socket);
+        if (!(key in listeners)) {
+            listeners[key] = new Set();
+            subscribe(socket, [key]);
+        }
+        listeners[key].add(setValue);
+        return () => {
+            listeners[key].delete(setValue);
+            if (listeners[key].size == 0) {
+                delete listeners[key];
+                delete values[key];
+                socket.emit('state_unsubscribe', [key]);
+            }
+        };
+    }, [socket, key]);
+
+    return value;
+};
+
+export default useBroadcast;
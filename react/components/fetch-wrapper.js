@@ -21,9 +21,10 @@ const fetchWrap = (url, data, method) => {
 const fetchPut = (url, data) => fetchWrap(url, data, 'PUT');
 const fetchPost = (url, data) => fetchWrap(url, data, 'POST');
 const fetchDelete = (url, data) => fetchWrap(url, data, 'DELETE');
+const fetchPatch = (url, data) => fetchWrap(url, data, 'PATCH');
 
 const fetchGet = (url, init) => fetch(url, init)
     .then(handleErrors)
     .then(response => response.json());
 
-export { fetchPut, fetchPost, fetchGet, fetchDelete };
+export { fetchPut, fetchPost, fetchGet, fetchDelete, fetchPatch };
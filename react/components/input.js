@@ -11,6 +11,7 @@ import TextField from '@material-ui/core/TextField';
 import { confirmAlert } from 'react-confirm-alert';
 import 'react-confirm-alert/src/react-confirm-alert.css';
 import useServerValue from './server-value.js';
+import Meter from './meter.js';
 import { fetchGet, fetchDelete } from './fetch-wrapper.js';
 
 const useStyles = makeStyles({
@@ -53,6 +54,7 @@ const Input = ({input}) => {
                     {title(input)}
                 </Typography>
                 <TextField label="Name" value={displayName} onChange={e => setDisplayName(e.target.value)} />
+                <Meter source={input.id} />
             </CardContent>
             <CardContent>
                 <Typography>{input.name}</Typography>
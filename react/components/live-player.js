@@ -23,7 +23,8 @@ import Skeleton from '@material-ui/lab/Skeleton';
 import Autocomplete from '@material-ui/lab/Autocomplete';
 import { DragDropContext, Droppable, Draggable } from 'react-beautiful-dnd';
 import { useSocket } from './socket.js';
-import { fetchGet, fetchPut } from './fetch-wrapper.js';
+import useBroadcast from './broadcast.js';
+import { fetchGet, fetchPut, fetchPatch } from './fetch-wrapper.js';
 import { usePlayers } from './player-store.js';
 import Time from './time.js';
 
@@ -45,6 +46,44 @@ const useStyles = makeStyles({
 });
 
 const TrackCache = {};
+let pendingTracks = null;
+
+const fetchTracks = batch => {
+    const ids = Object.keys(batch);
+    fetchGet('/library/track/info?ids=' + ids.join(','))
+        .then(tracks => {
+            tracks.forEach(track => {
+                TrackCache[track.id] = track;
+                batch[track.id].resolve(track);
+                delete batch[track.id];
+            });
+            Object.keys(batch).forEach(id => {
+                delete TrackCache[id];
+                batch[id].reject(new Error('Unknown track ' + id));
+            });
+        })
+        .catch(e => Object.keys(batch).forEach(id => {
+            delete TrackCache[id];
+            batch[id].reject(e);
+        }));
+};
+
+// Collect the track lookups made while rendering so they are fetched in a single request
+const loadTrack = id => {
+    if (!(id in TrackCache)) {
+        if (pendingTracks === null) {
+            pendingTracks = {};
+            setTimeout(() => {
+                const batch = pendingTracks;
+                pendingTracks = null;
+                fetchTracks(batch);
+            }, 0);
+        }
+        const batch = pendingTracks;
+        TrackCache[id] = new Promise((resolve, reject) => { batch[id] = { resolve, reject }; });
+    }
+    return Promise.resolve(TrackCache[id]);
+};
 
 const PlaylistHeader = () => (
     <TableRow>
@@ -94,27 +133,11 @@ const PlaylistItem = React.forwardRef(
             setLength(track.length);
         };
 
-        if (item.id in TrackCache) {
-            const cacheValue = TrackCache[item.id];
-            if (cacheValue instanceof Promise) {
-                cacheValue.then(track => { resolved(track); return track; });
-            } else {
-                resolved(cacheValue);
-            }
-        } else {
-            const abortController = new AbortController();
-            const promise = fetchGet('/library/track/' + item.id + '/info', {signal: abortController.signal})
-                .then(track => { TrackCache[item.id] = track; return track; })
-                .then(track => { resolved(track); return track; })
-                .catch(e => console.error(e));
-            TrackCache[item.id] = promise;
-            return () => {
-                abortController.abort();
-                if (TrackCache[item.id] instanceof Promise) {
-                    delete TrackCache[item.id];
-                }
-            }
-        }
+        let cancelled = false;
+        loadTrack(item.id)
+            .then(track => { if (!cancelled) { resolved(track); } })
+            .catch(e => console.error(e));
+        return () => { cancelled = true; };
     }, [item.id]);
 
     const toggleType = () => {
@@ -281,7 +304,7 @@ const LivePlayer = ({ player_id }) => {
     const [ jingleCount, setJingleCount ] = useState(0);
     const [ state, setState ] = useState('paused');
     const [ jinglePlaylist, setJinglePlaylist ] = useState('');
-    const [ currentTime, setCurrentTime ] = useState(0.0);
+    const currentTime = useBroadcast('player_time_' + player_id);
     const [ startTime, setStartTime ] = useState(0);
     const [ trackLengths, setTrackLengths ] = useState([]);
 
@@ -317,14 +340,12 @@ const LivePlayer = ({ player_id }) => {
         socket.on('player_jingles_' + player_id, setJinglePlaylist);
         socket.on('player_tracks_' + player_id, setTracks);
         socket.on('player_state_' + player_id, setState);
-        socket.on('player_tracktime_' + player_id, setCurrentTime);
         return () => {
             socket.off('player_update', updatePlayer);
             socket.off('player_jinglecount_' + player_id, setJingleCount);
             socket.off('player_jingles_' + player_id, setJinglePlaylist);
             socket.off('player_tracks_' + player_id, setTracks);
             socket.off('player_state_' + player_id, setState);
-            socket.off('player_tracktime_' + player_id, setCurrentTime);
         };
     }, [socket, player_id]);
 
@@ -334,17 +355,27 @@ const LivePlayer = ({ player_id }) => {
             .catch(e => console.error(e));
     };
 
+    const patchTracks = edit => {
+        fetchPatch('/player/' + player_id + '/tracks', edit)
+            .catch(e => console.error(e));
+    };
+
+    const insertTracks = (position, trackIds) => {
+        patchTracks({
+            action: 'insert',
+            position: position,
+            tracks: trackIds,
+            types: trackIds.map(() => 'play_next'),
+        });
+    };
+
     const addTrack = trackId => {
-        let newTracks = tracks.slice(0);
-        newTracks.splice(tracks.length > 0 ? 1 : 0, 0, {id: trackId, type: 'play_next'});
-        putTracks(newTracks);
+        insertTracks(tracks.length > 0 ? 1 : 0, [trackId]);
     };
 
     const addPlaylist = playlistId => {
         fetchGet('/playlist/' + playlistId)
-            .then(playlistTracks => putTracks(
-                tracks.concat(playlistTracks.map(track => ({id: track.id, type: 'play_next'}))))
-            )
+            .then(playlistTracks => insertTracks(tracks.length, playlistTracks.map(track => track.id)))
             .catch(e => console.error(e));
     };
 
@@ -360,13 +391,11 @@ const LivePlayer = ({ player_id }) => {
     };
 
     const remove = index => {
-        let newTracks = tracks.slice(0);
-        newTracks.splice(index, 1);
-        putTracks(newTracks);
+        patchTracks({action: 'remove', position: index});
     };
 
     const skip = () => {
-        putTracks(tracks.slice(1));
+        patchTracks({action: 'remove', position: 0});
     };
 
     const onDragEnd = ({ source, destination }) => {
@@ -378,9 +407,9 @@ const LivePlayer = ({ player_id }) => {
         setTracks(tracks => {
             const newTracks = tracks.slice(0);
             newTracks.splice(destination.index, 0, newTracks.splice(source.index, 1)[0]);
-            putTracks(newTracks);
             return newTracks;
         });
+        patchTracks({action: 'move', position: source.index, destination: destination.index});
     };
 
     const setTrackLength = (index, length) => {
@@ -0,0 +1,93 @@
+import React, { useEffect, useState } from 'react';
+import makeStyles from '@material-ui/core/styles/makeStyles';
+import useBroadcast from './broadcast.js';
+import { useSocket } from './socket.js';
+import { fetchPut, fetchDelete } from './fetch-wrapper.js';
+
+// The range of levels shown on the meter in dBFS
+const MIN_LEVEL = -60.0;
+
+const useStyles = makeStyles({
+    meter: {
+        display: 'inline-flex',
+        height: '100px',
+        margin: '0 4px',
+    },
+    channel: {
+        position: 'relative',
+        width: '8px',
+        margin: '0 1px',
+        background: '#dedede',
+    },
+    rms: {
+        position: 'absolute',
+        bottom: 0,
+        width: '100%',
+        background: '#4caf50',
+    },
+    peak: {
+        position: 'absolute',
+        width: '100%',
+        height: '2px',
+    },
+});
+
+const toPercent = level => Math.max(0, Math.min(100, (level - MIN_LEVEL) * 100 / -MIN_LEVEL));
+
+const MeterChannel = ({ keys }) => {
+    const classes = useStyles();
+    const rms = useBroadcast(keys.rms, -100.0);
+    const truePeak = useBroadcast(keys.true_peak, -100.0);
+
+    return (
+        <div className={classes.channel}>
+            <div className={classes.rms} style={{height: toPercent(rms) + '%'}} />
+            <div
+                className={classes.peak}
+                style={{bottom: toPercent(truePeak) + '%', background: truePeak > -1.0 ? '#f44336' : '#333'}}
+            />
+        </div>
+    );
+};
+
+const Meter = ({ source }) => {
+    const classes = useStyles();
+    const [ channels, setChannels ] = useState([]);
+    const socket = useSocket();
+
+    useEffect(() => {
+        let mounted = true;
+        let attached = Promise.resolve(null);
+        // The meter is tied to the socket session so that the server releases it if the page goes away,
+        // a reconnect is a new session so it is attached again
+        const attach = () => {
+            const session = socket.id;
+            attached = fetchPut('/audio/meter/' + source, {session})
+                .then(meter => {
+                    if (mounted) {
+                        setChannels(meter.keys);
+                    }
+                    return session;
+                })
+                .catch(e => { console.error(e); return null; });
+        };
+        if (socket.connected) {
+            attach();
+        }
+        socket.on('connect', attach);
+        return () => {
+            mounted = false;
+            socket.off('connect', attach);
+            attached.then(session => session !== null && socket.id === session &&
+                fetchDelete('/audio/meter/' + source, {session}).catch(e => console.error(e)));
+        };
+    }, [socket, source]);
+
+    return (
+        <div className={classes.meter}>
+            {channels.map((keys, channel) => <MeterChannel keys={keys} key={channel} />)}
+        </div>
+    );
+};
+
+export default Meter;
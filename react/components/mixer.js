@@ -12,6 +12,7 @@ import TextField from '@material-ui/core/TextField';
 import { confirmAlert } from 'react-confirm-alert';
 import 'react-confirm-alert/src/react-confirm-alert.css';
 import useServerValue from './server-value.js';
+import Meter from './meter.js';
 import MixerChannel from './mixer-channel.js';
 import { fetchPut, fetchDelete, fetchPost } from './fetch-wrapper.js';
 
@@ -60,6 +61,7 @@ const Mixer = ({mixer}) => {
         <Card className={classes.card}>
             <CardContent>
                 <TextField label="Name" value={displayName} onChange={e => setDisplayName(e.target.value)} />
+                <Meter source={mixer.id} />
             </CardContent>
             <CardContent className={classes.content}>
                 {mixer.hasOwnProperty('channels') ? mixer.channels.map(channel => <MixerChannel mixer={mixer} channel={channel} key={channel.id} className={classes.channel} />) : null}
@@ -76,6 +76,8 @@ const Output = ({output}) => {
             </CardContent>
             <CardContent>
                 <Typography>{output.name}</Typography>
+                {output.status == 'connecting' && <Typography color="textSecondary">Connecting...</Typography>}
+                {output.status == 'failed' && <Typography color="error">{output.error || 'Failed'}</Typography>}
             </CardContent>
             <CardContent>
                 <FormControl>
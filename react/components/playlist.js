@@ -20,12 +20,11 @@ import Fab from '@material-ui/core/Fab';
 import AddIcon from '@material-ui/icons/Add';
 import RemoveIcon from '@material-ui/icons/Remove';
 import { Droppable, Draggable } from 'react-beautiful-dnd';
-import useDebouncedEffect from 'use-debounced-effect';
 import { confirmAlert } from 'react-confirm-alert';
 import 'react-confirm-alert/src/react-confirm-alert.css';
 import Time from './time.js';
 import NewPlaylistDialog from './new-playlist.js';
-import { fetchGet, fetchPost, fetchPut, fetchDelete } from './fetch-wrapper.js';
+import { fetchGet, fetchPost, fetchDelete, fetchPatch } from './fetch-wrapper.js';
 
 const useStyles = makeStyles({
     placeholder: {
@@ -89,10 +88,17 @@ const Playlist = forwardRef((props, ref) => {
     const classes = useStyles();
     const [ playlists, setPlaylists ] = useState([]);
     const [ playlist, setPlaylist ] = useState('');
-    const [ playlistLoading, setPlaylistLoading ] = useState(false);
     const [ nextId, setNextId ] = useState(0);
     const [ open, setOpen ] = useState(false);
 
+    const patchPlaylist = edit => {
+        if (playlist == '') {
+            return;
+        }
+        fetchPatch('/playlist/' + playlist, edit)
+            .catch(e => console.error(e));
+    };
+
     useImperativeHandle(ref, () => ({
         addTrack(index, track) {
             setRows(rows => {
@@ -102,16 +108,19 @@ const Playlist = forwardRef((props, ref) => {
                 newRows.splice(index, 0, track);
                 return newRows;
             });
+            patchPlaylist({action: 'insert', position: index, tracks: [track.id]});
         },
         moveTrack(destinationIndex, sourceIndex) {
             setRows(rows => {
                 const newRows = Array.from(rows);
                 newRows.splice(destinationIndex, 0, newRows.splice(sourceIndex, 1)[0]);
                 return newRows;
-            })
+            });
+            patchPlaylist({action: 'move', position: sourceIndex, destination: destinationIndex});
         },
         removeTrack(index) {
             setRows(rows => rows.filter((_, i) => i !== index));
+            patchPlaylist({action: 'remove', position: index});
         },
     }));
 
@@ -132,7 +141,6 @@ const Playlist = forwardRef((props, ref) => {
             fetchGet('/playlist/' + playlist, {signal: abortController.signal})
                 .then(tracks => {
                     let id = 0;
-                    setPlaylistLoading(true);
                     setRows(tracks.map(track => {
                         track.unique_id = id;
                         id += 1;
@@ -150,7 +158,6 @@ const Playlist = forwardRef((props, ref) => {
             fetchPost('/playlist', {'name': playlist})
                 .then(response => setPlaylists(playlists => {
                     var playlists = playlists.concat([{ 'id': response, 'name': playlist }]);
-                    setPlaylistLoading(true);
                     setRows([]);
                     setNextId(0);
                     setPlaylist(response);
@@ -161,22 +168,6 @@ const Playlist = forwardRef((props, ref) => {
         setOpen(false);
     };
 
-    useDebouncedEffect(
-        () => {
-            if (playlistLoading) {
-                setPlaylistLoading(false);
-                return;
-            }
-            if (playlist == '') {
-                return;
-            }
-            fetchPut('/playlist/' + playlist, {'tracks': rows.map(row => row.id)})
-                .catch(e => console.error(e));
-        },
-        200,
-        [playlist, rows]
-    );
-
     const deletePlaylist = () => {
         const deletePlaylist = playlist;
         confirmAlert({
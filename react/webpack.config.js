@@ -1,13 +1,16 @@
 const path = require("path");
 
+const dev = process.env.DEV === "true";
+
 module.exports = {
   entry: "./index.js",
   output: {
     path: path.resolve(__dirname, "dist"),
-    filename: "bundle.js"
+    // Production files are named by their content so browsers can cache them forever
+    filename: dev ? "bundle.js" : "bundle.[contenthash].js"
   },
   devtool: 'source-map',
-  mode: process.env.DEV === "true" ? 'development' : 'production',
+  mode: dev ? 'development' : 'production',
   module: {
     rules: [
       {
@@ -25,7 +28,7 @@ module.exports = {
         use: {
           loader: 'file-loader',
           options: {
-            name: '[name].[ext]',
+            name: dev ? '[name].[ext]' : '[name].[contenthash].[ext]',
             outputPath: 'fonts/',
             publicPath: 'dist/fonts/',
           }
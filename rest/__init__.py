@@ -1,6 +1,11 @@
 from . import audio_input
 from . import audio_output
 from . import audio_mix
+from . import audio_graph
+from . import meter
+from . import metrics
+from . import render
 from . import stream_sink
+from . import broadcast
 from . import library
 from . import live_player
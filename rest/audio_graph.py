@@ -0,0 +1,34 @@
+import typing
+import flask_restful
+import audio_manager
+
+
+class AudioGraph(flask_restful.Resource):
+    """
+    Handler for getting how the audio nodes are connected
+    """
+
+    @staticmethod
+    def get() -> typing.Dict:
+        """
+        Get the nodes and connections of the audio graph
+        :return:  The nodes, the edges from source to destination and the order to process the nodes in
+        """
+        graph = audio_manager.graph.Graph.build()
+        try:
+            order = graph.order()
+        except audio_manager.exception.CycleException:
+            order = None
+        return {
+            'nodes': [node._asdict() for node in graph.nodes],
+            'edges': [{'source': source, 'destination': destination} for source, destination in graph.edges],
+            'order': order
+        }
+
+
+def setup_api(api: flask_restful.Api) -> None:
+    """
+    Configure the REST endpoints for this namespace
+    :param flask_restful.Api api:  The API to add the endpoints to
+    """
+    api.add_resource(AudioGraph, '/audio/graph')
@@ -62,14 +62,14 @@ class CreatedInputs(flask_restful.Resource):
                 'id': input_.id,
                 'display_name': input_.display_name
             }
-            if isinstance(input_.input, audio.input_device.InputDevice):
+            if audio.is_instance(input_.input, 'input_device', 'InputDevice'):
                 ret['type'] = 'device'
                 ret['name'] = input_.input.name
             return ret
         return [to_dict(input_) for input_ in inputs]
 
     @staticmethod
-    def _create_device(name: str) -> audio.input_device.InputDevice:
+    def _create_device(name: str) -> 'audio.input_device.InputDevice':
         """
         Create a new output device
         :param name:  The name of the output device to create
@@ -212,7 +212,10 @@ class MixerChannel(flask_restful.Resource):
                 for other_channel_id in mixer.mixer.get_channel_ids():
                     if other_channel_id != channel_id and mixer.mixer.get_channel(other_channel_id).input is new_input:
                         flask_restful.abort(400, message='Source already assigned to a channel of this mixer')
-            channel.input = new_input
+            try:
+                channel.input = new_input
+            except audio_manager.exception.CycleException as e:
+                flask_restful.abort(400, message=str(e))
             socketio.emit('mixer_channel_update', {'mixer': mixer_id, 'channel': channel_id, 'input': args['input']})
         return True
 
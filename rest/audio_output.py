@@ -82,12 +82,14 @@ class CreatedOutputs(flask_restful.Resource):
             ret = {
                 'id': output.id,
                 'display_name': output.display_name,
-                'input_id': output.input
+                'input_id': output.input,
+                'status': output.status,
+                'error': output.error
             }
-            if isinstance(output.output, audio.output_device.OutputDevice):
+            if audio.is_instance(output.output, 'output_device', 'OutputDevice'):
                 ret['type'] = 'device'
                 ret['name'] = output.output.name
-            elif isinstance(output.output, audio.icecast.Icecast):
+            elif audio.is_instance(output.output, 'icecast', 'Icecast'):
                 ret['type'] = 'icecast'
                 ret['endpoint'] = output.output.endpoint
             elif isinstance(output.output, audio_manager.output.MultiplexedOutput):
@@ -95,14 +97,14 @@ class CreatedOutputs(flask_restful.Resource):
                 ret['parent_id'] = audio_manager.output.Outputs.get_output(output.output.parent).id
             elif isinstance(output.output, stream_sink.AudioSession):
                 ret['type'] = 'browser'
-            elif isinstance(output.output, audio.output_file.RollingFile):
+            elif audio.is_instance(output.output, 'output_file', 'RollingFile'):
                 ret['type'] = 'file'
                 ret['path'] = output.output.base_path
             return ret
         return [to_dict(output) for output in outputs]
 
     @staticmethod
-    def _create_device(name: str) -> audio.output_device.OutputDevice:
+    def _create_device(name: str) -> 'audio.output_device.OutputDevice':
         """
         Create a new output device
         :param name:  The name of the output device to create
@@ -116,7 +118,7 @@ class CreatedOutputs(flask_restful.Resource):
         return audio.output_device.OutputDevice(name, settings.BLOCK_SIZE)
 
     @staticmethod
-    def _create_icecast(endpoint: str, password: str) -> audio.icecast.Icecast:
+    def _create_icecast(endpoint: str, password: str) -> 'audio.icecast.Icecast':
         """
         Create a new Icecast output device
         :param endpoint:  The Icecast endpoint to connect to
@@ -134,7 +136,7 @@ class CreatedOutputs(flask_restful.Resource):
         return icecast
 
     @staticmethod
-    def _create_file(path: str) -> audio.output_file.RollingFile:
+    def _create_file(path: str) -> 'audio.output_file.RollingFile':
         """
         Create a new rolling output file
         :param path:  The base path name to use, appending the start time to it
@@ -162,13 +164,14 @@ class CreatedOutputs(flask_restful.Resource):
         except ValueError:
             flask_restful.abort(400, message='Parent output does not exist.')
             raise  # No-op
-        if not isinstance(parent.output, audio.output_device.OutputDevice):
+        if not audio.is_instance(parent.output, 'output_device', 'OutputDevice'):
             flask_restful.abort(400, message='Parent must be an output device')
         parent_channels = parent.output.channels
         if parent_channels < (channels * 2):
             flask_restful.abort(400, message='Parent device only has {} channels'.format(parent_channels))
         multiplex = audio.multiplex.Multiplex(parent_channels, settings.BLOCK_SIZE)
         parent.output.input = multiplex
+        audio_manager.meter.Meters.rebind(parent.id, multiplex)
         return [
             audio_manager.output.MultiplexedOutput(parent.output, multiplex, channels, i * channels)
             for i in range(parent_channels // channels)
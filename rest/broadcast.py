@@ -0,0 +1,44 @@
+import typing
+import flask
+import flask_socketio
+import audio_manager
+
+
+class StateBroadcast(flask_socketio.Namespace):
+    """
+    A SocketIO namespace for clients to choose the continuously changing values they are sent
+    """
+
+    @staticmethod
+    def on_state_subscribe(keys: typing.List[str]) -> typing.Dict[str, int]:
+        """
+        Start sending values to the client
+        :param keys:  The keys of the values to send
+        :return:  The index of each key in the messages
+        """
+        return audio_manager.broadcast.Broadcaster.subscribe(flask.request.sid, keys)
+
+    @staticmethod
+    def on_state_unsubscribe(keys: typing.List[str]) -> None:
+        """
+        Stop sending values to the client
+        :param keys:  The keys of the values to stop sending
+        """
+        audio_manager.broadcast.Broadcaster.unsubscribe(flask.request.sid, keys)
+
+    @staticmethod
+    def on_disconnect() -> None:
+        """
+        Stop sending anything to the client and release the meters it was using
+        """
+        audio_manager.broadcast.Broadcaster.unsubscribe(flask.request.sid)
+        audio_manager.meter.Meters.release_session(flask.request.sid)
+
+
+def setup_api(socketio: flask_socketio.SocketIO) -> None:
+    """
+    Configure the SocketIO endpoints for this namespace and start broadcasting
+    :param socketio:  The SocketIO to add the namespace to
+    """
+    socketio.on_namespace(StateBroadcast('/'))
+    audio_manager.broadcast.Broadcaster.start(socketio)
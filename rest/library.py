@@ -6,6 +6,18 @@ import flask_restful.reqparse
 import library
 
 
+def _existing_playlist(id: int) -> library.Playlist:
+    """
+    Get a playlist, aborting if it doesn't exist
+    :param id:  The ID of the playlist
+    :return:  The playlist
+    """
+    session = library.database.db.session
+    if session.query(library.database.Playlist.id).filter_by(id=id).count() == 0:
+        flask_restful.abort(404, message='No such playlist exists')
+    return library.Playlist(id)
+
+
 class Library(flask_restful.Resource):
     """
     Handler adding and removing root directories from the library
@@ -43,7 +55,126 @@ class Library(flask_restful.Resource):
         :return:  Always true
         """
         args = self._parser.parse_args(strict=True)
-        library.Library.add_directory(args['directory'])
+        try:
+            library.Library.add_directory(args['directory'])
+        except RuntimeError as e:
+            flask_restful.abort(503, message=str(e))
+        return True
+
+
+class LibraryScanner(flask_restful.Resource):
+    """
+    Handler for checking the state of the library scanner and asking it to rescan
+    """
+
+    def __init__(self):
+        """
+        Create the parser for requesting a rescan
+        """
+        self._parser = flask_restful.reqparse.RequestParser()
+        self._parser.add_argument(
+            'directory', type=str, help='The library root to rescan, all of them if not given'
+        )
+
+    @staticmethod
+    def get() -> typing.Dict:
+        """
+        Get the state of the library scanner
+        :return:  The roots being watched, those being scanned and the number of queued changes
+        """
+        try:
+            return library.Library.status()
+        except RuntimeError as e:
+            flask_restful.abort(503, message=str(e))
+
+    def post(self) -> typing.List[str]:
+        """
+        Walk the library roots again to find any changes that were missed
+        :return:  The directories that are being scanned
+        """
+        args = self._parser.parse_args(strict=True)
+        try:
+            return library.Library.rescan(args['directory'])
+        except RuntimeError as e:
+            flask_restful.abort(503, message=str(e))
+
+
+class Imports(flask_restful.Resource):
+    """
+    Handler for queueing YouTube imports into the library and listing them
+    """
+
+    def __init__(self):
+        """
+        Create the parser for queueing an import
+        """
+        self._parser = flask_restful.reqparse.RequestParser()
+        self._parser.add_argument(
+            'url', type=str, help='The URL of the video to import', required=True
+        )
+        self._parser.add_argument(
+            'directory', type=str, help='The directory in the library to download it to', required=True
+        )
+
+    @staticmethod
+    def get() -> typing.List[typing.Dict]:
+        """
+        Get the imports that have been requested
+        :return:  The state and progress of each import
+        """
+        return [job.status() for job in library.youtube.ImportJobs.get()]
+
+    def post(self) -> typing.Dict:
+        """
+        Queue the import of a video, its progress is sent to clients as it downloads
+        :return:  The state of the new import
+        """
+        args = self._parser.parse_args(strict=True)
+        directory = os.path.abspath(args['directory'])
+        if not any(directory == root or directory.startswith(root.rstrip(os.sep) + os.sep)
+                   for root in library.Library.list()):
+            flask_restful.abort(400, message='The directory must be in the library')
+        if not os.path.isdir(directory):
+            flask_restful.abort(400, message='Directory does not exist')
+        socketio = flask.current_app.extensions['socketio']
+        try:
+            job = library.youtube.ImportJobs.create(args['url'], directory, socketio)
+        except ValueError as e:
+            flask_restful.abort(400, message=str(e))
+            raise  # No-op
+        return job.status()
+
+
+class Import(flask_restful.Resource):
+    """
+    Handler for checking on an import and cancelling it
+    """
+
+    @staticmethod
+    def get(import_id: str) -> typing.Dict:
+        """
+        Get the state of an import
+        :param import_id:  The ID of the import
+        :return:  The state and progress of the import
+        """
+        try:
+            return library.youtube.ImportJobs.get_job(import_id).status()
+        except ValueError:
+            flask_restful.abort(404, message='No such import exists')
+            raise  # No-op
+
+    @staticmethod
+    def delete(import_id: str) -> bool:
+        """
+        Cancel an import and forget about it
+        :param import_id:  The ID of the import
+        :return:  Always True, errors abort
+        """
+        try:
+            library.youtube.ImportJobs.remove(import_id)
+        except ValueError:
+            flask_restful.abort(404, message='No such import exists')
+            raise  # No-op
         return True
 
 
@@ -112,6 +243,84 @@ class Track(flask_restful.Resource):
         return flask.Response(generate(track), mimetype=mimetype)
 
 
+class TrackPeaks(flask_restful.Resource):
+    """
+    Handler for getting the waveform overview of a track
+    """
+
+    def __init__(self):
+        """
+        Create the parser for choosing the zoom
+        """
+        self._parser = flask_restful.reqparse.RequestParser()
+        self._parser.add_argument(
+            'width', type=int, help='The most values to return, chooses the level if one is not given'
+        )
+        self._parser.add_argument(
+            'level', type=int, help='The zoom level, 0 is the most detailed and each level halves it'
+        )
+        self._parser.add_argument(
+            'start', type=float, default=0.0, help='The time in seconds to start from'
+        )
+        self._parser.add_argument(
+            'end', type=float, help='The time in seconds to end at'
+        )
+
+    def get(self, id: int) -> typing.Dict:
+        """
+        Get the minimum and maximum of each part of a track
+        :param id:  The ID of the track
+        :return:  The level, seconds covered by each pair and the flat list of minimum and maximum pairs
+        """
+        args = self._parser.parse_args(strict=True)
+        if args['width'] is not None and args['width'] < 1:
+            flask_restful.abort(400, message='The width must be at least 1')
+        try:
+            peaks = library.peaks.read(id, args['width'], args['level'], args['start'], args['end'])
+        except ValueError as e:
+            flask_restful.abort(400, message=str(e))
+            raise  # No-op
+        if peaks is None:
+            flask_restful.abort(404, message='The track has not been analysed yet')
+        return peaks
+
+
+class TrackInfos(flask_restful.Resource):
+    """
+    Handler for getting the track information for many tracks at once
+    """
+
+    def __init__(self):
+        """
+        Create the parser for querying
+        """
+        self._parser = flask_restful.reqparse.RequestParser()
+        self._parser.add_argument(
+            'ids', type=str, action='append', required=True, help='The comma separated IDs of the tracks'
+        )
+
+    def get(self) -> typing.List[typing.Dict]:
+        """
+        Get the track information for a list of tracks
+        :return:  The track information for each of the tracks that exist
+        """
+        args = self._parser.parse_args(strict=True)
+        try:
+            ids = set(int(id_) for ids in args['ids'] for id_ in ids.split(',') if id_)
+        except ValueError:
+            flask_restful.abort(400, message='Track IDs must be integers')
+            raise  # No-op
+        return [
+            {
+                'id': track.id,
+                'title': track.title,
+                'artist': track.artist,
+                'length': track.length,
+                'last_play': None if last_play is None else last_play.isoformat()
+            } for track, last_play in library.Tracks.with_last_play(ids)
+        ]
+
+
 class TrackInfo(flask_restful.Resource):
     """
     Handler for getting and updating track information
@@ -141,6 +350,9 @@ class TrackInfo(flask_restful.Resource):
             'title': track.title,
             'artist': track.artist,
             'length': track.length,
+            'cue_in': track.cue_in,
+            'cue_out': track.cue_out,
+            'segue': track.segue,
             'last_play': None if last_play is None else last_play.isoformat()
         }
 
@@ -272,6 +484,22 @@ class Playlist(flask_restful.Resource):
         self._parser.add_argument(
             'tracks', type=int, action='append', help='The tracks for the playlist'
         )
+        self._edit_parser = flask_restful.reqparse.RequestParser()
+        self._edit_parser.add_argument(
+            'action', type=str, choices=['insert', 'move', 'remove'], help='The change to make', required=True
+        )
+        self._edit_parser.add_argument(
+            'position', type=int, help='The position of the first track to change', required=True
+        )
+        self._edit_parser.add_argument(
+            'count', type=int, default=1, help='The number of tracks to move or remove'
+        )
+        self._edit_parser.add_argument(
+            'destination', type=int, help='The position to move the tracks to after they are taken out'
+        )
+        self._edit_parser.add_argument(
+            'tracks', type=int, action='append', help='The track IDs to insert'
+        )
 
     def get(self, id) -> typing.List[typing.Dict]:
         """
@@ -306,6 +534,29 @@ class Playlist(flask_restful.Resource):
             playlist.tracks = []
         return True
 
+    def patch(self, id) -> bool:
+        """
+        Insert, move or remove tracks in the playlist without sending the whole list
+        :param id:  The ID of the playlist
+        :return:  Always true
+        """
+        args = self._edit_parser.parse_args(strict=True)
+        playlist = _existing_playlist(id)
+        try:
+            if args.action == 'insert':
+                if not args.tracks:
+                    flask_restful.abort(400, message='No tracks to insert')
+                playlist.insert_tracks(args.position, args.tracks)
+            elif args.action == 'move':
+                if args.destination is None:
+                    flask_restful.abort(400, message='A destination is required to move tracks')
+                playlist.move_tracks(args.position, args.count, args.destination)
+            else:
+                playlist.remove_tracks(args.position, args.count)
+        except ValueError as e:
+            flask_restful.abort(400, message=str(e))
+        return True
+
     @staticmethod
     def delete(id) -> bool:
         """
@@ -324,9 +575,14 @@ def setup_api(api):
     """
     api.add_resource(Filesystem, '/browse', '/browse/<path:location>')
     api.add_resource(Library, '/library')
+    api.add_resource(LibraryScanner, '/library/scanner')
+    api.add_resource(Imports, '/library/import')
+    api.add_resource(Import, '/library/import/<string:import_id>')
     api.add_resource(TrackSearch, '/library/track')
     api.add_resource(Track, '/library/track/<int:id>')
+    api.add_resource(TrackInfos, '/library/track/info')
     api.add_resource(TrackInfo, '/library/track/<int:id>/info')
+    api.add_resource(TrackPeaks, '/library/track/<int:id>/peaks')
     api.add_resource(Playlists, '/playlist')
     api.add_resource(Playlist, '/playlist/<int:id>')
 
@@ -4,6 +4,21 @@ import typing
 import library
 
 
+def _existing_player(id: int) -> library.LivePlayer:
+    """
+    Get a live player, aborting if it doesn't exist
+    :param id:  The ID of the player
+    :return:  The player
+    """
+    player = library.LivePlayer(id)
+    try:
+        # Loading the name loads the player, which fails if there isn't one
+        player.name
+    except ValueError:
+        flask_restful.abort(404, message='No such player exists')
+    return player
+
+
 class LivePlayers(flask_restful.Resource):
     """
     Handler listing live players
@@ -103,6 +118,26 @@ class LivePlayerTracks(flask_restful.Resource):
             'types', type=str, choices=[t.name for t in library.database.LivePlayerType],
             action='append', help='Types for each of the given tracks', required=True
         )
+        self._edit_parser = flask_restful.reqparse.RequestParser()
+        self._edit_parser.add_argument(
+            'action', type=str, choices=['insert', 'move', 'remove'], help='The change to make', required=True
+        )
+        self._edit_parser.add_argument(
+            'position', type=int, help='The position of the first track to change', required=True
+        )
+        self._edit_parser.add_argument(
+            'count', type=int, default=1, help='The number of tracks to move or remove'
+        )
+        self._edit_parser.add_argument(
+            'destination', type=int, help='The position to move the tracks to after they are taken out'
+        )
+        self._edit_parser.add_argument(
+            'tracks', type=int, action='append', help='The track IDs to insert'
+        )
+        self._edit_parser.add_argument(
+            'types', type=str, choices=[t.name for t in library.database.LivePlayerType],
+            action='append', help='Types for each of the tracks to insert'
+        )
 
     def get(self, id) -> typing.List[typing.Dict]:
         """
@@ -133,6 +168,31 @@ class LivePlayerTracks(flask_restful.Resource):
         ]
         return True
 
+    def patch(self, id) -> bool:
+        """
+        Insert, move or remove tracks in the player without sending the whole list
+        :param id:  The ID of the player
+        :return:  Always true
+        """
+        args = self._edit_parser.parse_args(strict=True)
+        player = _existing_player(id)
+        try:
+            if args.action == 'insert':
+                if not args.tracks or len(args.tracks) != len(args.types or []):
+                    flask_restful.abort(400, message='Each track must have a type')
+                player.insert_tracks(args.position, [
+                    (track, library.database.LivePlayerType[type_]) for track, type_ in zip(args.tracks, args.types)
+                ])
+            elif args.action == 'move':
+                if args.destination is None:
+                    flask_restful.abort(400, message='A destination is required to move tracks')
+                player.move_tracks(args.position, args.count, args.destination)
+            else:
+                player.remove_tracks(args.position, args.count)
+        except ValueError as e:
+            flask_restful.abort(400, message=str(e))
+        return True
+
 
 class LivePlayerState(flask_restful.Resource):
     """
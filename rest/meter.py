@@ -0,0 +1,59 @@
+import typing
+import flask_restful
+import flask_restful.reqparse
+import audio_manager
+
+
+class Meter(flask_restful.Resource):
+    """
+    Handler for attaching level meters to inputs, mixers, players and outputs
+    """
+
+    def __init__(self):
+        """
+        Create the parser for the client session
+        """
+        self._parser = flask_restful.reqparse.RequestParser()
+        self._parser.add_argument(
+            'session', type=str, help='The SocketIO session of the client, the meter is released when it disconnects'
+        )
+
+    def put(self, source_id: str) -> typing.Dict:
+        """
+        Start metering a source, the levels are sent through the state broadcast
+        :param source_id:  The ID of the input, mixer, player or output to meter
+        :return:  The number of channels and the broadcast keys for the levels of each channel
+        """
+        args = self._parser.parse_args(strict=True)
+        try:
+            meter = audio_manager.meter.Meters.attach(source_id, args['session'])
+        except ValueError as e:
+            flask_restful.abort(404, message=str(e))
+            raise  # No-op
+        return {
+            'channels': meter.channels,
+            'keys': [
+                {level: meter.key(channel, level) for level in meter.LEVELS} for channel in range(meter.channels)
+            ]
+        }
+
+    def delete(self, source_id: str) -> bool:
+        """
+        Stop using the meter for a source
+        :param source_id:  The ID of the source that was metered
+        :return:  Always true
+        """
+        args = self._parser.parse_args(strict=True)
+        try:
+            audio_manager.meter.Meters.detach(source_id, args['session'])
+        except ValueError as e:
+            flask_restful.abort(404, message=str(e))
+        return True
+
+
+def setup_api(api: flask_restful.Api) -> None:
+    """
+    Configure the REST endpoints for this namespace
+    :param flask_restful.Api api:  The API to add the endpoints to
+    """
+    api.add_resource(Meter, '/audio/meter/<string:source_id>')
@@ -0,0 +1,25 @@
+import flask
+import flask_restful
+import audio_manager
+
+
+class Metrics(flask_restful.Resource):
+    """
+    Handler for the monitoring metrics of the audio graph and library
+    """
+
+    @staticmethod
+    def get() -> flask.Response:
+        """
+        Get the current metrics
+        :return:  The metrics in the Prometheus text exposition format
+        """
+        return flask.Response(audio_manager.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def setup_api(api: flask_restful.Api) -> None:
+    """
+    Configure the REST endpoints for this namespace
+    :param flask_restful.Api api:  The API to add the endpoints to
+    """
+    api.add_resource(Metrics, '/metrics')
@@ -0,0 +1,120 @@
+import typing
+import flask
+import flask_restful
+import flask_restful.reqparse
+import audio_manager
+
+
+class Renders(flask_restful.Resource):
+    """
+    Handler for starting renders of playlists and live players to files and listing them
+    """
+
+    def __init__(self):
+        """
+        Create the parser for starting a render
+        """
+        self._parser = flask_restful.reqparse.RequestParser()
+        self._parser.add_argument(
+            'name', type=str, help='The name to give the rendered file', required=True
+        )
+        self._parser.add_argument(
+            'playlist', type=int, help='The ID of the playlist to render'
+        )
+        self._parser.add_argument(
+            'player', type=int, help='The ID of the live player to render the tracks of'
+        )
+        self._parser.add_argument(
+            'format', type=str, choices=('mp3', 'wav'), default='mp3', help='The format to render to'
+        )
+        self._parser.add_argument(
+            'crossfade', type=float, default=0.0, help='The number of seconds to fade between each track'
+        )
+
+    @staticmethod
+    def get() -> typing.List[typing.Dict]:
+        """
+        Get the renders that have been started
+        :return:  The state and progress of each render
+        """
+        return [job.status() for job in audio_manager.render.RenderJobs.get()]
+
+    def post(self) -> typing.Dict:
+        """
+        Start rendering a playlist or live player in the background
+        :return:  The state of the new render, its progress is broadcast as render_progress_<id>
+        """
+        args = self._parser.parse_args(strict=True)
+        if (args['playlist'] is None) == (args['player'] is None):
+            flask_restful.abort(400, message='Either a playlist or a player is required')
+        if args['crossfade'] < 0:
+            flask_restful.abort(400, message='The crossfade can not be negative')
+        try:
+            job = audio_manager.render.RenderJobs.create(
+                args['name'], args['playlist'], args['player'], args['format'], args['crossfade'],
+                flask.current_app.extensions['socketio']
+            )
+        except ValueError as e:
+            flask_restful.abort(400, message=str(e))
+            raise  # No-op
+        return job.status()
+
+
+class Render(flask_restful.Resource):
+    """
+    Handler for checking on and removing a render
+    """
+
+    @staticmethod
+    def _get_job(render_id: str) -> audio_manager.render.RenderJob:
+        try:
+            return audio_manager.render.RenderJobs.get_job(render_id)
+        except ValueError:
+            flask_restful.abort(404, message='No such render exists')
+            raise  # No-op
+
+    def get(self, render_id: str) -> typing.Dict:
+        """
+        Get the state of a render
+        :param render_id:  The ID of the render
+        :return:  The state and progress of the render
+        """
+        return self._get_job(render_id).status()
+
+    def delete(self, render_id: str) -> bool:
+        """
+        Stop a render if it is running and delete the file
+        :param render_id:  The ID of the render
+        :return:  Always True, aborts if there is an error
+        """
+        self._get_job(render_id)
+        audio_manager.render.RenderJobs.remove(render_id)
+        return True
+
+
+class RenderFile(flask_restful.Resource):
+    """
+    Handler for downloading a finished render
+    """
+
+    @staticmethod
+    def get(render_id: str) -> flask.Response:
+        """
+        Download the rendered file
+        :param render_id:  The ID of the render
+        :return:  The file as an attachment
+        """
+        job = Render._get_job(render_id)
+        if job.state != 'finished':
+            flask_restful.abort(409, message='The render has not finished')
+        return flask.send_file(job.path, as_attachment=True, attachment_filename=job.name + '.' + job.format)
+
+
+def setup_api(api):
+    """
+    Configure the REST endpoints for this namespace
+    :param flask_restful.Api api:  The API to add the endpoints to
+    """
+    api.add_resource(Renders, '/render')
+    api.add_resource(Render, '/render/<string:render_id>')
+    api.add_resource(RenderFile, '/render/<string:render_id>/file')
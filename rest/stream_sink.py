@@ -39,6 +39,14 @@ class AudioSession(object):
             )
         self._output_pipe_r.close()
 
+    @property
+    def encoder(self) -> 'audio.mp3.Mp3':
+        """
+        Get the encoder that the audio passes through
+        :return:  The MP3 encoder
+        """
+        return self._output
+
     @property
     def input(self):
         """
@@ -1,3 +1,6 @@
+import time
+# When the server started loading, for the startup profile
+STARTED = time.perf_counter()
 import eventlet
 eventlet.monkey_patch()
 import flask
@@ -10,10 +13,64 @@ import os.path
 import functools
 import platform
 import uuid
+import typing
+import hashlib
+import gzip
+import shutil
+import mimetypes
+import contextlib
 import settings
 import certifi
 
 
+# The files and directories in the frontend that the production bundle is built from
+FRONTEND_SOURCES = (
+    'index.js', 'index.html', '.babelrc.js', 'webpack.config.js', 'package.json', 'package-lock.json', 'components'
+)
+# The extensions of the bundle files that are worth compressing
+COMPRESSED_TYPES = ('.js', '.map', '.html', '.css', '.svg', '.ttf', '.eot')
+# The number of seconds that browsers can cache the files of the production bundle for
+BUNDLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class StartupProfile(object):
+    """
+    Times each step of starting the server so that the subsystems that slow it down can be found
+    """
+
+    def __init__(self, started: float):
+        """
+        Start profiling
+        :param started:  The time.perf_counter() that loading the server started at
+        """
+        self._started = started
+        self._steps = [('server imports', time.perf_counter() - started)]
+
+    @contextlib.contextmanager
+    def step(self, name: str) -> typing.Iterator[None]:
+        """
+        Time a step of starting up
+        :param name:  The name of the step for the report
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._steps.append((name, time.perf_counter() - start))
+
+    def report(self) -> str:
+        """
+        Get the time taken by each step
+        :return:  The report with a line for each step and the total
+        """
+        width = max(len(name) for name, _ in self._steps)
+        lines = ['Started in {:.1f} ms'.format((time.perf_counter() - self._started) * 1000.0)]
+        lines.extend(
+            '  {}  {:8.1f} ms'.format(name.ljust(width), seconds * 1000.0) for name, seconds in self._steps
+        )
+        return '\n'.join(lines)
+
+
 class Server(object):
     """
     A class managing the server configuration and running
@@ -23,82 +80,204 @@ class Server(object):
         """
         Construct the Flask instance and configure the REST API
         """
-        self._app = flask.Flask(__name__)
-        self._app.config['SECRET_KEY'] = str(uuid.uuid4())
-        self._socketio = flask_socketio.SocketIO(self._app, binary=True, async_mode='eventlet')
+        self._profile = StartupProfile(STARTED)
+        with self._profile.step('flask'):
+            self._app = flask.Flask(__name__)
+            self._app.config['SECRET_KEY'] = str(uuid.uuid4())
+            self._socketio = flask_socketio.SocketIO(self._app, binary=True, async_mode='eventlet')
         self._angular = None
         self._react = None
         with self._app.app_context():
             self._setup_db()
             self._setup_rest()
-            self._setup_angular()
+            with self._profile.step('frontend'):
+                self._setup_angular()
+        print(self._profile.report(), file=sys.stderr)
 
     def _setup_db(self):
         """
         Configure the SQLAlchemy databases for use with Flask
         """
-        import library
-        import audio_manager
+        # Imported on its own so that its time isn't counted against audio_manager
+        with self._profile.step('import audio'):
+            import audio
+        with self._profile.step('import library'):
+            import library
+        with self._profile.step('import audio_manager'):
+            import audio_manager
         with self._app.app_context():
-            library.database.init_app(self._app)
-            audio_manager.init_app(self._app)
-            library.Library.restore()
+            with self._profile.step('library database'):
+                library.database.init_app(self._app)
+            audio_manager.init_app(self._app, lambda name: self._profile.step('restore ' + name))
+            with self._profile.step('library restore'):
+                library.Library.restore()
 
     def _setup_rest(self) -> None:
         """
         Add all of the resources to the server
         """
         api = flask_restful.Api(self._app)
-        import rest
+        with self._profile.step('import rest'):
+            import rest
         rest.audio_output.setup_api(api)
         rest.audio_input.setup_api(api)
         rest.stream_sink.setup_api(self._socketio)
+        rest.broadcast.setup_api(self._socketio)
         rest.audio_mix.setup_api(api)
+        rest.audio_graph.setup_api(api)
+        rest.meter.setup_api(api)
+        rest.metrics.setup_api(api)
+        rest.render.setup_api(api)
         rest.library.setup_api(api)
         rest.live_player.setup_api(api)
 
-    def _setup_angular(self) -> None:
+    @staticmethod
+    def _node() -> typing.Tuple[str, str, typing.Dict[str, str]]:
         """
-        Download any Angular modules required, build and add routes
+        Find the NPM tools installed alongside Python by nodeenv
+        :return:  The paths to npm and npx and the environment to run them in
         """
         bin_dir = os.path.dirname(sys.executable)
         if 'windows' in platform.platform().lower():
             npm_bin = 'npm.cmd'
             npx_bin = 'npx.cmd'
-            node_bin = 'node.exe'
         else:
             npm_bin = 'npm'
             npx_bin = 'npx'
-            node_bin = 'node'
         npm = os.path.join(bin_dir, npm_bin)
         npx = os.path.join(bin_dir, npx_bin)
-        node = os.path.join(bin_dir, node_bin)
-        # Configure the react frontend
-        react = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'react')
-        # Install the react dependencies
         new_env = os.environ.copy()
         new_env['PATH'] = bin_dir + os.pathsep + os.environ['PATH']
-        subprocess.call([npm, 'config', 'set', 'cafile', certifi.where()], env=new_env)
-        subprocess.call([npm, 'install'], cwd=react, env=new_env)
-        babel_run = [
-            npx, 'webpack',
-            '--watch',
-            '--config', 'webpack.config.js',
-        ]
         if getattr(settings, 'FRONTEND_DEBUG', False):
             new_env['DEV'] = 'true'
-        self._react = subprocess.Popen(babel_run, cwd=react, env=new_env)
-        # Serve the react frontend
-        self._app.add_url_rule(
-            '/react/<path:filename>',
-            endpoint='react',
-            view_func=functools.partial(flask.send_from_directory, react)
-        )
-        self._app.add_url_rule(
-            '/react/',
-            endpoint='react_index',
-            view_func=functools.partial(flask.send_from_directory, react, 'index.html')
-        )
+        return npm, npx, new_env
+
+    @staticmethod
+    def _source_hash(react: str) -> str:
+        """
+        Hash the frontend sources so that the bundle is only built again when they change
+        :param react:  The frontend directory
+        :return:  The hex digest of the sources
+        """
+        digest = hashlib.sha256()
+        paths = []
+        for name in FRONTEND_SOURCES:
+            path = os.path.join(react, name)
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    paths.extend(os.path.join(root, filename) for filename in files)
+            elif os.path.isfile(path):
+                paths.append(path)
+        for path in sorted(paths):
+            digest.update(os.path.relpath(path, react).replace(os.sep, '/').encode('utf-8') + b'\0')
+            with open(path, 'rb') as source:
+                digest.update(source.read())
+        return digest.hexdigest()
+
+    def _build_bundle(self, react: str) -> str:
+        """
+        Build the production bundle of the frontend if the sources have changed since it was last built,
+        the HTML page is rewritten to load the hashed bundle and everything is compressed ahead of time
+        :param react:  The frontend directory
+        :return:  The directory containing the bundle
+        """
+        dist = os.path.join(react, 'dist')
+        stamp = os.path.join(dist, '.source_hash')
+        source_hash = self._source_hash(react)
+        try:
+            with open(stamp) as stamp_file:
+                if stamp_file.read() == source_hash and os.path.isfile(os.path.join(dist, 'index.html')):
+                    return dist
+        except OSError:
+            pass
+        print('Building the frontend bundle', file=sys.stderr)
+        npm, npx, new_env = self._node()
+        subprocess.call([npm, 'config', 'set', 'cafile', certifi.where()], env=new_env)
+        subprocess.check_call([npm, 'install'], cwd=react, env=new_env)
+        shutil.rmtree(dist, ignore_errors=True)
+        subprocess.check_call([npx, 'webpack', '--config', 'webpack.config.js'], cwd=react, env=new_env)
+        bundle = [name for name in os.listdir(dist) if name.startswith('bundle.') and name.endswith('.js')][0]
+        with open(os.path.join(react, 'index.html')) as index:
+            page = index.read().replace('dist/bundle.js', 'dist/' + bundle)
+        with open(os.path.join(dist, 'index.html'), 'w') as index:
+            index.write(page)
+        for root, _, files in os.walk(dist):
+            for filename in files:
+                if os.path.splitext(filename)[1] in COMPRESSED_TYPES:
+                    path = os.path.join(root, filename)
+                    with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb', 9) as compressed:
+                        shutil.copyfileobj(source, compressed)
+        # Written last so that an interrupted build is built again, hashed again as npm install can
+        # update the lockfile
+        with open(stamp, 'w') as stamp_file:
+            stamp_file.write(self._source_hash(react))
+        return dist
+
+    @staticmethod
+    def _send_bundle(dist: str, filename: str, max_age: int = BUNDLE_MAX_AGE) -> flask.Response:
+        """
+        Send a file from the production bundle, compressed if the browser accepts it
+        :param dist:  The directory containing the bundle
+        :param filename:  The file to send
+        :param max_age:  The number of seconds the browser can use the file without checking for a new one,
+                         the file names contain a hash of their content so by default they are cached forever
+        :return:  The response with the file
+        """
+        if 'gzip' in flask.request.accept_encodings and os.path.isfile(flask.safe_join(dist, filename) + '.gz'):
+            response = flask.send_from_directory(
+                dist, filename + '.gz', cache_timeout=max_age,
+                mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            )
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = flask.send_from_directory(dist, filename, cache_timeout=max_age)
+        response.headers['Vary'] = 'Accept-Encoding'
+        if max_age:
+            response.headers['Cache-Control'] = 'public, max-age={}, immutable'.format(max_age)
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def _setup_angular(self) -> None:
+        """
+        Add routes for the frontend, in production a prebuilt bundle is served and only built again when
+        the sources change, with FRONTEND_DEBUG it is built by a watcher as it is edited
+        """
+        react = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'react')
+        if getattr(settings, 'FRONTEND_DEBUG', False):
+            # Install the react dependencies and rebuild whenever they change
+            npm, npx, new_env = self._node()
+            subprocess.call([npm, 'config', 'set', 'cafile', certifi.where()], env=new_env)
+            subprocess.call([npm, 'install'], cwd=react, env=new_env)
+            babel_run = [
+                npx, 'webpack',
+                '--watch',
+                '--config', 'webpack.config.js',
+            ]
+            self._react = subprocess.Popen(babel_run, cwd=react, env=new_env)
+            # Serve the react frontend
+            self._app.add_url_rule(
+                '/react/<path:filename>',
+                endpoint='react',
+                view_func=functools.partial(flask.send_from_directory, react)
+            )
+            self._app.add_url_rule(
+                '/react/',
+                endpoint='react_index',
+                view_func=functools.partial(flask.send_from_directory, react, 'index.html')
+            )
+        else:
+            dist = self._build_bundle(react)
+            self._app.add_url_rule(
+                '/react/dist/<path:filename>',
+                endpoint='react',
+                view_func=functools.partial(self._send_bundle, dist)
+            )
+            self._app.add_url_rule(
+                '/react/',
+                endpoint='react_index',
+                view_func=functools.partial(self._send_bundle, dist, 'index.html', 0)
+            )
         # Redirect home page to the frontend
         self._app.add_url_rule(
             '/',
@@ -1,5 +1,11 @@
 # The size of audio blocks to pass around
 BLOCK_SIZE = 512
 
-# Whether to build the frontend in debug or production mode
-FRONTEND_DEBUG = True
+# The loudness that tracks are played at in LUFS, None to play them unchanged
+LOUDNESS_TARGET = -23.0
+# The highest true-peak in dBTP a track is allowed to reach when its loudness is raised
+TRUE_PEAK_CEILING = -1.0
+
+# Whether to rebuild the frontend in debug mode as it is edited, otherwise a production bundle is built
+# when the frontend changes and served compressed with long cache lifetimes
+FRONTEND_DEBUG = False
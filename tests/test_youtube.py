@@ -0,0 +1,168 @@
+import http.server
+import os
+import os.path
+import shutil
+import tempfile
+import threading
+import unittest
+import unittest.mock
+import library
+import library.youtube
+
+
+class StandIn(http.server.BaseHTTPRequestHandler):
+    """
+    A local stand-in for the remote that serves one file, honouring ranges unless told not to
+    """
+
+    # The file that is served
+    content = b''
+    # Whether Range headers are honoured
+    ranges = True
+    # The number of bytes to send of the first response before hanging up, None to send it all
+    cut_off = None
+    # The Range header of each request
+    requests = []
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        """
+        Send the file or the range of it that was asked for
+        """
+        requested = self.headers.get('Range')
+        self.requests.append(requested)
+        start = 0
+        if requested is not None and self.ranges:
+            start = int(requested[len('bytes='):-1])
+            if start >= len(self.content):
+                self.send_response(416)
+                self.send_header('Content-Range', 'bytes */{}'.format(len(self.content)))
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(start, len(self.content) - 1, len(self.content)))
+        else:
+            self.send_response(200)
+        body = self.content[start:]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.cut_off is not None and len(self.requests) == 1:
+            body = body[:self.cut_off]
+            self.close_connection = True
+        self.wfile.write(body)
+
+
+class ImportJobTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        StandIn.content = os.urandom(200 * 1024)
+        StandIn.ranges = True
+        StandIn.cut_off = None
+        StandIn.requests = []
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._url = 'http://127.0.0.1:{}/audio.mp4'.format(self._server.server_address[1])
+        self._directory = tempfile.mkdtemp()
+        self._partial = os.path.join(self._directory, 'audio.mp4' + library.youtube.PARTIAL_SUFFIX)
+
+    def tearDown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        shutil.rmtree(self._directory)
+
+    def _job(self) -> library.youtube.ImportJob:
+        job = library.youtube.ImportJob('1', 'https://youtu.be/video', self._directory,
+                                        lambda url: (self._url, 'audio.mp4'))
+        job.RETRY_DELAY = 0.01
+        return job
+
+    def _write_partial(self, length: int) -> None:
+        with open(self._partial, 'wb') as partial:
+            partial.write(StandIn.content[:length])
+
+    def _read_partial(self) -> bytes:
+        with open(self._partial, 'rb') as partial:
+            return partial.read()
+
+    def test_download(self):
+        job = self._job()
+        job._download(self._url, self._partial)
+        self.assertEqual(StandIn.requests, [None])
+        self.assertEqual(self._read_partial(), StandIn.content)
+        self.assertEqual(job.downloaded, len(StandIn.content))
+        self.assertEqual(job.size, len(StandIn.content))
+
+    def test_resume(self):
+        self._write_partial(50000)
+        job = self._job()
+        job._download(self._url, self._partial)
+        self.assertEqual(StandIn.requests, ['bytes=50000-'])
+        self.assertEqual(self._read_partial(), StandIn.content)
+        self.assertEqual(job.size, len(StandIn.content))
+
+    def test_restart_without_ranges(self):
+        StandIn.ranges = False
+        self._write_partial(50000)
+        job = self._job()
+        job._download(self._url, self._partial)
+        self.assertEqual(StandIn.requests, ['bytes=50000-'])
+        self.assertEqual(self._read_partial(), StandIn.content)
+        self.assertEqual(job.downloaded, len(StandIn.content))
+
+    def test_already_downloaded(self):
+        self._write_partial(len(StandIn.content))
+        job = self._job()
+        job._download(self._url, self._partial)
+        self.assertEqual(StandIn.requests, ['bytes={}-'.format(len(StandIn.content))])
+        self.assertEqual(self._read_partial(), StandIn.content)
+
+    def test_stopped_early(self):
+        StandIn.cut_off = 1000
+        with self.assertRaises(OSError):
+            self._job()._download(self._url, self._partial)
+        self.assertEqual(self._read_partial(), StandIn.content[:1000])
+
+    def test_run_resumes_and_imports(self):
+        StandIn.cut_off = 50000
+        job = self._job()
+        with unittest.mock.patch.object(library.Library, 'import_file', return_value=True) as import_file:
+            job.run()
+        path = os.path.join(self._directory, 'audio.mp4')
+        self.assertEqual(job.state, 'finished', job.error)
+        self.assertEqual(StandIn.requests, [None, 'bytes=50000-'])
+        import_file.assert_called_once_with(path)
+        with open(path, 'rb') as downloaded:
+            self.assertEqual(downloaded.read(), StandIn.content)
+        self.assertFalse(os.path.exists(self._partial))
+
+    def test_run_refused(self):
+        job = self._job()
+        with unittest.mock.patch.object(library.Library, 'import_file', return_value=False):
+            job.run()
+        self.assertEqual(job.state, 'failed')
+        self.assertIsNotNone(job.error)
+
+    def test_duplicate(self):
+        resolving = threading.Event()
+        release = threading.Event()
+
+        def resolver(url):
+            resolving.set()
+            release.wait()
+            raise ValueError('Not found')
+
+        url = 'https://youtu.be/duplicate'
+        job = library.youtube.ImportJobs.create(url, self._directory, resolver=resolver)
+        try:
+            resolving.wait(5)
+            with self.assertRaises(ValueError):
+                library.youtube.ImportJobs.create(url, self._directory, resolver=resolver)
+        finally:
+            release.set()
+            library.youtube.ImportJobs.remove(job.id)
+
+
+if __name__ == '__main__':
+    unittest.main()